@@ -0,0 +1,188 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from recognition.feature_collector import feature_data_queue
+from utils.logger import rate_limited
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    '''Кадры, которые клиент может отправить сейчас; пополняется со скоростью его доли.'''
+
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated_at = now
+
+
+def queue_occupancy():
+    """Заполненность очереди признаков (0..1)."""
+    return feature_data_queue.qsize() / feature_data_queue.maxsize if feature_data_queue.maxsize > 0 else 0.0
+
+
+class AdmissionController:
+    '''
+    Прием кадров с ограничением скорости для каждой сессии и для каждого клиента.
+
+    Идентификатор сессии выбирает клиент, поэтому кроме корзины сессии кадры списываются из корзины
+    клиента (пользователь проверенного токена или IP-адрес) с долей ADMISSION_SESSIONS_PER_CLIENT сессий:
+    смена идентификатора сессии не увеличивает частоту кадров клиента. Под нагрузкой новые корзины
+    начинаются пустыми.
+
+    Доля клиента — не больше ADMISSION_CLIENT_FPS и не больше равной части ADMISSION_CAPACITY_FPS
+    между активными клиентами. Когда очередь признаков заполнена больше чем на ADMISSION_HIGH_WATERMARK,
+    доли всех клиентов уменьшаются пропорционально (но не ниже ADMISSION_MIN_FPS): при перегрузке
+    каждый клиент получает меньше кадров, вместо того чтобы быстрый клиент вытеснял кадры остальных.
+    '''
+
+    def __init__(self, client_fps=None, capacity_fps=None, burst_seconds=None, min_fps=None,
+                 high_watermark=None, occupancy=queue_occupancy):
+        self.client_fps = client_fps if client_fps is not None else Config.ADMISSION_CLIENT_FPS
+        self.capacity_fps = capacity_fps if capacity_fps is not None else Config.ADMISSION_CAPACITY_FPS
+        self.burst_seconds = burst_seconds if burst_seconds is not None else Config.ADMISSION_BURST_SECONDS
+        self.min_fps = min(min_fps if min_fps is not None else Config.ADMISSION_MIN_FPS, self.client_fps)
+        self.high_watermark = high_watermark if high_watermark is not None else Config.ADMISSION_HIGH_WATERMARK
+        self.sessions_per_client = max(1.0, Config.ADMISSION_SESSIONS_PER_CLIENT)
+        self.occupancy = occupancy
+        self.idle_timeout = Config.SESSION_IDLE_TIMEOUT
+        self.max_clients = Config.MAX_SESSIONS * 10
+        self.max_batch_frames = Config.MAX_BATCH_FRAMES
+
+        self._buckets = OrderedDict()  # ключ сессии -> TokenBucket (от давно активных к недавним)
+        self._client_buckets = OrderedDict()  # ключ клиента (пользователь или IP) -> TokenBucket
+        self._lock = threading.Lock()
+        self._active_clients = 0
+        self._active_checked_at = 0.0
+        self.admitted_total = 0
+        self.rejected_total = 0
+
+    @property
+    def enabled(self):
+        return self.client_fps > 0
+
+    def _count_active_locked(self, now):
+        # Пересчет не чаще двух раз в секунду: клиенты, отправлявшие кадры за последние 2 сек.
+        # Считаются корзины клиентов (пользователь или IP): новые идентификаторы сессий не уменьшают доли остальных
+        if now - self._active_checked_at >= 0.5:
+            active = 0
+            for bucket in reversed((self._client_buckets or self._buckets).values()):
+                if now - bucket.updated_at > 2.0:
+                    break
+                active += 1
+            self._active_clients = max(1, active)
+            self._active_checked_at = now
+        return self._active_clients
+
+    def _evict_locked(self, buckets, now):
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if len(buckets) <= self.max_clients and now - bucket.updated_at <= self.idle_timeout:
+                break
+            del buckets[key]
+
+    def _refill_locked(self, buckets, key, burst, share, now, under_load):
+        bucket = buckets.get(key)
+        if bucket is None:
+            # Под нагрузкой новая корзина пуста: новый идентификатор не дает готового запаса кадров
+            bucket = buckets[key] = TokenBucket(0.0 if under_load else burst, now)
+            self._evict_locked(buckets, now)
+        else:
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * share)
+            bucket.updated_at = now
+            buckets.move_to_end(key)
+        return bucket
+
+    def _share_locked(self, now):
+        share = self.client_fps
+        if self.capacity_fps > 0:
+            share = min(share, self.capacity_fps / self._count_active_locked(now))
+        occupancy = self.occupancy()
+        if occupancy > self.high_watermark:
+            share *= max(0.0, (1.0 - occupancy) / (1.0 - self.high_watermark))
+        return max(share, self.min_fps)
+
+    def client_share(self):
+        """Текущая доля одного клиента (кадров в секунду) — подсказка частоты кадров для клиента."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return round(self._share_locked(time.monotonic()), 1)
+
+    def admit(self, session_key, frames=1, partial=False, client_key=None):
+        """
+        Списание frames кадров из корзины сессии и корзины клиента (client_key — пользователь или IP-адрес).
+        Возвращает (принято кадров, через сколько секунд повторить или 0, доля сессии в кадрах/сек).
+        partial=True — принять столько кадров, сколько доступно (пакетная загрузка).
+        """
+        if not self.enabled:
+            return frames, 0.0, None
+
+        now = time.monotonic()
+        with self._lock:
+            share = self._share_locked(now)
+            # Запрос больше запаса (последовательность из 10 кадров при малой доле) должен оставаться выполнимым.
+            # Для пакетов запас вмещает MAX_BATCH_FRAMES: кадры, накопленные клиентом за несколько секунд
+            # при допустимой частоте, принимаются одним пакетом
+            burst = max(1.0, share * self.burst_seconds, self.max_batch_frames if partial else frames)
+            under_load = self.occupancy() > self.high_watermark
+
+            limits = []
+            if client_key is not None and client_key != session_key:
+                client_share = share * self.sessions_per_client
+                client_bucket = self._refill_locked(self._client_buckets, client_key, burst * self.sessions_per_client,
+                                                    client_share, now, under_load)
+                limits.append((client_bucket, client_share))
+            # Корзина сессии не создается, если клиент уже исчерпал свою долю
+            if not limits or limits[0][0].tokens >= 1.0:
+                limits.append((self._refill_locked(self._buckets, session_key, burst, share, now, under_load), share))
+
+            available = min(bucket.tokens for bucket, _ in limits)
+            if available >= frames:
+                granted = frames
+            elif partial:
+                granted = max(0, int(available))
+            else:
+                granted = 0
+            for bucket, _ in limits:
+                bucket.tokens -= granted
+
+            retry_after = 0.0 if granted == frames else max(
+                (frames - granted - bucket.tokens) / bucket_share for bucket, bucket_share in limits)
+            self.admitted_total += granted
+            self.rejected_total += frames - granted
+
+        if granted < frames:
+            logger.info("Сессия %s (клиент %s) превысила долю %.1f кадров/сек: принято %d из %d кадров.",
+                        session_key, client_key, share, granted, frames, extra=rate_limited())
+        return granted, retry_after, round(share, 1)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "client_fps": self.client_fps,
+                "capacity_fps": self.capacity_fps,
+                "client_share_fps": round(self._share_locked(now), 1) if self.enabled else None,
+                "clients": len(self._buckets),
+                "client_keys": len(self._client_buckets),
+                "active_clients": self._count_active_locked(now),
+                "queue_occupancy": round(self.occupancy(), 3),
+                "admitted_frames": self.admitted_total,
+                "rejected_frames": self.rejected_total,
+            }
+
+
+def retry_after_header(seconds):
+    """Значение заголовка Retry-After: целое число секунд, не меньше 1."""
+    return str(max(1, math.ceil(seconds)))
+
+
+# Общий контроль приема кадров процесса
+admission_controller = AdmissionController()
@@ -2,14 +2,22 @@ import logging
 import re
 from flask import Blueprint, request, jsonify
 
-from models.user import create_user, authenticate_user, get_user_by_id
+from models.user import create_user, authenticate_user, issue_token, get_user_by_id
 from models.auth_token import validate_token, logout_user
+from models.password_hashing import PasswordHashingBusy
 
 logger = logging.getLogger(__name__)
 
 # Blueprint-объект для группировки маршрутов аутентификации
 auth_bp = Blueprint('auth', __name__)
 
+def _hashing_busy_response(e):
+    """503 с Retry-After, если очередь хэширования паролей заполнена."""
+    logger.warning("Очередь хэширования паролей заполнена, запрос отклонен")
+    response = jsonify({"success": False, "message": "Server is busy, please retry later"})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503 # Service Unavailable
+
 # Маршрут регистрации
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -40,12 +48,14 @@ def register():
         result = create_user(data["name"], data["email"], data["password"])
         
         if result["success"]:
-            # Автоматический вход и возврат токена
-            auth_result = authenticate_user(data["email"], data["password"])
+            # Автоматический вход и возврат токена (без повторного хэширования пароля)
+            auth_result = issue_token(result["user_id"], data["name"])
             return jsonify(auth_result)
         else:
             return jsonify(result), 400
         
+    except PasswordHashingBusy as e:
+        return _hashing_busy_response(e)
     except Exception as e:
         logger.exception(f"Ошибка при регистрации: {str(e)}")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500 # Internal Server Error
@@ -72,6 +82,8 @@ def login():
         else:
             return jsonify(result), 401 # Unauthorized
         
+    except PasswordHashingBusy as e:
+        return _hashing_busy_response(e)
     except Exception as e:
         logger.exception(f"Ошибка при входе: {str(e)}")
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
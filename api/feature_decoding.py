@@ -0,0 +1,338 @@
+import json
+import logging
+import zlib
+import numpy as np
+
+from config import Config
+from recognition.hand_mask import compact_size, expand_frame, hand_masks
+
+try:
+    import msgpack
+except ImportError:  # msgpack — необязательная зависимость
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_BINARY = 'application/octet-stream'
+CONTENT_TYPES_MSGPACK = ('application/msgpack', 'application/x-msgpack')
+
+TIMESTAMP_HEADER = 'X-Timestamp'  # время клиента для бинарного формата
+TIMESTAMPS_HEADER = 'X-Timestamps'  # времена кадров пакета для бинарного формата (через запятую)
+HANDS_HEADER = 'X-Hands'  # маска рук компактного кадра (для пакета — маски кадров через запятую)
+
+# Статусы кадров в пакетной загрузке
+FRAME_ACCEPTED = 'accepted'
+FRAME_INVALID = 'invalid'
+FRAME_SKIPPED_EMPTY = 'skipped_empty'
+FRAME_DROPPED = 'dropped'
+FRAME_RATE_LIMITED = 'rate_limited'
+
+FRAME_SIZE = 126
+SEQUENCE_SIZE = 1260
+FEATURE_DTYPE = np.dtype('<f4')  # little-endian float32
+MASK_DTYPE = np.dtype('<u4')  # маска рук в начале компактного бинарного сообщения потокового канала
+DENSE_MESSAGE_SIZES = (FRAME_SIZE * FEATURE_DTYPE.itemsize, SEQUENCE_SIZE * FEATURE_DTYPE.itemsize)
+
+
+class FeatureDecodeError(Exception):
+    '''Ошибка разбора признаков из запроса.'''
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _from_bytes(data):
+    """Массив float32 поверх буфера запроса (без копирования)."""
+    if len(data) % FEATURE_DTYPE.itemsize:
+        raise FeatureDecodeError(f"Размер бинарных данных ({len(data)} байт) не кратен {FEATURE_DTYPE.itemsize}")
+    return np.frombuffer(data, dtype=FEATURE_DTYPE)
+
+
+def _from_list(features):
+    if not isinstance(features, (list, tuple)):
+        raise FeatureDecodeError(f"Неверный формат признаков. Ожидаемый список/кортеж, получен: {type(features)}")
+    try:
+        return np.array(features, dtype=np.float32)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Ошибка преобразования объектов в float: {e}. Data: {str(features)[:100]}...")
+        raise FeatureDecodeError("Non-numeric data in features")
+
+
+def _parse_mask(value):
+    """Маска рук компактного кадра из поля или заголовка (None — плотный кадр)."""
+    if value is None:
+        return None
+    try:
+        mask = int(value) if isinstance(value, str) else value
+        compact_size(mask)
+    except ValueError:
+        raise FeatureDecodeError(f"Неверная маска рук: {value!r}")
+    return int(mask)
+
+
+def _decode_json(request):
+    payload = request.get_json()
+    if not isinstance(payload, dict) or 'features' not in payload:
+        raise FeatureDecodeError("Отсутствует ключ 'features' в JSON")
+    return _from_list(payload['features']), _parse_mask(payload.get('hands')), payload.get('timestamp', None), payload
+
+
+def _decode_binary(request):
+    return (_from_bytes(request.get_data(cache=False)), _parse_mask(request.headers.get(HANDS_HEADER)),
+            request.headers.get(TIMESTAMP_HEADER), None)
+
+
+def _decode_msgpack(request):
+    if msgpack is None:
+        raise FeatureDecodeError("msgpack format is not supported by this server (msgpack is not installed)", status=415)
+    try:
+        payload = msgpack.unpackb(request.get_data(cache=False), raw=False)
+    except Exception as e:
+        raise FeatureDecodeError(f"Invalid msgpack payload: {str(e)}")
+
+    if not isinstance(payload, dict) or 'features' not in payload:
+        raise FeatureDecodeError("Отсутствует ключ 'features' в msgpack")
+
+    features = payload['features']
+    # Основной вариант — бинарное поле с float32, список чисел также допускается
+    features_np = _from_bytes(features) if isinstance(features, (bytes, bytearray)) else _from_list(features)
+    mask = _parse_mask(payload.get('hands', request.headers.get(HANDS_HEADER)))
+    return features_np, mask, payload.get('timestamp', request.headers.get(TIMESTAMP_HEADER)), payload
+
+
+def validate_features(features_np, mask=None):
+    """
+    Общая проверка признаков для всех форматов: одномерный массив из 126 или 1260 конечных значений,
+    а для компактного кадра (mask задана) — 63 значения на каждую руку из маски.
+    """
+    if features_np.ndim != 1:
+        raise FeatureDecodeError(f"Неверный формат признаков. Ожидался плоский список, получена форма: {features_np.shape}")
+
+    if mask is not None:
+        if features_np.size != compact_size(mask):
+            raise FeatureDecodeError(f"Неверное количество признаков для маски рук {mask}. Ожидалось {compact_size(mask)}, получено: {features_np.size}")
+    elif features_np.size not in (FRAME_SIZE, SEQUENCE_SIZE):
+        raise FeatureDecodeError(f"Неверное количество признаков. Ожидалось {FRAME_SIZE} или {SEQUENCE_SIZE}, получено: {features_np.size}")
+
+    if not np.isfinite(features_np).all():
+        raise FeatureDecodeError("Non-finite values (NaN/Inf) in features")
+
+    return features_np
+
+
+def decode_features_request(request):
+    """
+    Разбор признаков из запроса в формате JSON, бинарном (application/octet-stream) или msgpack.
+    Компактный кадр передается с маской рук: поле 'hands' или заголовок X-Hands.
+    Возвращает (массив float32, маска рук или None для плотных признаков, время клиента, исходный payload или None).
+    """
+    mimetype = request.mimetype
+    if mimetype == CONTENT_TYPE_BINARY:
+        features_np, mask, client_timestamp, payload = _decode_binary(request)
+    elif mimetype in CONTENT_TYPES_MSGPACK:
+        features_np, mask, client_timestamp, payload = _decode_msgpack(request)
+    elif request.is_json:
+        features_np, mask, client_timestamp, payload = _decode_json(request)
+    else:
+        raise FeatureDecodeError(
+            f"Content-Type must be {CONTENT_TYPE_JSON}, {CONTENT_TYPE_BINARY} or {CONTENT_TYPES_MSGPACK[0]}", status=415)
+
+    return validate_features(features_np, mask), mask, client_timestamp, payload
+
+
+def decode_features_message(message):
+    """
+    Разбор сообщения потокового канала: текст — JSON {"features": [...], "hands": ..., "timestamp": ...},
+    бинарное сообщение — float32 little-endian (504 или 5040 байт) или компактный кадр:
+    маска рук uint32 little-endian и 63 значения на каждую руку из маски (4, 256 или 508 байт).
+    Возвращает (массив float32, маска рук или None, время клиента, payload или None).
+    """
+    if isinstance(message, (bytes, bytearray)):
+        if len(message) in DENSE_MESSAGE_SIZES:
+            return validate_features(_from_bytes(message)), None, None, None
+        if len(message) < MASK_DTYPE.itemsize:
+            raise FeatureDecodeError(f"Слишком короткое бинарное сообщение ({len(message)} байт)")
+        mask = _parse_mask(int(np.frombuffer(message, dtype=MASK_DTYPE, count=1)[0]))
+        features_np = _from_bytes(memoryview(message)[MASK_DTYPE.itemsize:])
+        return validate_features(features_np, mask), mask, None, None
+
+    try:
+        payload = json.loads(message)
+    except ValueError as e:
+        raise FeatureDecodeError(f"Invalid JSON message: {str(e)}")
+    if not isinstance(payload, dict) or 'features' not in payload:
+        raise FeatureDecodeError("Отсутствует ключ 'features' в сообщении")
+    mask = _parse_mask(payload.get('hands'))
+    return validate_features(_from_list(payload['features']), mask), mask, payload.get('timestamp', None), payload
+
+
+def read_body(request, max_size):
+    """Тело запроса с распаковкой gzip (Content-Encoding: gzip) и ограничением размера после распаковки."""
+    data = request.get_data(cache=False)
+    encoding = (request.headers.get('Content-Encoding') or '').lower()
+    if encoding in ('', 'identity'):
+        if len(data) > max_size:
+            raise FeatureDecodeError(f"Request body too large ({len(data)} > {max_size} bytes)", status=413)
+        return data
+    if encoding != 'gzip':
+        raise FeatureDecodeError(f"Unsupported Content-Encoding: {encoding}", status=415)
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)  # формат gzip
+    try:
+        body = decompressor.decompress(data, max_size + 1)
+    except zlib.error as e:
+        raise FeatureDecodeError(f"Invalid gzip body: {str(e)}")
+    if len(body) > max_size or decompressor.unconsumed_tail:
+        raise FeatureDecodeError(f"Decompressed body too large (> {max_size} bytes)", status=413)
+    return body
+
+
+def _check_frame_count(count):
+    """Ограничение числа кадров пакета до выделения памяти и обработки отдельных кадров."""
+    if count > Config.MAX_BATCH_FRAMES:
+        raise FeatureDecodeError(f"Слишком много кадров в пакете: {count} (максимум {Config.MAX_BATCH_FRAMES})", status=413)
+
+
+def _parse_masks(masks, source):
+    """Маски рук кадров компактного пакета: список или строка через запятую."""
+    if isinstance(masks, str):
+        masks = [m.strip() for m in masks.split(',')]
+    if not isinstance(masks, (list, tuple)):
+        raise FeatureDecodeError(f"Неверный формат {source}. Ожидался список масок рук")
+    # Проверка до разбора и развертывания: число масок задает размер массива пакета
+    _check_frame_count(len(masks))
+    return [_parse_mask(m) for m in masks]
+
+
+def _parse_timestamps_header(request, count):
+    header = request.headers.get(TIMESTAMPS_HEADER)
+    if not header:
+        return [None] * count
+    timestamps = [t.strip() or None for t in header.split(',')]
+    if len(timestamps) != count:
+        raise FeatureDecodeError(f"{TIMESTAMPS_HEADER} содержит {len(timestamps)} значений, а кадров {count}")
+    return timestamps
+
+
+def _frames_from_bytes(data):
+    if len(data) % (FRAME_SIZE * FEATURE_DTYPE.itemsize):
+        raise FeatureDecodeError(f"Размер бинарного пакета ({len(data)} байт) не кратен размеру кадра ({FRAME_SIZE * FEATURE_DTYPE.itemsize} байт)")
+    return _from_bytes(data).reshape(-1, FRAME_SIZE)
+
+
+def _compact_frames_from_bytes(data, masks):
+    """Компактные кадры пакета подряд (63 значения на каждую руку из маски кадра), развернутые в [N, 126]."""
+    values = _from_bytes(data)
+    sizes = [compact_size(mask) for mask in masks]
+    if values.size != sum(sizes):
+        raise FeatureDecodeError(f"Размер компактного пакета ({values.size} значений) не совпадает с масками рук ({sum(sizes)} значений)")
+    frames_np = np.empty((len(masks), FRAME_SIZE), dtype=np.float32)
+    offset = 0
+    for i, (mask, size) in enumerate(zip(masks, sizes)):
+        expand_frame(values[offset:offset + size], mask, frames_np[i])
+        offset += size
+    return frames_np
+
+
+def _frames_from_json(frames):
+    """
+    Кадры из списка {'features': [...], 'hands': ..., 'timestamp': ...}: некорректные кадры помечаются,
+    а не отклоняют весь пакет. Компактные кадры (с 'hands') разворачиваются в строки массива пакета.
+    """
+    if not isinstance(frames, (list, tuple)):
+        raise FeatureDecodeError(f"Неверный формат пакета. Ожидаемый список кадров, получен: {type(frames)}")
+    _check_frame_count(len(frames))
+
+    frames_np = np.zeros((len(frames), FRAME_SIZE), dtype=np.float32)
+    timestamps = [None] * len(frames)
+    statuses = [FRAME_ACCEPTED] * len(frames)
+    for i, frame in enumerate(frames):
+        features = frame.get('features') if isinstance(frame, dict) else frame
+        mask = None
+        if isinstance(frame, dict):
+            timestamps[i] = frame.get('timestamp')
+            try:
+                mask = _parse_mask(frame.get('hands'))
+            except FeatureDecodeError:
+                statuses[i] = FRAME_INVALID
+                continue
+        expected_size = FRAME_SIZE if mask is None else compact_size(mask)
+        if not isinstance(features, (list, tuple)) or len(features) != expected_size:
+            statuses[i] = FRAME_INVALID
+            continue
+        try:
+            if mask is None:
+                frames_np[i] = features
+            else:
+                expand_frame(np.asarray(features, dtype=np.float32), mask, frames_np[i])
+        except (ValueError, TypeError):
+            statuses[i] = FRAME_INVALID
+    return frames_np, timestamps, statuses
+
+
+def decode_batch_request(request):
+    """
+    Разбор пакета кадров (JSON, application/octet-stream или msgpack, при необходимости сжатого gzip).
+    Компактные кадры: 'hands' у кадра JSON, список 'hands' для бинарного поля 'frames' или заголовок X-Hands.
+    Возвращает (массив [N, 126], маски рук кадров (N,), времена кадров, статусы кадров, исходный payload или None).
+    """
+    max_frames = Config.MAX_BATCH_FRAMES
+    # Верхняя граница размера: JSON-представление кадра занимает не больше ~24 байт на значение
+    max_size = max_frames * FRAME_SIZE * 24
+    body = read_body(request, max_size)
+
+    mimetype = request.mimetype
+    payload = None
+    masks = None  # маски рук, если клиент прислал компактные кадры
+    if mimetype == CONTENT_TYPE_BINARY:
+        if request.headers.get(HANDS_HEADER):
+            masks = _parse_masks(request.headers[HANDS_HEADER], HANDS_HEADER)
+            frames_np = _compact_frames_from_bytes(body, masks)
+        else:
+            frames_np = _frames_from_bytes(body)
+        timestamps = _parse_timestamps_header(request, len(frames_np))
+        statuses = [FRAME_ACCEPTED] * len(frames_np)
+    elif mimetype in CONTENT_TYPES_MSGPACK or mimetype == CONTENT_TYPE_JSON or mimetype.endswith('+json'):
+        if mimetype in CONTENT_TYPES_MSGPACK and msgpack is None:
+            raise FeatureDecodeError("msgpack format is not supported by this server (msgpack is not installed)", status=415)
+        try:
+            payload = msgpack.unpackb(body, raw=False) if mimetype in CONTENT_TYPES_MSGPACK else json.loads(body)
+        except Exception as e:
+            raise FeatureDecodeError(f"Invalid request payload: {str(e)}")
+        if not isinstance(payload, dict) or 'frames' not in payload:
+            raise FeatureDecodeError("Отсутствует ключ 'frames' в запросе")
+
+        frames = payload['frames']
+        if isinstance(frames, (bytes, bytearray)):
+            if payload.get('hands') is not None:
+                masks = _parse_masks(payload['hands'], "'hands'")
+                frames_np = _compact_frames_from_bytes(frames, masks)
+            else:
+                frames_np = _frames_from_bytes(frames)
+            timestamps = payload.get('timestamps') or [None] * len(frames_np)
+            if not isinstance(timestamps, (list, tuple)):
+                raise FeatureDecodeError(f"Неверный формат 'timestamps'. Ожидался список, получен: {type(timestamps).__name__}")
+            if len(timestamps) != len(frames_np):
+                raise FeatureDecodeError(f"'timestamps' содержит {len(timestamps)} значений, а кадров {len(frames_np)}")
+            statuses = [FRAME_ACCEPTED] * len(frames_np)
+        else:
+            frames_np, timestamps, statuses = _frames_from_json(frames)
+    else:
+        raise FeatureDecodeError(
+            f"Content-Type must be {CONTENT_TYPE_JSON}, {CONTENT_TYPE_BINARY} or {CONTENT_TYPES_MSGPACK[0]}", status=415)
+
+    if len(frames_np) == 0:
+        raise FeatureDecodeError("Пустой пакет кадров")
+    _check_frame_count(len(frames_np))
+
+    # Одна векторная проверка конечности для всех кадров пакета
+    finite_rows = np.isfinite(frames_np).all(axis=1)
+    for i in np.flatnonzero(~finite_rows):
+        statuses[i] = FRAME_INVALID
+
+    # Маски плотных кадров вычисляются один раз и дальше заменяют подсчет ненулевых значений
+    masks = hand_masks(frames_np) if masks is None else np.array(masks, dtype=np.uint8)
+    return frames_np, masks, timestamps, statuses, payload
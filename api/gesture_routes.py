@@ -1,206 +1,401 @@
+import json
 import logging
 import queue
+import threading
 import time
 import numpy as np
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 
 from config import Config
 from recognition.model_loader import get_model, load_model, AUTO_RECOGNITION_ENABLED
-from recognition.feature_collector import feature_data_queue, result_queue
+from recognition.feature_collector import feature_data_queue
+from recognition.session_registry import session_registry
 from recognition.gesture_processor import check_sequence_variation, recognize_gesture
+from recognition.feature_window import FeatureWindow
+from recognition.hand_mask import MASK_NONE, hand_masks
+from recognition.inference_executor import ensure_inference_ready, get_inference_executor
+from api.session_utils import resolve_client_key, resolve_session_id
+from utils.logger import rate_limited
+from utils.metrics import INGEST_PARSE_SECONDS, FRAMES
+from api.admission import admission_controller, retry_after_header
+from api.feature_decoding import (FeatureDecodeError, decode_features_request, decode_batch_request,
+                                  FRAME_ACCEPTED, FRAME_INVALID, FRAME_SKIPPED_EMPTY, FRAME_DROPPED,
+                                  FRAME_RATE_LIMITED)
 
 logger = logging.getLogger(__name__)
 
 # Blueprint-объект для группировки маршрутов жестов
 gesture_bp = Blueprint('gesture', __name__)
 
+# Ограничение количества одновременно ожидающих клиентов (long-poll и SSE).
+# Долгий запрос занимает поток gthread на все время ожидания, поэтому WebSocket, SSE и long-poll
+# вместе ограничены MAX_LONG_REQUESTS: SERVER_RESERVED_THREADS потоков всегда остаются для /features.
+_long_request_slots = threading.BoundedSemaphore(Config.MAX_LONG_REQUESTS)
+_long_poll_slots = threading.BoundedSemaphore(Config.MAX_TRANSLATION_WAITERS)
+_sse_slots = threading.BoundedSemaphore(Config.MAX_SSE_STREAMS)
+
+def acquire_long_request(kind_slots=None):
+    """Слот долгого запроса: общий предел процесса и, если задан, предел вида запроса."""
+    if not _long_request_slots.acquire(blocking=False):
+        return False
+    if kind_slots is not None and not kind_slots.acquire(blocking=False):
+        _long_request_slots.release()
+        return False
+    return True
+
+def release_long_request(kind_slots=None):
+    if kind_slots is not None:
+        kind_slots.release()
+    _long_request_slots.release()
+
+def _too_many_waiters(message):
+    response = jsonify({"status": "error", "message": message})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def _enqueue(data_to_queue):
+    """
+    Добавление элемента в очередь признаков. При переполнении отклоняется новый элемент:
+    кадры других клиентов из очереди не вытесняются (скорость клиентов ограничивает admission_controller).
+    """
+    data_to_queue['enqueued_at'] = time.monotonic()
+    try:
+        feature_data_queue.put_nowait(data_to_queue)
+    except queue.Full:
+        logger.warning("Очередь функций полна, данные пропущены!", extra=rate_limited())
+        return False
+    return True
+
+def _rate_limited_body(retry_after, suggested_fps, **extra):
+    body = {
+        "status": "error",
+        "message": "Frame rate limit exceeded",
+        "retry_after": round(retry_after, 3),
+        "suggested_fps": suggested_fps,  # частота кадров, которую сервер может принять от клиента сейчас
+    }
+    body.update(extra)
+    return body
+
+def _overloaded_body(**extra):
+    body = {
+        "status": "error",
+        "message": "Server overloaded (queue full)",
+        "retry_after": 1.0,
+        "suggested_fps": admission_controller.client_share(),
+    }
+    body.update(extra)
+    return body
+
+def _json_response(body, status):
+    """JSON-ответ; для 429 и 503 с retry_after добавляется заголовок Retry-After."""
+    response = jsonify(body)
+    response.status_code = status
+    if status in (429, 503) and body.get("retry_after") is not None:
+        response.headers['Retry-After'] = retry_after_header(body["retry_after"])
+    suggested_fps = body.get("suggested_fps")
+    if suggested_fps is not None:
+        response.headers['X-Suggested-FPS'] = str(suggested_fps)
+    return response
+
+def ingest_features(features, client_timestamp, session_id, received_at=None, mask=None, client_key=None):
+    """
+    Обработка проверенных признаков (126 — кадр, 1260 — последовательность) для сессии.
+    Общая логика для HTTP и потокового канала. Возвращает (ответ, HTTP-статус).
+    received_at — время получения запроса (time.monotonic) для метрики задержки до результата.
+    """
+    server_received_timestamp = str(int(time.time() * 1000))
+    #logger.debug(f"Характеристики получены, timestamp: {client_timestamp}, server ts: {server_received_timestamp}")
+
+    num_features_received = features.size
+    #logger.debug(f"Получено {num_features_received} значений признаков.")
+
+    # Обработка одного кадра (126 функций или компактный кадр с маской рук)
+    if mask is not None or num_features_received == 126:
+        #logger.info("Получен один набор признаков (126 значений). Добавление в очередь.")
+
+        # Добавлять в очередь только если включено автоматическое распознавание
+        if AUTO_RECOGNITION_ENABLED:
+            feature_set = features  # numpy array (126,) или компактный кадр, уже проверен при разборе
+
+            # Маска рук определяется один раз и передается в буфер сессии вместе с кадром
+            if mask is None:
+                mask = int(hand_masks(feature_set))
+            if mask == MASK_NONE:  # в кадре нет ни одной руки
+                 FRAMES.labels(status=FRAME_SKIPPED_EMPTY).inc()
+                 logger.warning("Получен кадр без рук. Пропуск.", extra=rate_limited())
+                 return {"status": "success", "message": "Features received (mostly empty, skipped)", "timestamp": server_received_timestamp}, 200
+
+            admitted, retry_after, suggested_fps = admission_controller.admit(session_id, client_key=client_key)
+            if not admitted:
+                FRAMES.labels(status=FRAME_RATE_LIMITED).inc()
+                return _rate_limited_body(retry_after, suggested_fps), 429
+
+            data_to_queue = {
+                'features': feature_set,  # numpy array (126,) или компактный кадр
+                'hands': mask,  # маска присутствия рук
+                'timestamp': client_timestamp or server_received_timestamp,
+                'type': 'features_frame',
+                'session_id': session_id,
+                'received_at': received_at or time.monotonic()
+            }
+
+            if not _enqueue(data_to_queue):
+                FRAMES.labels(status=FRAME_DROPPED).inc()
+                return _overloaded_body(), 503
+            FRAMES.labels(status=FRAME_ACCEPTED).inc()
+            return {"status": "success", "message": "Features received", "timestamp": server_received_timestamp,
+                    "suggested_fps": suggested_fps}, 200
+
+        else:
+             logger.info("Автоматическое распознавание отключено, функции игнорируются.")
+             return {"status": "success", "message": "Features received (auto-recognition disabled)", "timestamp": server_received_timestamp}, 200
+
+    # Обработка последовательности (1260 features)
+    elif num_features_received == 1260:
+        logger.info("Получена последовательность из 10 наборов признаков (1260 значений).")
+
+        if AUTO_RECOGNITION_ENABLED:
+            if not ensure_inference_ready():
+                logger.error("Модель не загружена, распознавание последовательности невозможно.")
+                return {
+                    "status": "error", 
+                    "message": "Server is still initializing or model file is missing. Please try again in a moment.", 
+                    "timestamp": server_received_timestamp
+                }, 200 
+
+            # Последовательность расходует запас клиента как 10 кадров
+            admitted, retry_after, suggested_fps = admission_controller.admit(session_id, frames=10, client_key=client_key)
+            if not admitted:
+                FRAMES.labels(status=FRAME_RATE_LIMITED).inc(10)
+                return _rate_limited_body(retry_after, suggested_fps), 429
+
+            try:
+                # Окно (10, 126) — представление массива запроса без копирования
+                window = FeatureWindow.wrap(features)
+
+                # Проверка на наличие одинаковых кадров в последовательности
+                has_variation = check_sequence_variation(window)
+                if not has_variation:
+                    logger.warning(f"Последовательность содержит идентичные кадры. Это может снизить качество распознавания.")
+
+                # Check data quality: ни в одном кадре нет рук
+                if window.stats.hand_frames == 0:
+                    logger.warning("Последовательность не содержит рук ни в одном кадре. Пропуск.")
+                    return {"status": "success", "message": "Sequence received (mostly empty, skipped)", "timestamp": server_received_timestamp}, 200
+
+                logger.info(f"Начинаем распознавание полученной последовательности из 10 кадров...")
+                result = recognize_gesture(window, session_id)
+
+                # Если жест распознан с достаточной уверенностью, добавить в очередь результатов
+                if result and result.get("gesture"): 
+                    logger.info(f"Распознан жест {result['gesture']} с уверенностью {result['confidence']:.2f}")
+                    result['client_timestamp'] = client_timestamp
+                    result['server_received_timestamp'] = server_received_timestamp
+                    result['recognition_timestamp'] = str(int(time.time() * 1000))
+                    session_registry.get_or_create(session_id).put_result(result)
+                else:
+                    logger.info("Жест из последовательности не распознан (низкая уверенность или ошибка).")
+
+            except (ValueError, TypeError) as e:
+                logger.error(f"Ошибка преобразования последовательности признаков в число с плавающей точкой: {e}. Data: {str(features)[:100]}...")
+                return {"status": "error", "message": "Non-numeric data in sequence features"}, 400
+            except Exception as e:
+                logger.exception(f"Ошибка обработки последовательности функций: {str(e)}")
+                return {"status": "error", "message": f"Sequence processing error: {str(e)}"}, 500
+        else:
+            logger.info("Автоматическое распознавание отключено, последовательность функций игнорируется.")
+            return {"status": "success", "message": "Sequence received (auto-recognition disabled)", "timestamp": server_received_timestamp}, 200
+
+    # Неверное количество признаков
+    else:
+        msg = f"Неверное количество признаков. Ожидалось 126 или 1260, получено: {num_features_received}"
+        logger.error(msg)
+        return {"status": "error", "message": msg}, 400
+
+    return {"status": "success", "message": "Features received", "timestamp": server_received_timestamp}, 200
+
 # Маршрут для получения признаков жестов
 @gesture_bp.route('/features', methods=['POST'])
 def receive_features():
     #logger.info(f"POST запрос к /features от {request.remote_addr}")
 
-    if not request.is_json:
-        logger.error("Запрос не JSON")
-        return jsonify({"status": "error", "message": "Content-Type must be application/json"}), 415
-
     try:
-        features_data = request.get_json()
-
-        if not features_data or 'features' not in features_data:
-            logger.error("Отсутствует ключ 'features' в JSON")
-            return jsonify({"status": "error", "message": "Отсутствует ключ 'features' в JSON"}), 400
-
-        features = features_data['features']
-        # Извлечение времени клиента 
-        client_timestamp = features_data.get('timestamp', None)
-        server_received_timestamp = str(int(time.time() * 1000))
-        #logger.debug(f"Характеристики получены, timestamp: {client_timestamp}, server ts: {server_received_timestamp}")
-
-        # Проверка формата данных
-        if not isinstance(features, (list, tuple)):
-             msg = f"Неверный формат признаков. Ожидаемый список/кортеж, получен: {type(features)}"
-             logger.error(msg)
-             return jsonify({"status": "error", "message": msg}), 400
-
-        num_features_received = len(features)
-        #logger.debug(f"Получено {num_features_received} значений признаков.")
+        received_at = time.monotonic()
+        try:
+            features, mask, client_timestamp, features_data = decode_features_request(request)
+        except FeatureDecodeError as e:
+            logger.error(e.message)
+            FRAMES.labels(status=FRAME_INVALID).inc()
+            return jsonify({"status": "error", "message": e.message}), e.status
+        INGEST_PARSE_SECONDS.labels(endpoint='features').observe(time.monotonic() - received_at)
+
+        session_id = resolve_session_id(request, features_data)
+        body, status = ingest_features(features, client_timestamp, session_id, received_at, mask,
+                                       client_key=resolve_client_key(request))
+        return _json_response(body, status)
 
-        # Обработка одного кадра (126 функций)
-        if num_features_received == 126:
-            #logger.info("Получен один набор признаков (126 значений). Добавление в очередь.")
+    except Exception as e:
+        logger.exception(f"Критическая ошибка обработки/запроса признаков: {str(e)}")
+        return jsonify({"error": "Internal server error processing features"}), 500
 
-            # Добавлять в очередь только если включено автоматическое распознавание
-            if AUTO_RECOGNITION_ENABLED:
-                try:
-                    feature_set = np.array([float(x) for x in features], dtype=np.float32)
-                except (ValueError, TypeError) as e:
-                    logger.error(f"Ошибка преобразования объектов в float: {e}. Data: {str(features)[:100]}...")
-                    return jsonify({"status": "error", "message": "Non-numeric data in features"}), 400
-
-                non_zero_count = np.count_nonzero(feature_set)
-                if non_zero_count < 10:  # Если почти все нули (10 — произвольный порог)
-                     logger.warning(f"Получен почти пустой набор функций ({non_zero_count} ненулевых элементов из 126). Пропуск.")
-                     return jsonify({"status": "success", "message": "Features received (mostly empty, skipped)", "timestamp": server_received_timestamp}), 200
-
-                data_to_queue = {
-                    'features': feature_set,  # numpy array (126,)
-                    'timestamp': client_timestamp or server_received_timestamp,
-                    'type': 'features_frame'
-                }
+# Маршрут для пакетной загрузки кадров
+@gesture_bp.route('/features/batch', methods=['POST'])
+def receive_features_batch():
+    try:
+        received_at = time.monotonic()
+        try:
+            frames, masks, timestamps, statuses, payload = decode_batch_request(request)
+        except FeatureDecodeError as e:
+            logger.error(e.message)
+            return jsonify({"status": "error", "message": e.message}), e.status
+        INGEST_PARSE_SECONDS.labels(endpoint='features_batch').observe(time.monotonic() - received_at)
 
-                try:
-                    feature_data_queue.put_nowait(data_to_queue)
-                    #logger.debug(f"Набор функций добавлен в очередь. Размер очереди: {feature_data_queue.qsize()}")
-                except queue.Full:
-                    logger.warning("Очередь функций полна, данные пропущены!")
-                    # Очистить старые данные
-                    try:
-                        feature_data_queue.get_nowait() # Удалить самый старый элемент
-                        feature_data_queue.task_done()
-                        feature_data_queue.put_nowait(data_to_queue)
-                    except queue.Empty:
-                        pass
-                    except queue.Full:
-                        logger.error("Очередь заполнена после очистки! Сервер перегружен.")
-                        return jsonify({"status": "error", "message": "Server overloaded (queue full)"}), 503
-
-            else:
-                 logger.info("Автоматическое распознавание отключено, функции игнорируются.")
-                 return jsonify({"status": "success", "message": "Features received (auto-recognition disabled)", "timestamp": server_received_timestamp}), 200
-
-        # Обработка последовательности (1260 features)
-        elif num_features_received == 1260:
-            logger.info("Получена последовательность из 10 наборов признаков (1260 значений).")
-
-            if AUTO_RECOGNITION_ENABLED:
-                current_model = get_model()
-                if current_model is None:
-                    logger.warning("Модель не загружена, попытка загрузить...")
-                    success = load_model()
-                    if not success:
-                        logger.error("Не удалось загрузить модель по запросу")
-                        return jsonify({
-                            "status": "error", 
-                            "message": "Server is still initializing or model file is missing. Please try again in a moment.", 
-                            "timestamp": server_received_timestamp
-                        }), 200 
-                    current_model = get_model()
-                
-                if current_model is None:
-                    logger.error("Модель по-прежнему недоступна после попытки загрузки.")
-                    return jsonify({
-                        "status": "error", 
-                        "message": "Recognition service temporarily unavailable", 
-                        "timestamp": server_received_timestamp
-                    }), 200 
-                
-                try:
-                    all_features_np = np.array([float(x) for x in features], dtype=np.float32)
-    
-                    if all_features_np.size != 1260:
-                        logger.error(f"Ожидалось 1260 функций, получено {all_features_np.size} после преобразования.")
-                        return jsonify({"status": "error", "message": "Invalid number of features after conversion"}), 400
-
-                    feature_sequence_np = all_features_np.reshape((10, 126))
-
-                    # Проверка на наличие одинаковых кадров в последовательности
-                    has_variation = check_sequence_variation(feature_sequence_np)
-                    if not has_variation:
-                        logger.warning(f"Последовательность содержит идентичные кадры. Это может снизить качество распознавания.")
-
-                    feature_sequence_list = [frame for frame in feature_sequence_np]
-
-                    # Check data quality
-                    non_zero_count = np.count_nonzero(feature_sequence_np)
-                    if non_zero_count < 50:  # Arbitrary threshold for sequence
-                        logger.warning(f"Последовательность содержит очень мало данных ({non_zero_count} ненулевых из 1260). Пропуск.")
-                        return jsonify({"status": "success", "message": "Sequence received (mostly empty, skipped)", "timestamp": server_received_timestamp}), 200
-
-                    logger.info(f"Начинаем распознавание полученной последовательности из 10 кадров...")
-                    result = recognize_gesture(feature_sequence_list)  # Pass list of numpy arrays
-
-                    # Если жест распознан с достаточной уверенностью, добавить в очередь результатов
-                    if result and result.get("gesture"): 
-                        logger.info(f"Распознан жест {result['gesture']} с уверенностью {result['confidence']:.2f}")
-                        result['client_timestamp'] = client_timestamp
-                        result['server_received_timestamp'] = server_received_timestamp
-                        result['recognition_timestamp'] = str(int(time.time() * 1000))
-                        try:
-                            result_queue.put_nowait(result)
-                            #logger.debug(f"Результат '{result['gesture']}' добавлен в очередь. Размер: {result_queue.qsize()}")
-                        except queue.Full:
-                             logger.warning("Очередь результатов полна, результат пропущен!")
-                    else:
-                        logger.info("Жест из последовательности не распознан (низкая уверенность или ошибка).")
-
-                except (ValueError, TypeError) as e:
-                    logger.error(f"Ошибка преобразования последовательности признаков в число с плавающей точкой: {e}. Data: {str(features)[:100]}...")
-                    return jsonify({"status": "error", "message": "Non-numeric data in sequence features"}), 400
-                except Exception as e:
-                    logger.exception(f"Ошибка обработки последовательности функций: {str(e)}")
-                    return jsonify({"status": "error", "message": f"Sequence processing error: {str(e)}"}), 500
-            else:
-                logger.info("Автоматическое распознавание отключено, последовательность функций игнорируется.")
-                return jsonify({"status": "success", "message": "Sequence received (auto-recognition disabled)", "timestamp": server_received_timestamp}), 200
-
-        # Неверное количество признаков
-        else:
-            msg = f"Неверное количество признаков. Ожидалось 126 или 1260, получено: {num_features_received}"
-            logger.error(msg)
-            return jsonify({"status": "error", "message": msg}), 400
+        session_id = resolve_session_id(request, payload)
+        server_received_timestamp = str(int(time.time() * 1000))
 
-        return jsonify({"status": "success", "message": "Features received", "timestamp": server_received_timestamp})
+        if not AUTO_RECOGNITION_ENABLED:
+            logger.info("Автоматическое распознавание отключено, пакет кадров игнорируется.")
+            return jsonify({"status": "success", "message": "Batch received (auto-recognition disabled)", "timestamp": server_received_timestamp}), 200
+
+        # Кадры без рук пропускаются, как и при покадровой загрузке
+        accepted = np.array([status == FRAME_ACCEPTED for status in statuses])
+        empty = accepted & (masks == MASK_NONE)
+        for i in np.flatnonzero(empty):
+            statuses[i] = FRAME_SKIPPED_EMPTY
+        accepted &= ~empty
+
+        accepted_count = int(accepted.sum())
+        retry_after, suggested_fps = 0.0, None
+        if accepted_count:
+            accepted_indices = np.flatnonzero(accepted)
+            # Кадры сверх доли клиента отклоняются с конца пакета, первые кадры принимаются
+            admitted, retry_after, suggested_fps = admission_controller.admit(session_id, frames=accepted_count, partial=True,
+                                                                              client_key=resolve_client_key(request))
+            if admitted < accepted_count:
+                for i in accepted_indices[admitted:]:
+                    statuses[i] = FRAME_RATE_LIMITED
+                accepted_indices = accepted_indices[:admitted]
+                accepted_count = admitted
+
+        if accepted_count:
+            # Один элемент очереди на пакет: кадры попадают в буфер сессии атомарно и по порядку
+            data_to_queue = {
+                'features': frames[accepted_indices],  # numpy array (N, 126)
+                'hands': masks[accepted_indices],  # маски рук кадров (N,)
+                'timestamps': [timestamps[i] or server_received_timestamp for i in accepted_indices],
+                'timestamp': server_received_timestamp,
+                'type': 'features_batch',
+                'session_id': session_id,
+                'received_at': received_at
+            }
+            if not _enqueue(data_to_queue):
+                for i in accepted_indices:
+                    statuses[i] = FRAME_DROPPED
+                accepted_count = 0
+
+        for status in statuses:
+            FRAMES.labels(status=status).inc()
+
+        response = {
+            "status": "success",
+            "message": f"Accepted {accepted_count} of {len(statuses)} frames",
+            "timestamp": server_received_timestamp,
+            "accepted": accepted_count,
+            "frames": statuses,
+            "suggested_fps": suggested_fps
+        }
+        if any(status == FRAME_DROPPED for status in statuses):
+            return _json_response(_overloaded_body(**{k: response[k] for k in ("timestamp", "accepted", "frames")}), 503)
+        if any(status == FRAME_RATE_LIMITED for status in statuses):
+            return _json_response(_rate_limited_body(retry_after, suggested_fps,
+                                                     **{k: response[k] for k in ("timestamp", "accepted", "frames")}), 429)
+        if all(status == FRAME_INVALID for status in statuses):
+            response["status"] = "error"
+            return _json_response(response, 400)
+        return _json_response(response, 200)
 
     except Exception as e:
-        logger.exception(f"Критическая ошибка обработки/запроса признаков: {str(e)}")
-        return jsonify({"error": "Internal server error processing features"}), 500
+        logger.exception(f"Критическая ошибка обработки пакета признаков: {str(e)}")
+        return jsonify({"error": "Internal server error processing feature batch"}), 500
 
 # Маршрут для получения результатов распознавания жестов
 @gesture_bp.route('/translation', methods=['GET'])
 def get_translation():
     #logger.debug(f"Запрос к /translation от {request.remote_addr}")
     try:
-        try:
-            result = result_queue.get_nowait() 
-            result_queue.task_done()
-            logger.info(f"Жест='{result.get('gesture', 'N/A')}', Уверенность={result.get('confidence', 0.0):.2f}, ID={result.get('class_id', -1)}")
+        session_id = resolve_session_id(request)
+
+        # Long-poll: ?wait=<сек> — ожидание результата вместо немедленного пустого ответа
+        wait = request.args.get('wait', type=float)
+        if wait is not None and wait > 0:
+            if not acquire_long_request(_long_poll_slots):
+                logger.warning("Превышено количество ожидающих запросов /translation.")
+                return _too_many_waiters("Too many pending long-poll requests")
+            try:
+                result = session_registry.wait_result(session_id, min(wait, Config.LONG_POLL_MAX_TIMEOUT))
+            finally:
+                release_long_request(_long_poll_slots)
+        else:
+            session = session_registry.get(session_id)
+            result = None
+            if session is not None:
+                try:
+                    result = session.results.get_nowait()
+                    session.results.task_done()
+                except queue.Empty:
+                    pass
+
+        if result is not None:
+            logger.info("Жест='%s', Уверенность=%.2f, ID=%s", result.get('gesture', 'N/A'), result.get('confidence', 0.0),
+                        result.get('class_id', -1), extra=rate_limited())
 
             result['server_timestamp_ms'] = int(time.time() * 1000)
             return jsonify(result)
-        
+
         # Нет новых результатов - нормальное состояние, если нет жестов
-        except queue.Empty: 
-            #logger.debug("В очереди нет новых результатов.")
-            return jsonify({
-                "gesture": "",
-                "confidence": 0.0,
-                "class_id": -1,
-                "server_timestamp_ms": int(time.time() * 1000)
-            })
+        #logger.debug("В очереди нет новых результатов.")
+        return jsonify({
+            "gesture": "",
+            "confidence": 0.0,
+            "class_id": -1,
+            "server_timestamp_ms": int(time.time() * 1000)
+        })
     except Exception as e:
         logger.exception(f"Ошибка отправки перевода: {str(e)}")
         return jsonify({"error": "Internal server error getting translation"}), 500
 
+# Маршрут для получения результатов распознавания потоком Server-Sent Events
+@gesture_bp.route('/translation/stream', methods=['GET'])
+def stream_translation():
+    session_id = resolve_session_id(request)
+
+    if not acquire_long_request(_sse_slots):
+        logger.warning("Превышено количество SSE-потоков /translation/stream.")
+        return _too_many_waiters("Too many open translation streams")
+
+    def generate():
+        last_sent = time.monotonic()
+        yield "retry: 1000\n\n"
+        while True:
+            result = session_registry.wait_result(session_id, timeout=1.0)
+            if result is not None:
+                result['server_timestamp_ms'] = int(time.time() * 1000)
+                yield f"event: result\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= Config.SSE_HEARTBEAT_INTERVAL:
+                # Комментарий-heartbeat: позволяет обнаружить закрытое соединение
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Слот освобождается при закрытии ответа, даже если генератор не был запущен
+    response.call_on_close(lambda: release_long_request(_sse_slots))
+    logger.info(f"Открыт SSE-поток результатов для сессии {session_id}")
+    return response
+
 # Маршрут для получения информации о поддерживаемых жестах
 @gesture_bp.route('/toggle_auto_recognition', methods=['POST'])
 def toggle_auto_recognition():
@@ -214,7 +409,10 @@ def toggle_auto_recognition():
                 logger.info(f"Автораспознавание изменено на: {'ВКЛЮЧЕНО' if AUTO_RECOGNITION_ENABLED else 'ВЫКЛЮЧЕНО'}")
 
                 # Загрузка модели, если еще не загружена
-                if AUTO_RECOGNITION_ENABLED and get_model() is None:
+                if AUTO_RECOGNITION_ENABLED and Config.INFERENCE_WORKERS > 0:
+                    # Процессы инференса загружают модель самостоятельно
+                    get_inference_executor().start()
+                elif AUTO_RECOGNITION_ENABLED and get_model() is None:
                     logger.info("Попытка загрузить модель после включения автоматического распознавания...")
                     if not load_model():
                         logger.error("Не удалось загрузить модель после включения режима!")
@@ -227,10 +425,9 @@ def toggle_auto_recognition():
                         try: feature_data_queue.get_nowait()
                         except queue.Empty: break
                         feature_data_queue.task_done()
-                    while not result_queue.empty():
-                        try: result_queue.get_nowait()
-                        except queue.Empty: break
-                        result_queue.task_done()
+                    for session in session_registry.sessions():
+                        session.clear_results()
+                        session.reset()
                     logger.info("Очереди признаков и результатов очищены.")
 
             return jsonify({"status": "success", "auto_recognition": AUTO_RECOGNITION_ENABLED})
@@ -0,0 +1,29 @@
+import logging
+import os
+from flask import Blueprint, jsonify
+
+from serving import readiness, uptime
+
+logger = logging.getLogger(__name__)
+
+# Blueprint-объект для проверок состояния процесса (балансировщик, оркестратор)
+health_bp = Blueprint('health', __name__)
+
+
+# Маршрут проверки живости: процесс отвечает на запросы
+@health_bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "alive", "pid": os.getpid(), "uptime": uptime()})
+
+
+# Маршрут проверки готовности: фоновые потоки запущены, модель загружена (loading/failed — 503)
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    is_ready, checks, model_state = readiness()
+    status = 200 if is_ready else 503
+    return jsonify({
+        "status": "ready" if is_ready else "not_ready",
+        "pid": os.getpid(),
+        "checks": checks,
+        "model": model_state
+    }), status
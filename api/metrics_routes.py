@@ -0,0 +1,28 @@
+import logging
+from flask import Blueprint, Response
+
+from api.admission import admission_controller, queue_occupancy
+from recognition.feature_collector import feature_data_queue
+from recognition.session_registry import session_registry
+from recognition.inference_executor import get_inference_executor
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Blueprint-объект для экспорта метрик в формате Prometheus
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Текущие размеры очередей и количество сессий
+registry.gauge('slr_feature_queue_size', 'Элементов в очереди признаков', feature_data_queue.qsize)
+registry.gauge('slr_feature_queue_occupancy', 'Заполненность очереди признаков (0..1)', queue_occupancy)
+registry.gauge('slr_sessions_active', 'Активных сессий распознавания', lambda: len(session_registry))
+registry.gauge('slr_inference_pending', 'Окон, ожидающих инференса', lambda: get_inference_executor().stats()["pending"])
+registry.gauge('slr_admission_clients', 'Клиентов с корзиной ограничения скорости', lambda: admission_controller.stats()["clients"])
+
+
+# Маршрут метрик для Prometheus
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,97 @@
+import hmac
+import logging
+from flask import Blueprint, jsonify, request
+
+from config import Config
+from recognition.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Blueprint-объект для управления моделями (загрузка резервной модели, переключение, A/B-разделение)
+model_bp = Blueprint('models', __name__)
+
+
+@model_bp.before_request
+def _check_admin_token():
+    # Управление моделями доступно только при заданном MODEL_ADMIN_TOKEN
+    if not Config.MODEL_ADMIN_TOKEN:
+        return jsonify({"status": "error", "message": "Model management is disabled"}), 403
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), Config.MODEL_ADMIN_TOKEN.encode()):
+        return jsonify({"status": "error", "message": "Invalid admin token"}), 403
+    return None
+
+
+def _error(e, status):
+    return jsonify({"status": "error", "message": e.args[0] if e.args else str(e)}), status
+
+
+# Маршрут списка моделей процесса
+@model_bp.route('/models', methods=['GET'])
+def list_models():
+    return jsonify(model_registry.stats())
+
+
+# Маршрут загрузки модели в фоне (ответ сразу, готовность — по GET /models)
+@model_bp.route('/models', methods=['POST'])
+def register_model():
+    data = request.get_json(silent=True) or {}
+    name = data.get('name')
+    path = data.get('path')
+    if not name or not path:
+        return jsonify({"status": "error", "message": "Fields 'name' and 'path' are required"}), 400
+
+    traffic = data.get('traffic')
+    if traffic is not None and not (isinstance(traffic, (int, float)) and 0.0 < traffic < 1.0):
+        return jsonify({"status": "error", "message": "Field 'traffic' must be between 0 and 1"}), 400
+
+    try:
+        entry = model_registry.register(name, path, data.get('backend'),
+                                        activate=bool(data.get('activate')), traffic=traffic)
+    except ValueError as e:
+        return _error(e, 409)
+    except RuntimeError as e:
+        return _error(e, 400)
+
+    logger.info(f"Запущена загрузка модели {name} из {path}")
+    return jsonify({"status": "loading", "model": entry.info()}), 202
+
+
+# Маршрут переключения новых окон на готовую модель
+@model_bp.route('/models/<name>/activate', methods=['POST'])
+def activate_model(name):
+    try:
+        entry = model_registry.activate(name)
+    except KeyError as e:
+        return _error(e, 404)
+    except ValueError as e:
+        return _error(e, 409)
+    return jsonify({"status": "success", "active": entry.name})
+
+
+# Маршрут A/B-разделения трафика: {"weights": {"имя": вес, ...}}, пустой словарь — только активная модель
+@model_bp.route('/models/split', methods=['PUT'])
+def set_model_split():
+    data = request.get_json(silent=True) or {}
+    weights = data.get('weights')
+    if not isinstance(weights, dict) or not all(isinstance(w, (int, float)) for w in weights.values()):
+        return jsonify({"status": "error", "message": "Field 'weights' must map model names to numbers"}), 400
+    try:
+        model_registry.set_split(weights)
+    except KeyError as e:
+        return _error(e, 404)
+    except ValueError as e:
+        return _error(e, 409)
+    return jsonify({"status": "success", "split": model_registry.split()})
+
+
+# Маршрут удаления модели, не обрабатывающей трафик
+@model_bp.route('/models/<name>', methods=['DELETE'])
+def unregister_model(name):
+    try:
+        model_registry.unregister(name)
+    except KeyError as e:
+        return _error(e, 404)
+    except ValueError as e:
+        return _error(e, 409)
+    return jsonify({"status": "success"})
@@ -0,0 +1,47 @@
+import hashlib
+
+from models.auth_token import token_cache
+
+SESSION_HEADER = 'X-Session-Id'
+
+
+def _bearer_token(request):
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split('Bearer ')[1]
+    return None
+
+
+def resolve_client_key(request):
+    """
+    Ключ клиента для ограничения скорости, который нельзя сменить параметрами запроса:
+    пользователь проверенного токена авторизации или IP-адрес клиента.
+    Токен ищется только в кэше проверенных токенов, без запроса к базе на каждый кадр.
+    """
+    token = _bearer_token(request)
+    if token:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return f"user:{cached[0]}"
+    return f"ip:{request.remote_addr}"
+
+
+def resolve_session_id(request, payload=None):
+    """
+    Определение ключа сессии распознавания для запроса.
+    Порядок: заголовок X-Session-Id, параметр запроса session_id (для WebSocket и EventSource,
+    где заголовки задать нельзя), поле session_id в теле, токен авторизации, IP-адрес клиента.
+    """
+    session_id = request.headers.get(SESSION_HEADER) or request.args.get('session_id')
+    if session_id:
+        return f"sid:{session_id}"
+
+    if isinstance(payload, dict) and payload.get('session_id'):
+        return f"sid:{payload['session_id']}"
+
+    token = _bearer_token(request)
+    if token:
+        # В ключ (и в логи) попадает только отпечаток токена, а не сам токен
+        return f"token:{hashlib.sha256(token.encode()).hexdigest()[:16]}"
+
+    return f"ip:{request.remote_addr}"
@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+import time
+from flask import Blueprint, request, jsonify
+
+try:
+    from flask_sock import Sock
+except ImportError:  # flask-sock — необязательная зависимость
+    Sock = None
+
+from api.feature_decoding import FeatureDecodeError, FRAME_INVALID, decode_features_message
+from api.gesture_routes import acquire_long_request, ingest_features, release_long_request
+from api.session_utils import resolve_client_key, resolve_session_id
+from utils.metrics import INGEST_PARSE_SECONDS, FRAMES
+from recognition.session_registry import session_registry
+
+logger = logging.getLogger(__name__)
+
+# Blueprint-объект для потокового канала (WebSocket): кадры от клиента, результаты клиенту
+stream_bp = Blueprint('stream', __name__)
+
+sock = Sock() if Sock is not None else None
+
+
+def _send_json(ws, send_lock, payload):
+    with send_lock:
+        ws.send(json.dumps(payload, ensure_ascii=False))
+
+
+def _push_results(ws, session_id, send_lock, stop_event):
+    """Отправка результатов сессии клиенту сразу после распознавания."""
+    while not stop_event.is_set():
+        result = session_registry.wait_result(session_id, timeout=0.5)
+        if result is None:
+            continue
+
+        result['server_timestamp_ms'] = int(time.time() * 1000)
+        try:
+            _send_json(ws, send_lock, {"type": "result", **result})
+        except Exception as e:
+            logger.info(f"Потоковый канал сессии {session_id} закрыт при отправке результата: {str(e)}")
+            stop_event.set()
+
+
+def stream(ws):
+    """
+    Потоковый канал: клиент отправляет кадры (JSON-текст как в /features или float32 бинарно),
+    сервер отправляет результаты распознавания по мере готовности.
+    """
+    session_id = resolve_session_id(request)
+    client_key = resolve_client_key(request)
+    # Канал занимает поток обработки запросов на все время соединения
+    if not acquire_long_request():
+        logger.warning("Превышено количество долгих запросов, потоковый канал сессии %s отклонен.", session_id)
+        ws.send(json.dumps({"type": "error", "status": 503, "message": "Too many open streams", "retry_after": 1.0}))
+        return
+    try:
+        _stream_frames(ws, session_id, client_key)
+    finally:
+        release_long_request()
+
+
+def _stream_frames(ws, session_id, client_key):
+    send_lock = threading.Lock()
+    stop_event = threading.Event()
+
+    sender = threading.Thread(
+        target=_push_results,
+        args=(ws, session_id, send_lock, stop_event),
+        daemon=True,
+        name="StreamResultSender"
+    )
+    sender.start()
+    logger.info(f"Открыт потоковый канал для сессии {session_id}")
+
+    try:
+        while not stop_event.is_set():
+            message = ws.receive(timeout=1.0)
+            if message is None:
+                continue
+
+            received_at = time.monotonic()
+            try:
+                features, mask, client_timestamp, _ = decode_features_message(message)
+            except FeatureDecodeError as e:
+                FRAMES.labels(status=FRAME_INVALID).inc()
+                _send_json(ws, send_lock, {"type": "error", "status": e.status, "message": e.message})
+                continue
+            INGEST_PARSE_SECONDS.labels(endpoint='stream').observe(time.monotonic() - received_at)
+
+            # Та же проверка и постановка в очередь, что и для POST /features
+            body, status = ingest_features(features, client_timestamp, session_id, received_at, mask,
+                                           client_key=client_key)
+            if status != 200 or body.get("status") == "error":
+                message = {"type": "error", "status": status, "message": body.get("message")}
+                # Подсказка клиенту: через сколько повторить и с какой частотой отправлять кадры
+                for key in ("retry_after", "suggested_fps"):
+                    if body.get(key) is not None:
+                        message[key] = body[key]
+                _send_json(ws, send_lock, message)
+    finally:
+        stop_event.set()
+        sender.join(timeout=2.0)
+        logger.info(f"Закрыт потоковый канал для сессии {session_id}")
+
+
+if sock is not None:
+    sock.route('/stream', bp=stream_bp)(stream)
+else:
+    @stream_bp.route('/stream', methods=['GET'])
+    def stream_unavailable():
+        return jsonify({"status": "error", "message": "WebSocket streaming is not available (flask-sock is not installed)"}), 501
@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from flask import Flask, jsonify, request
-import threading
 import sys
 import codecs
 
@@ -11,72 +10,89 @@ if sys.platform == 'win32':
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer)
 
 from config import Config
-from database.db_manager import init_db
-from recognition.model_loader import AUTO_RECOGNITION_ENABLED, load_model
-from recognition.feature_collector import process_feature_sequences
+from database.db_manager import init_app as init_db_app
+from recognition.model_loader import AUTO_RECOGNITION_ENABLED
+from recognition.inference_executor import get_inference_executor
 from api.auth_routes import auth_bp
 from api.gesture_routes import gesture_bp
-from utils.logger import setup_logger
-
-# Инициализация Flask приложения
-app = Flask(__name__)
-
-# Загрузка конфигурации из config.py
-app.config.from_object(Config)
+from api.stream_routes import stream_bp
+from api.health_routes import health_bp
+from api.metrics_routes import metrics_bp
+from api.model_routes import model_bp
+from serving import init_server, start_worker
+from utils.logger import setup_logger, get_logging_stats
 
 # Запуск логирования
 logger = setup_logger()
 
-# Регистрация API-маршрутов
-app.register_blueprint(auth_bp, url_prefix='/api')
-app.register_blueprint(gesture_bp)
-
-# Корневой маршрут (health check)
-@app.route('/', methods=['GET'])
+# Корневой маршрут (сводка состояния сервера)
 def index():
-    from recognition.model_loader import model
-    from recognition.feature_collector import feature_data_queue, result_queue
+    from recognition.feature_collector import feature_data_queue, get_windowing_stats
+    from recognition.session_registry import session_registry
+    from recognition.gesture_processor import prediction_cache
+    from recognition.model_registry import model_registry
+    from recognition.window_gate import get_gate_stats
+    from api.admission import admission_controller
+    from models.auth_token import token_cache
+    from database.db_manager import connection_pool
+    from models.password_hashing import password_hasher
     
     logger.info(f"Request to / from {request.remote_addr}")
     
-    # Проверка статуса модели
-    model_status = "Not loaded"
-    if model is not None:
-        model_status = "Loaded and ready"
-    elif AUTO_RECOGNITION_ENABLED:
-        model_status = "Should be loaded (error?)"
+    # Проверка статуса модели: disabled | not_loaded | loading | ready | failed
+    model_state = get_inference_executor().state()
 
     return jsonify({
         "status": "running",
         "message": "Sign Language Recognition Server",
         "auto_recognition_enabled": AUTO_RECOGNITION_ENABLED,
-        "model_status": model_status,
+        "model_status": model_state["state"],
+        "model": model_state,
+        "model_registry": model_registry.stats(),
         "feature_queue_size": feature_data_queue.qsize(),
-        "result_queue_size": result_queue.qsize()
+        "sessions": session_registry.stats(),
+        "windowing": get_windowing_stats(),
+        "inference": get_inference_executor().stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "window_gate": get_gate_stats(),
+        "admission": admission_controller.stats(),
+        "token_cache": token_cache.stats(),
+        "database": connection_pool.stats(),
+        "password_hashing": password_hasher.stats(),
+        "logging": get_logging_stats()
     })
 
+def create_app():
+    """Создание и настройка Flask-приложения (без загрузки модели и запуска потоков)."""
+    app = Flask(__name__)
+
+    # Загрузка конфигурации из config.py
+    app.config.from_object(Config)
+
+    # Соединения с базой данных возвращаются в пул после каждого запроса
+    init_db_app(app)
+
+    # Регистрация API-маршрутов
+    app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(gesture_bp)
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(model_bp)
+
+    app.add_url_rule('/', 'index', index, methods=['GET'])
+    return app
+
 if __name__ == '__main__':
-    # Инициализация базы данных
-    with app.app_context():
-        init_db()
-    
-    # Загрузка модели и инициализация потоков
-    logger.info("Инициализация сервера...")
-    if AUTO_RECOGNITION_ENABLED:
-        logger.info("Загрузка модели распознавания жестов...")
-        if not load_model():
-             logger.error("Не удалось загрузить модель при запуске. Сервер НЕ будет запущен.")
-             exit(1)
-        logger.info("Модель успешно загружена.")
+    # Сервер разработки (Werkzeug). Для production: gunicorn -c gunicorn.conf.py wsgi:app
+    app = create_app()
 
-    # Запуск фонового потока для обработки последовательностей признаков
-    # При daemon=True поток будет завершен при завершении основного потока
-    processing_thread = threading.Thread(
-        target=process_feature_sequences, 
-        daemon=True, 
-        name="FeatureProcessorThread"
-    )
-    processing_thread.start()
+    # Инициализация базы данных, загрузка модели и запуск фоновых потоков
+    logger.info("Инициализация сервера...")
+    if not init_server(app):
+        logger.error("Не удалось загрузить модель при запуске. Сервер НЕ будет запущен.")
+        exit(1)
+    start_worker()
 
     logger.info(f"Запуск Flask-сервера на порту {Config.PORT}...")
     logger.info(f"Автоматическое распознавание при запуске: {'ВКЛЮЧЕНО' if Config.AUTO_RECOGNITION_ENABLED else 'ВЫКЛЮЧЕНО'}")
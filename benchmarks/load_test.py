@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Нагрузочный тест конвейера распознавания: N клиентов отправляют синтетические кадры
+(126 значений) с заданной частотой и опрашивают /translation.
+
+Приложение запускается в том же процессе (по умолчанию, без сети) или тестируется
+по адресу уже запущенного сервера (--url http://127.0.0.1:5000).
+
+Примеры:
+    python -m benchmarks.load_test --clients 8 --fps 30 --duration 20
+    python -m benchmarks.load_test --clients 32 --backend numpy --format binary --output run.json
+    python -m benchmarks.load_test --hands 1 --compact --format binary
+
+Результат — JSON (пропускная способность, p50/p99 задержек, доля потерянных кадров,
+распознаваний в секунду) для сравнения запусков между собой.
+'''
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition.hand_mask import COMPACT_SIZE_BY_MASK, HAND_FEATURES, MASK_ALL
+
+NUM_FEATURES = 126
+
+
+class InProcessTransport:
+    '''Запросы к приложению Flask внутри процесса (тестовый клиент на каждый поток).'''
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.get_data()
+
+
+class HttpTransport:
+    '''Запросы к запущенному серверу по HTTP (keep-alive соединение на каждый поток).'''
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self._local.connection = None
+            raise
+
+
+def _parse_metrics(text):
+    """Значения счетчиков из текстового формата Prometheus: {'имя{метки}': значение}."""
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, _, value = line.rpartition(' ')
+        try:
+            values[name] = float(value)
+        except ValueError:
+            continue
+    return values
+
+
+def _read_metrics(transport):
+    status, body = transport.request('GET', '/metrics')
+    return _parse_metrics(body.decode('utf-8')) if status == 200 else {}
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return {"count": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    values = np.asarray(latencies) * 1000.0
+    return {
+        "count": int(values.size),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+class ClientStats:
+    def __init__(self):
+        self.frame_latencies = []
+        self.poll_latencies = []
+        self.frame_status = {}
+        self.bytes_sent = 0
+        self.recognitions = 0
+        self.errors = 0
+
+
+def run_client(index, transport, args, deadline, stats):
+    """Один клиент: кадры с частотой fps (случайное блуждание позы руки) и опрос результатов."""
+    rng = np.random.default_rng(args.seed + index)
+    session_id = f"bench-{index}"
+    frame = rng.random(NUM_FEATURES, dtype=np.float32)
+    frame_interval = 1.0 / args.fps
+    poll_interval = args.poll_interval
+    next_frame = time.monotonic() + rng.random() * frame_interval  # клиенты не синхронны
+    next_poll = next_frame + poll_interval
+
+    if args.format == 'binary':
+        headers = {'Content-Type': 'application/octet-stream', 'X-Session-Id': session_id}
+    else:
+        headers = {'Content-Type': 'application/json', 'X-Session-Id': session_id}
+    # Видна только первая рука (--hands 1) — компактный кадр передает только ее значения
+    mask = MASK_ALL if args.hands == 2 else 1
+    if args.compact and args.format == 'binary':
+        headers['X-Hands'] = str(mask)
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        if now < min(next_frame, next_poll):
+            time.sleep(min(next_frame, next_poll) - now)
+            continue
+
+        try:
+            if now >= next_frame:
+                frame = np.clip(frame + rng.normal(0.0, 0.01, NUM_FEATURES).astype(np.float32), 0.0, 1.0)
+                if args.hands == 1:
+                    frame[HAND_FEATURES:] = 0.0
+                values = frame[:COMPACT_SIZE_BY_MASK[mask]] if args.compact else frame
+                if args.format == 'binary':
+                    body = values.astype('<f4').tobytes()
+                else:
+                    message = {"features": values.tolist(), "timestamp": str(int(time.time() * 1000))}
+                    if args.compact:
+                        message["hands"] = mask
+                    body = json.dumps(message)
+                stats.bytes_sent += len(body)
+                started = time.monotonic()
+                status, _ = transport.request('POST', '/features', body=body, headers=headers)
+                stats.frame_latencies.append(time.monotonic() - started)
+                stats.frame_status[status] = stats.frame_status.get(status, 0) + 1
+                next_frame += frame_interval
+                if next_frame < now:  # клиент не успевает — кадры не накапливаются
+                    next_frame = now + frame_interval
+            else:
+                started = time.monotonic()
+                status, body = transport.request('GET', '/translation', headers={'X-Session-Id': session_id})
+                stats.poll_latencies.append(time.monotonic() - started)
+                if status == 200 and json.loads(body).get('gesture'):
+                    stats.recognitions += 1
+                next_poll += poll_interval
+        except Exception:
+            stats.errors += 1
+
+
+def _counter_delta(before, after, name):
+    return int(after.get(name, 0.0) - before.get(name, 0.0))
+
+
+def run_benchmark(args, transport):
+    before = _read_metrics(transport)
+
+    deadline = time.monotonic() + args.duration
+    stats = [ClientStats() for _ in range(args.clients)]
+    threads = [threading.Thread(target=run_client, args=(i, transport, args, deadline, stats[i]),
+                                daemon=True, name=f"BenchClient-{i}") for i in range(args.clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    time.sleep(args.drain)  # окна, отправленные в конце, успевают пройти инференс
+    after = _read_metrics(transport)
+
+    frame_latencies = [x for s in stats for x in s.frame_latencies]
+    poll_latencies = [x for s in stats for x in s.poll_latencies]
+    frame_status = {}
+    for s in stats:
+        for status, count in s.frame_status.items():
+            frame_status[str(status)] = frame_status.get(str(status), 0) + count
+
+    frames_accepted = _counter_delta(before, after, 'slr_frames_total{status="accepted"}')
+    frames_dropped = _counter_delta(before, after, 'slr_frames_total{status="dropped"}')
+    frames_sent = len(frame_latencies)
+    recognized = _counter_delta(before, after, 'slr_results_total{outcome="recognized"}')
+
+    return {
+        "config": {
+            "mode": "http" if args.url else "in_process",
+            "url": args.url,
+            "clients": args.clients,
+            "fps": args.fps,
+            "duration_s": args.duration,
+            "poll_interval_s": args.poll_interval,
+            "format": args.format,
+            "hands": args.hands,
+            "compact": args.compact,
+            "backend": os.environ.get('INFERENCE_BACKEND'),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round((frames_sent + len(poll_latencies)) / elapsed, 1),
+        "frames": {
+            "sent": frames_sent,
+            "target_per_s": args.clients * args.fps,
+            "sent_per_s": round(frames_sent / elapsed, 1),
+            "bytes_per_frame": round(sum(s.bytes_sent for s in stats) / frames_sent, 1) if frames_sent else 0.0,
+            "http_status": frame_status,
+            "accepted": frames_accepted,
+            "dropped": frames_dropped,
+            "drop_rate": round(frames_dropped / frames_sent, 4) if frames_sent else 0.0,
+            "latency": _percentiles(frame_latencies),
+        },
+        "translation": {
+            "polls": len(poll_latencies),
+            "results_received": sum(s.recognitions for s in stats),
+            "latency": _percentiles(poll_latencies),
+        },
+        "recognition": {
+            "windows_evaluated": _counter_delta(before, after, 'slr_windows_total{outcome="evaluated"}'),
+            "recognized": recognized,
+            "recognitions_per_s": round(recognized / elapsed, 2),
+            "frame_to_result_mean_ms": _histogram_mean_ms(before, after, 'slr_frame_to_result_seconds'),
+            "inference_mean_ms": _histogram_mean_ms(before, after, 'slr_inference_seconds'),
+        },
+        "client_errors": sum(s.errors for s in stats),
+    }
+
+
+def _histogram_mean_ms(before, after, name):
+    count = after.get(f'{name}_count', 0.0) - before.get(f'{name}_count', 0.0)
+    total = after.get(f'{name}_sum', 0.0) - before.get(f'{name}_sum', 0.0)
+    return round(total / count * 1000.0, 3) if count else None
+
+
+def _in_process_transport():
+    from app import create_app
+    from serving import init_server, start_worker
+
+    app = create_app()
+    if not init_server(app):
+        raise SystemExit("Не удалось загрузить модель")
+    start_worker()
+    return InProcessTransport(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера распознавания жестов")
+    parser.add_argument('--clients', type=int, default=8, help="количество одновременных клиентов (камер)")
+    parser.add_argument('--fps', type=float, default=30.0, help="кадров в секунду на клиента")
+    parser.add_argument('--duration', type=float, default=10.0, help="длительность теста (сек)")
+    parser.add_argument('--poll-interval', type=float, default=0.2, help="интервал опроса /translation (сек)")
+    parser.add_argument('--format', choices=('json', 'binary'), default='json', help="формат отправки кадров")
+    parser.add_argument('--hands', type=int, choices=(1, 2), default=2, help="рук в синтетических кадрах")
+    parser.add_argument('--compact', action='store_true', help="компактные кадры с маской рук (только присутствующие руки)")
+    parser.add_argument('--url', default=None, help="адрес запущенного сервера (по умолчанию — приложение в процессе)")
+    parser.add_argument('--backend', default=None, help="INFERENCE_BACKEND для режима в процессе (keras | numpy | tflite)")
+    parser.add_argument('--model', default=None, help="MODEL_PATH для режима в процессе")
+    parser.add_argument('--drain', type=float, default=0.5, help="ожидание завершения инференса после теста (сек)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="файл для JSON-результата (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    if args.url:
+        transport = HttpTransport(args.url)
+    else:
+        # Настройки читаются классом Config при импорте приложения
+        if args.backend:
+            os.environ['INFERENCE_BACKEND'] = args.backend
+        if args.model:
+            os.environ['MODEL_PATH'] = args.model
+        os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.gettempdir(), 'slr_benchmark.db'))
+        transport = _in_process_transport()
+
+    report = run_benchmark(args, transport)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Память и время подготовки одного окна (10, 126) перед инференсом.
+
+Сравниваются прежняя подготовка (список кадров, проверка формы каждого кадра в цикле,
+повторная сборка массива) и FeatureWindow (представление без копирования, одна векторная
+проверка, статистика окна вычисляется один раз и используется фильтром и проверкой качества).
+
+Для каждого варианта: сколько раз копируется окно, пиковый объем временной памяти
+на одно окно (tracemalloc) и время подготовки. С --check завершается с кодом 1,
+если FeatureWindow копирует окно или выделяет больше памяти, чем прежний вариант.
+
+    python -m benchmarks.window_allocations [--windows 2000] [--check]
+'''
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recognition.feature_window import FeatureWindow, WINDOW_SHAPE
+from recognition.window_gate import WindowStats
+
+
+def legacy_prepare(features):
+    """Прежний путь запроса из 1260 значений до массива для модели."""
+    sequence = features.reshape(WINDOW_SHAPE)
+    frames = [frame for frame in sequence]
+    if not all(isinstance(frame, np.ndarray) for frame in frames) or len(frames) != WINDOW_SHAPE[0]:
+        raise ValueError("invalid")
+    for frame in frames:
+        if frame.shape != (WINDOW_SHAPE[1],):
+            raise ValueError("invalid")
+    window = np.array(frames, dtype=np.float32)
+    non_zero_percentage = np.count_nonzero(window) / window.size * 100
+    WindowStats(window)  # фильтр окна вычислял статистику заново
+    return window, non_zero_percentage
+
+
+def window_prepare(features):
+    """Текущий путь: FeatureWindow поверх массива запроса."""
+    window = FeatureWindow.wrap(features).validate()
+    return window.data, window.stats.hand_frame_ratio * 100
+
+
+def measure(prepare, inputs):
+    # Копии окна: результат не разделяет память с входным массивом
+    copies = sum(0 if np.shares_memory(prepare(features)[0], features) else 1 for features in inputs[:100]) / 100
+
+    peaks = []
+    tracemalloc.start()
+    for features in inputs[:200]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = prepare(features)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        del result
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for features in inputs:
+        prepare(features)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "window_copies": copies,
+        "peak_bytes_per_window": int(np.median(peaks)),
+        "us_per_window": round(elapsed / len(inputs) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Память и время подготовки окна перед инференсом")
+    parser.add_argument('--windows', type=int, default=2000, help="количество окон")
+    parser.add_argument('--check', action='store_true', help="код 1, если FeatureWindow копирует окно или выделяет больше памяти")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Массивы, как после разбора запроса: (1260,) float32
+    inputs = [rng.random(WINDOW_SHAPE[0] * WINDOW_SHAPE[1], dtype=np.float32) for _ in range(args.windows)]
+
+    report = {
+        "window_bytes": inputs[0].nbytes,
+        "legacy": measure(legacy_prepare, inputs),
+        "feature_window": measure(window_prepare, inputs),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.check:
+        current, legacy = report["feature_window"], report["legacy"]
+        passed = current["window_copies"] == 0 and current["peak_bytes_per_window"] <= legacy["peak_bytes_per_window"]
+        sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
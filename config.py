@@ -8,8 +8,36 @@ class Config:
     
     
     MODEL_PATH = os.environ.get('MODEL_PATH', 'model_lstm_drop.h5') # путь к модели определения жестов
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras').lower() # бэкенд инференса: keras | numpy (без TensorFlow) | tflite (квантованная модель)
+    TFLITE_QUANTIZATION = os.environ.get('TFLITE_QUANTIZATION', 'int8_dynamic').lower() # вариант модели для бэкенда tflite: int8_dynamic | int8 | float16
+    TFLITE_NUM_THREADS = int(os.environ.get('TFLITE_NUM_THREADS', 1)) # потоков интерпретатора TFLite на вызов
+    MODEL_BACKGROUND_LOAD = os.environ.get('MODEL_BACKGROUND_LOAD', 'True').lower() == 'true' # загрузка модели в фоне (сервер принимает запросы сразу)
+    MODEL_ARTIFACT_CACHE = os.environ.get('MODEL_ARTIFACT_CACHE', 'True').lower() == 'true' # кэш модели .npz рядом с .h5 для бэкенда numpy
+    MODEL_CANDIDATE_PATH = os.environ.get('MODEL_CANDIDATE_PATH', '') # вторая модель для A/B-разделения, загружается в фоне в каждом процессе
+    MODEL_CANDIDATE_TRAFFIC = float(os.environ.get('MODEL_CANDIDATE_TRAFFIC', 0.1)) # доля сессий, направляемых на MODEL_CANDIDATE_PATH
+    MODEL_ADMIN_TOKEN = os.environ.get('MODEL_ADMIN_TOKEN', '') # токен заголовка X-Admin-Token для /models (пусто — управление отключено)
     DATABASE_PATH = os.environ.get('DATABASE_PATH', 'users.db') # путь к базе данных
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8)) # максимальное количество соединений с базой данных в процессе
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0)) # ожидание свободного соединения (сек)
+    DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 5.0)) # ожидание блокировки файла базы данных (сек)
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL').upper() # PRAGMA synchronous: OFF | NORMAL | FULL (NORMAL безопасен в режиме WAL)
+    DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 8192)) # PRAGMA cache_size на соединение (КБ)
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024)) # PRAGMA mmap_size (байт, 0 — отключено)
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 128)) # подготовленных запросов в кэше соединения
     PORT = int(os.environ.get('PORT', 5000)) # порт, на котором будет работать сервер
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000)) # очередь записей лога (при переполнении записи отбрасываются)
+    LOG_HOT_PATH_INTERVAL = float(os.environ.get('LOG_HOT_PATH_INTERVAL', 1.0)) # не чаще одного сообщения горячего участка за интервал (сек)
+    # Сессии распознавания, очереди результатов и переводы хранятся в памяти процесса, общего хранилища нет.
+    # При SERVER_WORKERS > 1 ядро распределяет соединения одного клиента между процессами (балансировщик
+    # не может выбрать процесс): кадры попадают в разные буферы, а опрос результатов их не находит.
+    # Кроме того, для бэкендов не из PREFORK_SAFE_BACKENDS (keras по умолчанию) каждый процесс загружает
+    # свою копию модели. Масштабирование — через SERVER_THREADS, INFERENCE_WORKERS или отдельные
+    # экземпляры сервера (каждый на своем порту) со sticky-маршрутизацией на балансировщике.
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 1)) # рабочие процессы gunicorn (production-режим), см. ограничение выше
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8)) # потоки обработки запросов в каждом рабочем процессе
+    SERVER_RESERVED_THREADS = int(os.environ.get('SERVER_RESERVED_THREADS', max(2, SERVER_THREADS // 2))) # потоки, которые не занимают долгие запросы (остаются для /features и коротких запросов)
+    MAX_LONG_REQUESTS = max(1, SERVER_THREADS - SERVER_RESERVED_THREADS) # общий предел долгих запросов процесса: WebSocket /stream, SSE и long-poll
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 60)) # перезапуск зависшего рабочего процесса (сек)
     
     # Настройки для распознавания жестов
     CONFIDENCE_THRESHOLD = float(os.environ.get('CONFIDENCE_THRESHOLD', 0.6)) # порог уверенности модели
@@ -17,6 +45,17 @@ class Config:
     
     # Настройки аутентификации
     TOKEN_EXPIRY = int(os.environ.get('TOKEN_EXPIRY', 30)) # время жизни токена
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 4096)) # максимальное количество проверенных токенов в кэше (0 — кэш отключен)
+    TOKEN_CACHE_TTL = float(os.environ.get('TOKEN_CACHE_TTL', 30.0)) # время жизни записи кэша токенов (сек)
+    TOKEN_SWEEP_INTERVAL = float(os.environ.get('TOKEN_SWEEP_INTERVAL', 300.0)) # интервал удаления просроченных токенов (сек, 0 — отключено)
+    TOKEN_SWEEP_BATCH_SIZE = int(os.environ.get('TOKEN_SWEEP_BATCH_SIZE', 500)) # токенов за одну транзакцию удаления
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14)) # параметр стоимости scrypt (степень двойки)
+    PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', 8)) # размер блока scrypt
+    PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', 1)) # параллелизм scrypt
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2)) # потоки хэширования паролей
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 16)) # ожидающих хэширования запросов сверх числа потоков (далее 503)
+    PASSWORD_HASH_MAX_WAITERS = int(os.environ.get('PASSWORD_HASH_MAX_WAITERS', max(1, SERVER_RESERVED_THREADS // 2))) # потоков обработки запросов, ожидающих хэширования одновременно (остальные 503)
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1)) # Retry-After при заполненной очереди (сек)
     
     # Поддерживаемые жесты
     SUPPORTED_GESTURES = [
@@ -30,7 +69,45 @@ class Config:
     # Очереди
     FEATURE_QUEUE_SIZE = int(os.environ.get('FEATURE_QUEUE_SIZE', 50)) # для сбора признаков
     RESULT_QUEUE_SIZE = int(os.environ.get('RESULT_QUEUE_SIZE', 20)) # для результатов распознавания
+    MAX_BATCH_FRAMES = int(os.environ.get('MAX_BATCH_FRAMES', 120)) # максимальное количество кадров в пакетной загрузке
+    ADMISSION_CLIENT_FPS = float(os.environ.get('ADMISSION_CLIENT_FPS', 30)) # кадров в секунду от одного клиента (0 — без ограничения)
+    ADMISSION_CAPACITY_FPS = float(os.environ.get('ADMISSION_CAPACITY_FPS', 0)) # кадров в секунду на процесс, делятся поровну между активными клиентами (0 — не учитывать)
+    ADMISSION_BURST_SECONDS = float(os.environ.get('ADMISSION_BURST_SECONDS', 1.0)) # запас корзины клиента в секундах его доли
+    ADMISSION_MIN_FPS = float(os.environ.get('ADMISSION_MIN_FPS', 5)) # нижняя граница доли клиента при заполненной очереди
+    ADMISSION_HIGH_WATERMARK = float(os.environ.get('ADMISSION_HIGH_WATERMARK', 0.5)) # заполненность очереди, выше которой доли клиентов уменьшаются
+    ADMISSION_SESSIONS_PER_CLIENT = float(os.environ.get('ADMISSION_SESSIONS_PER_CLIENT', 4)) # долей сессии на одного пользователя или IP-адрес (сумма по всем его сессиям)
+
+    # Ожидание результатов (/translation?wait=N и SSE-поток /translation/stream)
+    LONG_POLL_MAX_TIMEOUT = float(os.environ.get('LONG_POLL_MAX_TIMEOUT', 30.0)) # максимальное время ожидания long-poll (сек)
+    MAX_TRANSLATION_WAITERS = min(int(os.environ.get('MAX_TRANSLATION_WAITERS', MAX_LONG_REQUESTS)), MAX_LONG_REQUESTS) # максимум одновременных long-poll запросов (не больше MAX_LONG_REQUESTS)
+    MAX_SSE_STREAMS = min(int(os.environ.get('MAX_SSE_STREAMS', MAX_LONG_REQUESTS)), MAX_LONG_REQUESTS) # максимум одновременных SSE-потоков (не больше MAX_LONG_REQUESTS)
+    SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15.0)) # интервал heartbeat-комментариев SSE (сек)
     
     # Параметры для обработки последовательностей
-    MIN_RECOGNITION_INTERVAL = float(os.environ.get('MIN_RECOGNITION_INTERVAL', 0.1)) # минимальный интервал между распознаванием жестов
-    SEQUENCE_BUFFER_SIZE = int(os.environ.get('SEQUENCE_BUFFER_SIZE', 10)) # размер буфера для последовательностей
\ No newline at end of file
+    MIN_RECOGNITION_INTERVAL = float(os.environ.get('MIN_RECOGNITION_INTERVAL', 0.0)) # дополнительный минимальный интервал между распознаваниями (сек, 0 — отключен)
+    SEQUENCE_BUFFER_SIZE = int(os.environ.get('SEQUENCE_BUFFER_SIZE', 10)) # размер буфера для последовательностей
+    RECOGNITION_HOP_FRAMES = int(os.environ.get('RECOGNITION_HOP_FRAMES', 3)) # распознавание каждого k-го кадра при заполненном буфере
+    WINDOW_OVERLAP_POLICY = os.environ.get('WINDOW_OVERLAP_POLICY', 'sliding').lower() # sliding | tumbling | reset_on_result
+
+    # Фильтр окон перед инференсом (окна без рук или без движения не отправляются в модель)
+    WINDOW_GATE_ENABLED = os.environ.get('WINDOW_GATE_ENABLED', 'False').lower() == 'true' # включение фильтра (по умолчанию выключен: порог движения отсекает удерживаемые статичные жесты)
+    WINDOW_GATE_MIN_HAND_PRESENCE = float(os.environ.get('WINDOW_GATE_MIN_HAND_PRESENCE', 0.5)) # минимальная доля кадров окна, в которых видна рука
+    WINDOW_GATE_MIN_MOTION_ENERGY = float(os.environ.get('WINDOW_GATE_MIN_MOTION_ENERGY', 0.0005)) # минимальное среднее изменение координат руки между кадрами
+
+    # Сессии распознавания (отдельный буфер кадров для каждого клиента)
+    MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 100)) # максимальное количество одновременных сессий
+    SESSION_RESET_TIMEOUT = float(os.environ.get('SESSION_RESET_TIMEOUT', 5.0)) # очистка буфера сессии без новых кадров (сек)
+    SESSION_IDLE_TIMEOUT = float(os.environ.get('SESSION_IDLE_TIMEOUT', 60.0)) # удаление неактивной сессии (сек)
+
+    # Пакетный инференс (объединение окон от всех клиентов в один вызов модели)
+    INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 16)) # максимальный размер батча
+    INFERENCE_MAX_DELAY_MS = float(os.environ.get('INFERENCE_MAX_DELAY_MS', 5.0)) # максимальное ожидание окна в очереди (мс)
+    INFERENCE_BATCH_BUCKETS = os.environ.get('INFERENCE_BATCH_BUCKETS', '1,2,4,8,16') # прогреваемые размеры батчей
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 5.0)) # ожидание результата синхронным вызовом (сек)
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0)) # процессы инференса со своей копией модели (0 — инференс в процессе сервера)
+    INFERENCE_WORKER_SLOTS = int(os.environ.get('INFERENCE_WORKER_SLOTS', 64)) # слотов окон в разделяемой памяти на процесс
+
+    # Кэш прогнозов для повторяющихся окон
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024)) # максимальное количество записей (0 — кэш отключен)
+    PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 5.0)) # время жизни записи (сек)
+    PREDICTION_CACHE_PRECISION = float(os.environ.get('PREDICTION_CACHE_PRECISION', 1e-3)) # шаг квантования признаков для ключа
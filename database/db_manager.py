@@ -2,25 +2,153 @@
 # -*- coding: utf-8 -*-
 from flask import g # для хранения общих данных во время запроса
 import logging
+import os
+import queue
 import sqlite3
+import threading
 
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+class ConnectionPool:
+    '''
+    Пул соединений с SQLite для одного процесса.
+    Соединения открываются по требованию (не больше max_size), настраиваются один раз
+    (WAL, synchronous, cache_size, mmap_size) и сохраняют кэш подготовленных запросов между запросами.
+    '''
+
+    def __init__(self, path=None, max_size=None, timeout=None):
+        self.path = path or Config.DATABASE_PATH
+        self.max_size = max_size or Config.DB_POOL_SIZE
+        self.timeout = timeout if timeout is not None else Config.DB_POOL_TIMEOUT
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()  # последнее возвращенное соединение — с самым «теплым» кэшем
+        self._lock = threading.Lock()
+        self.created = 0
+        self.in_use = 0
+        self.acquired_total = 0
+        self.waits_total = 0
+        self.timeouts_total = 0
+        self.discarded_total = 0
+
+    def _check_fork(self):
+        # Соединения SQLite нельзя использовать после fork: рабочий процесс открывает свои
+        if self._pid != os.getpid():
+            self._reset_state()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=Config.DB_BUSY_TIMEOUT,
+            check_same_thread=False,  # соединение переходит между потоками через пул
+            cached_statements=Config.DB_STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row  # обращение к колонкам по имени
+
+        synchronous = Config.DB_SYNCHRONOUS if Config.DB_SYNCHRONOUS in SYNCHRONOUS_MODES else 'NORMAL'
+        journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conn.execute(f"PRAGMA cache_size={-abs(Config.DB_CACHE_SIZE_KB)}")  # отрицательное значение — размер в КБ
+        conn.execute(f"PRAGMA mmap_size={int(Config.DB_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+
+        if journal_mode.lower() != 'wal':
+            logger.warning(f"Не удалось включить WAL для {self.path}, режим журнала: {journal_mode}")
+        logger.info(f"Открыто соединение с базой данных {self.path} ({self.created}/{self.max_size})")
+        return conn
+
+    def acquire(self):
+        """Получить соединение из пула (открыть новое, если лимит не достигнут, иначе ждать свободное)."""
+        self._check_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self.created < self.max_size
+                if can_create:
+                    self.created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self.created -= 1
+                    raise
+            else:
+                with self._lock:
+                    self.waits_total += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts_total += 1
+                    raise sqlite3.OperationalError(f"Database connection pool exhausted ({self.max_size} connections)")
+
+        with self._lock:
+            self.in_use += 1
+            self.acquired_total += 1
+        return conn
+
+    def release(self, conn):
+        """Вернуть соединение в пул; незавершенная транзакция откатывается."""
+        if self._pid != os.getpid():
+            return  # соединение родительского процесса
+        with self._lock:
+            self.in_use -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Соединение с базой данных закрыто после ошибки: {str(e)}")
+            with self._lock:
+                self.created -= 1
+                self.discarded_total += 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "max_size": self.max_size,
+                "open": self.created,
+                "in_use": self.in_use,
+                "idle": self._idle.qsize(),
+                "acquired": self.acquired_total,
+                "waits": self.waits_total,
+                "timeouts": self.timeouts_total,
+                "discarded": self.discarded_total,
+            }
+
+# Общий пул соединений процесса
+connection_pool = ConnectionPool()
+
 def get_db():
-    """Подключение к базе данных."""
+    """Подключение к базе данных (одно соединение из пула на контекст приложения)."""
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(Config.DATABASE_PATH)
-        db.row_factory = sqlite3.Row  # обращение к колонкам по имени
+        db = g._database = connection_pool.acquire()
     return db
 
 def close_connection(exception):
-    """Закрытие соединения с базой данных по окончании запроса."""
-    db = getattr(g, '_database', None)
+    """Возврат соединения в пул по окончании запроса."""
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        connection_pool.release(db)
+
+def init_app(app):
+    """Регистрация возврата соединений в пул при завершении контекста приложения."""
+    app.teardown_appcontext(close_connection)
 
 def init_db():
     """Инициализация базы данных при первом запуске."""
@@ -50,4 +178,27 @@ def init_db():
     ''')
     
     db.commit()
-    logger.info("База данных инициализирована")
\ No newline at end of file
+    migrate_db(db)
+    logger.info("База данных инициализирована")
+
+# Миграции схемы: (версия, запросы). Применяются по порядку, версия хранится в PRAGMA user_version
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # Удаление токенов пользователя при входе и очистка просроченных токенов без полного просмотра таблицы
+        "CREATE INDEX IF NOT EXISTS idx_auth_tokens_user_id ON auth_tokens (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_auth_tokens_expires_at ON auth_tokens (expires_at)",
+    ]),
+]
+
+def migrate_db(db):
+    """Применение недостающих миграций схемы."""
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    for target_version, statements in SCHEMA_MIGRATIONS:
+        if target_version <= version:
+            continue
+        with db:  # одна транзакция на миграцию
+            for statement in statements:
+                db.execute(statement)
+            db.execute(f"PRAGMA user_version = {int(target_version)}")
+        logger.info(f"Применена миграция схемы базы данных до версии {target_version}")
+        version = target_version
\ No newline at end of file
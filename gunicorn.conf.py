@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+'''
+Конфигурация gunicorn для production-режима:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Сессии распознавания (буферы кадров) хранятся в памяти рабочего процесса, поэтому по умолчанию
+рабочий процесс один (см. ограничение у Config.SERVER_WORKERS).
+
+gthread: WebSocket /stream, SSE и long-poll /translation?wait занимают поток на все время соединения.
+Вместе их не больше MAX_LONG_REQUESTS = SERVER_THREADS - SERVER_RESERVED_THREADS на процесс (далее 503),
+чтобы потоки для /features оставались свободными; для большего числа потоковых клиентов
+увеличивайте SERVER_THREADS.
+'''
+from config import Config
+
+bind = f"0.0.0.0:{Config.PORT}"
+workers = Config.SERVER_WORKERS
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+timeout = Config.SERVER_TIMEOUT
+
+# Модель загружается один раз в главном процессе до fork
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Потоки главного процесса не переживают fork: запуск обработки в каждом рабочем процессе
+    from serving import start_worker
+    start_worker()
@@ -1,14 +1,98 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
-from database.db_manager import get_db
+from config import Config
+from database.db_manager import get_db, connection_pool
 
 logger = logging.getLogger(__name__)
 
+class TokenCache:
+    '''
+    Ограниченный LRU-кэш успешно проверенных токенов.
+    Запись действует до истечения срока токена (expires_at), но не дольше ttl:
+    удаление токена в другом рабочем процессе становится видно не позже, чем через ttl.
+    '''
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size if max_size is not None else Config.TOKEN_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.TOKEN_CACHE_TTL
+        self._entries = OrderedDict()  # токен -> (действует до, user_id, имя)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, token):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or now >= entry[0]:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, token, user_id, name, expires_at):
+        if not self.enabled:
+            return
+        valid_until = min(expires_at.timestamp(), time.time() + self.ttl)
+        with self._lock:
+            self._entries[token] = (valid_until, user_id, name)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token):
+        with self._lock:
+            if self._entries.pop(token, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id):
+        """Удаление всех токенов пользователя (повторный вход удаляет старые токены)."""
+        with self._lock:
+            tokens = [token for token, entry in self._entries.items() if entry[1] == user_id]
+            for token in tokens:
+                del self._entries[token]
+            self.invalidations += len(tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+# Общий кэш проверенных токенов
+token_cache = TokenCache()
+
 def validate_token(token):
     """Проверка токена аутентификации."""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return {"valid": True, "user_id": cached[0], "name": cached[1]}
+
     try:
         db = get_db()
         cursor = db.cursor()
@@ -31,6 +115,7 @@ def validate_token(token):
         if expires_at < datetime.now():
             return {"valid": False, "message": "Token expired"}
         
+        token_cache.put(token, token_data['user_id'], token_data['name'], expires_at)
         return {
             "valid": True, 
             "user_id": token_data['user_id'],
@@ -46,11 +131,52 @@ def logout_user(token):
         db = get_db()
         cursor = db.cursor()
         
-        # Удалить токен из базы данных
+        # Удалить токен из базы данных и кэша
         cursor.execute("DELETE FROM auth_tokens WHERE token = ?", (token,))
         db.commit()
+        token_cache.invalidate(token)
         
         return {"success": True}
     except Exception as e:
         logger.exception(f"Ошибка выхода пользователя из системы: {str(e)}")
-        return {"success": False, "message": f"Error during logout: {str(e)}"}
\ No newline at end of file
+        return {"success": False, "message": f"Error during logout: {str(e)}"}
+
+def delete_expired_tokens(batch_size=None, pause=0.05):
+    """
+    Удаление просроченных токенов пакетами: каждый пакет — отдельная короткая транзакция,
+    между пакетами блокировка записи освобождается для запросов входа.
+    Возвращает количество удаленных токенов.
+    """
+    batch_size = batch_size or Config.TOKEN_SWEEP_BATCH_SIZE
+    # Формат совпадает с тем, в котором sqlite3 сохраняет datetime (строки сравниваются лексикографически)
+    now = datetime.now().isoformat(' ')
+    deleted = 0
+
+    db = connection_pool.acquire()
+    try:
+        while True:
+            cursor = db.execute("""
+                DELETE FROM auth_tokens WHERE id IN (
+                    SELECT id FROM auth_tokens WHERE expires_at < ? LIMIT ?
+                )
+            """, (now, batch_size))
+            db.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+            time.sleep(pause)
+    finally:
+        connection_pool.release(db)
+    return deleted
+
+def run_token_sweeper(stop_event=None):
+    """Фоновая очистка просроченных токенов с интервалом TOKEN_SWEEP_INTERVAL."""
+    stop_event = stop_event or threading.Event()
+    logger.info(f"Запущена очистка просроченных токенов (интервал {Config.TOKEN_SWEEP_INTERVAL} сек)")
+    while not stop_event.wait(Config.TOKEN_SWEEP_INTERVAL):
+        try:
+            deleted = delete_expired_tokens()
+            if deleted:
+                logger.info(f"Удалено просроченных токенов: {deleted}")
+        except Exception as e:
+            logger.exception(f"Ошибка очистки просроченных токенов: {str(e)}")
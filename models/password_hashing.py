@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SCRYPT_PREFIX = 'scrypt'
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+class PasswordHashingBusy(Exception):
+    '''Очередь хэширования паролей заполнена: запрос нужно повторить позже.'''
+
+    def __init__(self, retry_after):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+def _scrypt(password, salt, n, r, p):
+    # Память scrypt: 128 * n * r байт (16 МБ при n=2^14, r=8)
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=KEY_SIZE)
+
+def _legacy_sha256(password):
+    """Прежний формат: SHA-256 без соли (только для проверки старых паролей)."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def compute_hash(password):
+    """Хэш пароля scrypt с солью: scrypt$n$r$p$соль$хэш."""
+    n, r, p = Config.PASSWORD_SCRYPT_N, Config.PASSWORD_SCRYPT_R, Config.PASSWORD_SCRYPT_P
+    salt = secrets.token_bytes(SALT_SIZE)
+    key = _scrypt(password, salt, n, r, p)
+    return f"{SCRYPT_PREFIX}${n}${r}${p}${_b64encode(salt)}${_b64encode(key)}"
+
+def check_hash(password, stored_hash):
+    """Проверка пароля по сохраненному хэшу (scrypt или прежний SHA-256)."""
+    if not stored_hash.startswith(SCRYPT_PREFIX + '$'):
+        return hmac.compare_digest(_legacy_sha256(password), stored_hash)
+    try:
+        _, n, r, p, salt, key = stored_hash.split('$')
+        expected = base64.b64decode(key)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except (ValueError, TypeError) as e:
+        logger.error(f"Некорректный формат хэша пароля: {str(e)}")
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def needs_rehash(stored_hash):
+    """Хэш в прежнем формате или с параметрами, отличными от текущих."""
+    current = f"{SCRYPT_PREFIX}${Config.PASSWORD_SCRYPT_N}${Config.PASSWORD_SCRYPT_R}${Config.PASSWORD_SCRYPT_P}$"
+    return not stored_hash.startswith(current)
+
+def _verify_and_upgrade(password, stored_hash):
+    valid = check_hash(password, stored_hash)
+    new_hash = compute_hash(password) if valid and needs_rehash(stored_hash) else None
+    return valid, new_hash
+
+class PasswordHashingExecutor:
+    '''
+    Отдельный ограниченный пул потоков для хэширования паролей.
+    hashlib.scrypt освобождает GIL, поэтому хэширование не блокирует потоки обработки запросов,
+    а ограничение очереди не дает всплеску входов занять всю память и CPU.
+    Запрос ждет результат в потоке обработки запросов, поэтому одновременно ожидающих не больше
+    PASSWORD_HASH_MAX_WAITERS (часть SERVER_RESERVED_THREADS): всплеск входов не занимает потоки /features.
+    '''
+
+    def __init__(self, workers=None, queue_size=None, retry_after=None, max_waiters=None):
+        self.workers = workers or Config.PASSWORD_HASH_WORKERS
+        self.queue_size = queue_size if queue_size is not None else Config.PASSWORD_HASH_QUEUE_SIZE
+        self.retry_after = retry_after or Config.PASSWORD_HASH_RETRY_AFTER
+        max_waiters = max_waiters or Config.PASSWORD_HASH_MAX_WAITERS
+        self.admission = max(1, min(self.workers + self.queue_size, max_waiters))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="PasswordHasher")
+        self._slots = threading.BoundedSemaphore(self.admission)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed_total = 0
+        self.rejected_total = 0
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected_total += 1
+            raise PasswordHashingBusy(self.retry_after)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed_total += 1
+            self._slots.release()
+
+    def hash_password(self, password):
+        return self._run(compute_hash, password)
+
+    def verify_password(self, password, stored_hash):
+        """Возвращает (пароль верен, новый хэш или None, если пересчет не нужен)."""
+        return self._run(_verify_and_upgrade, password, stored_hash)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "admission": self.admission,
+                "in_flight": self.in_flight,
+                "completed": self.completed_total,
+                "rejected": self.rejected_total,
+                "scrypt_n": Config.PASSWORD_SCRYPT_N,
+            }
+
+# Общий пул хэширования паролей
+password_hasher = PasswordHashingExecutor()
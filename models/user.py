@@ -1,19 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import hashlib
 import logging
 from datetime import datetime, timedelta
 import secrets
 
 from database.db_manager import get_db
+from models.auth_token import token_cache
+from models.password_hashing import password_hasher, PasswordHashingBusy
 from config import Config
 
 logger = logging.getLogger(__name__)
 
-def hash_password(password):
-    """Хэш-пароль с использованием SHA-256."""
-    return hashlib.sha256(password.encode()).hexdigest()
-
 def create_user(name, email, password):
     """Создание нового пользователя."""
     try:
@@ -25,8 +22,8 @@ def create_user(name, email, password):
         if cursor.fetchone():
             return {"success": False, "message": "User with this email already exists"}
         
-        # Хэш-пароль
-        password_hash = hash_password(password)
+        # Хэш пароля (scrypt в отдельном пуле потоков)
+        password_hash = password_hasher.hash_password(password)
         
         # Создание пользователя
         cursor.execute(
@@ -37,6 +34,8 @@ def create_user(name, email, password):
         db.commit()
         
         return {"success": True, "user_id": user_id}
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         logger.exception(f"Error creating user: {str(e)}")
         return {"success": False, "message": f"Error creating user: {str(e)}"}
@@ -55,33 +54,52 @@ def authenticate_user(email, password):
             return {"success": False, "message": "User not found"}
         
         # Проверка пароля
-        password_hash = hash_password(password)
-        if password_hash != user['password_hash']:
+        valid, new_hash = password_hasher.verify_password(password, user['password_hash'])
+        if not valid:
             return {"success": False, "message": "Invalid password"}
+
+        # Пересчет хэша в прежнем формате (SHA-256) или с устаревшими параметрами
+        if new_hash is not None:
+            cursor.execute("UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user['id']))
+            logger.info(f"Хэш пароля пользователя {user['id']} обновлен")
         
+        return issue_token(user['id'], user['name'])
+    except PasswordHashingBusy:
+        raise
+    except Exception as e:
+        logger.exception(f"Ошибка аутентификации пользователя: {str(e)}")
+        return {"success": False, "message": f"Authentication error: {str(e)}"}
+
+def issue_token(user_id, name):
+    """Создание токена для пользователя (старые токены пользователя удаляются)."""
+    try:
+        db = get_db()
+        cursor = db.cursor()
+
         # Создание токена
         token = secrets.token_hex(32)
         expires_at = datetime.now() + timedelta(days=Config.TOKEN_EXPIRY)
         
         # Удаление старого токена
-        cursor.execute("DELETE FROM auth_tokens WHERE user_id = ?", (user['id'],))
+        cursor.execute("DELETE FROM auth_tokens WHERE user_id = ?", (user_id,))
         
         # Сохранение нового токена
         cursor.execute(
             "INSERT INTO auth_tokens (user_id, token, expires_at) VALUES (?, ?, ?)",
-            (user['id'], token, expires_at)
+            (user_id, token, expires_at)
         )
         db.commit()
+        token_cache.invalidate_user(user_id)  # старые токены удалены из базы
         
         return {
             "success": True, 
-            "user_id": user['id'], 
-            "name": user['name'], 
+            "user_id": user_id, 
+            "name": name, 
             "token": token, 
             "expires_at": expires_at.isoformat()
         }
     except Exception as e:
-        logger.exception(f"Ошибка аутентификации пользователя: {str(e)}")
+        logger.exception(f"Ошибка создания токена: {str(e)}")
         return {"success": False, "message": f"Authentication error: {str(e)}"}
 
 def get_user_by_id(user_id):
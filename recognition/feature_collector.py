@@ -6,74 +6,136 @@ import queue
 import numpy as np
 
 from config import Config
-from recognition.gesture_processor import recognize_gesture
+from recognition.gesture_processor import recognize_gesture_async
+from recognition.hand_mask import COMPACT_SIZE_BY_MASK
 from recognition.model_loader import AUTO_RECOGNITION_ENABLED
+from recognition.session_registry import NUM_FEATURES, session_registry
+from utils.logger import rate_limited
+from utils.metrics import QUEUE_WAIT_SECONDS, FRAME_TO_RESULT_SECONDS, WINDOWS
 
 logger = logging.getLogger(__name__)
 
 # Queues
 feature_data_queue = queue.Queue(maxsize=Config.FEATURE_QUEUE_SIZE)  # очередь для данных признаков (кадров)
-result_queue = queue.Queue(maxsize=Config.RESULT_QUEUE_SIZE)  # очередь для результатов распознавания
+
+# Статистика окон: распознанные и пропущенные (буфер заполнен, но не наступил шаг hop)
+windowing_stats = {
+    "windows_evaluated": 0,
+    "windows_skipped": 0,
+}
+
+def get_windowing_stats():
+    """Статистика планирования окон распознавания."""
+    total = windowing_stats["windows_evaluated"] + windowing_stats["windows_skipped"]
+    return {
+        "hop_frames": Config.RECOGNITION_HOP_FRAMES,
+        "overlap_policy": Config.WINDOW_OVERLAP_POLICY,
+        "windows_evaluated": windowing_stats["windows_evaluated"],
+        "windows_skipped": windowing_stats["windows_skipped"],
+        "evaluated_ratio": round(windowing_stats["windows_evaluated"] / total, 3) if total else 0.0,
+    }
+
+def _make_result_handler(session, timestamp, received_at):
+    """Обработчик результата распознавания для сессии."""
+    def _handle(future):
+        result = future.result()
+        if received_at is not None:
+            FRAME_TO_RESULT_SECONDS.observe(time.monotonic() - received_at)
+        if result and result.get("gesture"):
+            result['recognition_timestamp'] = str(int(time.time() * 1000))
+            result['last_frame_timestamp'] = timestamp
+            session.put_result(result)
+            session.request_reset()
+        else:
+             logger.info("Жест не распознан.", extra=rate_limited())
+    return _handle
+
+def _process_frame(session, features, timestamp, received_at=None, mask=None):
+    """Добавление кадра (плотного или компактного с маской рук) в буфер сессии и запуск распознавания, если наступил шаг окна."""
+    # Добавление признаков в кольцевой буфер сессии
+    session.push_frame(features, mask)
+    session.last_frame_timestamp = timestamp
+
+    # Планирование по числу кадров (hop), а не по частоте кадров клиента
+    if session.is_full():
+        current_time = time.time()
+        if session.window_due() and (current_time - session.last_recognition_time) >= Config.MIN_RECOGNITION_INTERVAL:
+            logger.info("Буфер сессии %s заполнен (%d кадрами). Распознавание...",
+                        session.session_id, session.frame_count, extra=rate_limited())
+
+            # Результат приходит асинхронно из исполнителя инференса
+            # Присутствие рук берется из масок кадров, статистика окна не сканирует значения
+            future = recognize_gesture_async(session.window(), session.session_id, session.window_presence())
+            session.mark_window_evaluated()
+            session.last_recognition_time = time.time()
+            windowing_stats["windows_evaluated"] += 1
+            WINDOWS.labels(outcome='evaluated').inc()
+            future.add_done_callback(_make_result_handler(session, timestamp, received_at))
+        else:
+            windowing_stats["windows_skipped"] += 1
+            WINDOWS.labels(outcome='skipped').inc()
 
 def process_feature_sequences():
     """Обработка полученных признаков."""
-    feature_buffer = []  # Буфер для последних 10 наборов признаков (массивы numpy)
-    last_recognition_time = time.time()
-    min_recognition_interval = Config.MIN_RECOGNITION_INTERVAL  # минимальный интервал между распознаваниями 
+    last_eviction_check = time.time()
 
     logger.info("Начат поток обработки последовательности признаков.")
 
     while True:
         try:
+            # Периодическое вытеснение неактивных сессий
+            if time.time() - last_eviction_check > 1.0:
+                session_registry.evict_idle()
+                last_eviction_check = time.time()
+
             # Получение данных с небольшим тайм-аутом
             try:
-                feature_data = feature_data_queue.get(timeout=0.5) 
+                feature_data = feature_data_queue.get(timeout=0.5)
                 item_type = feature_data.get('type')
                 timestamp = feature_data.get('timestamp')
+                session_id = feature_data.get('session_id')
+                received_at = feature_data.get('received_at')
+                if 'enqueued_at' in feature_data:
+                    QUEUE_WAIT_SECONDS.labels(queue='features').observe(time.monotonic() - feature_data['enqueued_at'])
             except queue.Empty:
-                if time.time() - last_recognition_time > 5.0 and feature_buffer:
-                   logger.info("Нет новых кадров в течение длительного времени.")
-                   feature_buffer.clear()
+                now = time.time()
+                for session in session_registry.sessions():
+                    if session.frame_count and now - session.last_seen > Config.SESSION_RESET_TIMEOUT:
+                        logger.info(f"Нет новых кадров в течение длительного времени (сессия {session.session_id}).")
+                        session.reset()
                 continue
 
             if item_type == 'features_frame' and AUTO_RECOGNITION_ENABLED:
-                current_features = feature_data.get('features')  # numpy array (126,)
+                current_features = feature_data.get('features')  # numpy array (126,) или компактный кадр
+                mask = feature_data.get('hands')  # маска присутствия рук
 
                 # Проверка типа и формы
-                if not isinstance(current_features, np.ndarray) or current_features.shape != (126,):
+                expected_size = NUM_FEATURES if mask is None else COMPACT_SIZE_BY_MASK[mask]
+                if (not isinstance(current_features, np.ndarray) or current_features.ndim != 1
+                        or current_features.size not in (expected_size, NUM_FEATURES)):
                     logger.warning(f"Объект неправильного типа/формы: {type(current_features)}, shape: {getattr(current_features, 'shape', 'N/A')}.")
                     feature_data_queue.task_done()
                     continue
 
-                # Добавление признаков в буфер
-                feature_buffer.append(current_features)
-
-                if len(feature_buffer) > Config.SEQUENCE_BUFFER_SIZE:
-                    feature_buffer.pop(0)  # Удалить самый старый набор
-
-                current_time = time.time()
-                if len(feature_buffer) == Config.SEQUENCE_BUFFER_SIZE and (current_time - last_recognition_time) >= min_recognition_interval:
-                    logger.info(f"Буфер заполнен ({len(feature_buffer)} кадрами). Распознавание...")
-
-                    buffer_copy = list(feature_buffer)
-
-                    result = recognize_gesture(buffer_copy) 
-                    last_recognition_time = time.time() 
+                session = session_registry.get_or_create(session_id)
+                _process_frame(session, current_features, timestamp, received_at, mask)
 
-                    if result and result.get("gesture"): 
-                        result['recognition_timestamp'] = str(int(last_recognition_time * 1000))
-                        result['last_frame_timestamp'] = timestamp
+            elif item_type == 'features_batch' and AUTO_RECOGNITION_ENABLED:
+                frames = feature_data.get('features')  # numpy array (N, 126)
+                timestamps = feature_data.get('timestamps') or [timestamp] * len(frames)
+                masks = feature_data.get('hands')  # маски рук (N,), вычислены при разборе пакета
+                if masks is None:
+                    masks = [None] * len(frames)
 
-                        try:
-                            result_queue.put_nowait(result)
-                        except queue.Full:
-                             logger.warning("Очередь результатов заполнена, результат из потока пропущен!")
-                    else:
-                         logger.info("Жест не распознан.")
+                # Кадры пакета обрабатываются подряд, в порядке отправки клиентом
+                session = session_registry.get_or_create(session_id)
+                for frame, frame_timestamp, mask in zip(frames, timestamps, masks):
+                    _process_frame(session, frame, frame_timestamp, received_at, None if mask is None else int(mask))
 
-            elif not AUTO_RECOGNITION_ENABLED and item_type == 'features_frame':
-                 if feature_buffer:
-                     feature_buffer.clear()
+            elif not AUTO_RECOGNITION_ENABLED and item_type in ('features_frame', 'features_batch'):
+                 session = session_registry.get(session_id)
+                 if session is not None:
+                     session.reset()
 
             else:
                 # Got something unexpected from queue
@@ -83,4 +145,4 @@ def process_feature_sequences():
 
         except Exception as e:
             logger.exception(f"Критическая ошибка в потоке обработки признаков: {str(e)}")
-            time.sleep(0.5)
\ No newline at end of file
+            time.sleep(0.5)
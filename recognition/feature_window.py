@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Окно признаков [10, 126] на пути к модели.
+
+FeatureWindow оборачивает непрерывный массив float32 без копирования (буфер окна сессии,
+массив из запроса) и проверяется один раз векторными операциями; статистика окна
+вычисляется один раз и используется проверкой качества, фильтром и журналом.
+'''
+import math
+
+import numpy as np
+
+from recognition.window_gate import WindowStats
+
+WINDOW_SHAPE = (10, 126)
+WINDOW_SIZE = WINDOW_SHAPE[0] * WINDOW_SHAPE[1]
+
+class InvalidWindow(ValueError):
+    '''Окно не прошло проверку; сообщение возвращается клиенту в поле gesture.'''
+
+class FeatureWindow:
+    '''Непрерывное представление (10, 126) float32 окна и его статистика.'''
+
+    __slots__ = ('data', 'presence', '_stats')
+
+    def __init__(self, data, presence=None):
+        self.data = data
+        self.presence = presence  # присутствие рук [10, 2], если известно заранее
+        self._stats = None
+
+    @classmethod
+    def wrap(cls, features, presence=None):
+        """
+        Окно из массива (10, 126) или (1260,), FeatureWindow или списка из 10 кадров (126,).
+        Непрерывный массив float32 не копируется; список собирается одним выделением памяти.
+        presence — присутствие рук [10, 2] из масок кадров (статистика не пересчитывает его по значениям).
+        """
+        if isinstance(features, FeatureWindow):
+            return features
+        if isinstance(features, np.ndarray):
+            data = features
+        elif isinstance(features, (list, tuple)):
+            if len(features) != WINDOW_SHAPE[0]:
+                raise InvalidWindow("Error: Invalid sequence length")
+            try:
+                data = np.array(features, dtype=np.float32)
+            except (ValueError, TypeError):
+                raise InvalidWindow("Error: Invalid frame shape")
+        else:
+            raise InvalidWindow("Error: Invalid input data type")
+
+        if data.shape != WINDOW_SHAPE:
+            if data.size != WINDOW_SIZE or data.ndim not in (1, 2):
+                raise InvalidWindow("Error: Invalid sequence shape")
+            data = data.reshape(WINDOW_SHAPE)  # представление без копирования
+        if data.dtype != np.float32 or not data.flags.c_contiguous:
+            data = np.ascontiguousarray(data, dtype=np.float32)
+        return cls(data, presence)
+
+    def validate(self):
+        """Проверка значений: NaN и бесконечность дают нечисловую сумму (одна векторная свертка)."""
+        if not math.isfinite(float(self.data.sum())):
+            raise InvalidWindow("Error: Non-finite features")
+        return self
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            self._stats = WindowStats(self.data, self.presence)
+        return self._stats
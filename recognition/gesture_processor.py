@@ -1,128 +1,250 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import hashlib
 import logging
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import numpy as np
 
 from config import Config
-from recognition.model_loader import get_model, model, ACTION_LABELS, AUTO_RECOGNITION_ENABLED
+from recognition.model_loader import ACTION_LABELS, AUTO_RECOGNITION_ENABLED
+from recognition.inference_executor import InferenceOverloaded, get_inference_executor
+from recognition.model_registry import model_registry
+from recognition.window_gate import evaluate_window, GATE_PASSED
+from recognition.feature_window import FeatureWindow, InvalidWindow
+from utils.logger import rate_limited
+from utils.metrics import INFERENCE_SECONDS, RESULTS
 
 logger = logging.getLogger(__name__)
 
-def check_sequence_variation(feature_sequence_np):
-    """Анализ кадров на различность с улучшенным алгоритмом."""
-    
-    differences = []
-    for i in range(1, len(feature_sequence_np)):
-        current_frame = feature_sequence_np[i]
-        prev_frame = feature_sequence_np[i-1]
-        
-        # Вычисляем абсолютную разницу
-        diff = np.mean(np.abs(current_frame - prev_frame))
-        differences.append(diff)
-    
-    # Средняя разница между соседними кадрами
-    avg_difference = np.mean(differences) if differences else 0
-    max_difference = np.max(differences) if differences else 0
-    
-    logger.info(f"Изменение последовательности: среднее отклонение={avg_difference:.6f}, максимум={max_difference:.6f}")
+class PredictionCache:
+    '''
+    Ограниченный LRU-кэш прогнозов модели со сроком жизни записей.
+    Ключ — хэш окна [10, 126], квантованного с шагом precision, поэтому
+    повторяющиеся и почти статичные окна не требуют повторного инференса.
+    '''
+
+    def __init__(self, max_size=None, ttl=None, precision=None):
+        self.max_size = max_size if max_size is not None else Config.PREDICTION_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.PREDICTION_CACHE_TTL
+        self.precision = precision if precision is not None else Config.PREDICTION_CACHE_PRECISION
+        self._entries = OrderedDict()  # ключ -> (время записи, вектор вероятностей)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def make_key(self, window, namespace=b''):
+        """Отпечаток квантованного окна; namespace разделяет прогнозы разных моделей."""
+        quantized = np.rint(window * (1.0 / self.precision)).astype(np.int32)
+        return hashlib.blake2b(namespace + quantized.tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, predictions):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), predictions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+# Общий кэш прогнозов
+prediction_cache = PredictionCache()
+
+def check_sequence_variation(feature_sequence):
+    """Анализ кадров на различность: False, если последовательность состоит из копий одного кадра."""
+    stats = FeatureWindow.wrap(feature_sequence).stats
+
+    logger.info("Изменение последовательности: среднее отклонение=%.6f, максимум=%.6f",
+                stats.mean_delta, stats.max_delta, extra=rate_limited())
+
+    # Средняя разница между соседними кадрами ниже порога дубликатов
+    return stats.mean_delta >= 0.0005
+
+class TopPredictions:
+    '''Топ-k прогнозов для сообщения лога: строка строится только при форматировании записи.'''
+
+    def __init__(self, predictions, k=5):
+        self.predictions = predictions
+        self.k = k
+
+    def __str__(self):
+        try:
+            top_indices = np.argsort(self.predictions)[-self.k:][::-1]
+            return ', '.join(f"{ACTION_LABELS.get(int(idx), f'Unknown_{idx}')}: {self.predictions[idx]:.3f}" for idx in top_indices)
+        except Exception as e:
+            return f"<ошибка получения топ-{self.k} прогнозов: {e}>"
+
+def _error_result(message):
+    return {"gesture": message, "confidence": 0.0, "class_id": -1}
+
+def _prepare_input(features_sequence, presence=None):
+    """Окно [10, 126] без лишних копий и однократная проверка. Возвращает (FeatureWindow, результат-ошибка)."""
+    try:
+        window = FeatureWindow.wrap(features_sequence, presence).validate()
+    except InvalidWindow as e:
+        logger.error("recognize_gesture: некорректное окно (%s), тип: %s, форма: %s", e,
+                     type(features_sequence).__name__, getattr(features_sequence, 'shape', 'N/A'), extra=rate_limited())
+        return None, _error_result(str(e))
+
+    # Проверка качества данных (статистика окна вычисляется один раз и используется фильтром)
+    stats = window.stats
+    if stats.hand_frame_ratio < 0.05:
+        RESULTS.labels(outcome='low_quality').inc()
+        logger.warning("Низкое качество данных: руки присутствуют в %.2f%% кадров (%d из %d рук во всех кадрах). Распознавание может быть неточным.",
+                       stats.hand_frame_ratio * 100, stats.hand_frames, stats.hand_presence.size * len(window.data),
+                       extra=rate_limited())
+        return None, {"gesture": "", "confidence": 0.0, "class_id": -1}
+
+    return window, None
+
+def interpret_predictions(scaled_predictions, model_name=None):
+    """Преобразование вектора вероятностей модели в результат распознавания."""
+    # Поиск класса с высоким доверием
+    predicted_class_index = int(np.argmax(scaled_predictions))
+    confidence = float(scaled_predictions[predicted_class_index])
+
+    # Фильтр по доверию
+    if confidence >= Config.CONFIDENCE_THRESHOLD:
+        gesture_name = ACTION_LABELS.get(predicted_class_index, f"Unknown_ID_{predicted_class_index}")
+        class_id_to_return = int(predicted_class_index)
+        RESULTS.labels(outcome='recognized').inc()
+
+        # Топ-5 прогнозов вычисляется только при записи сообщения в лог
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Жест распознан: %s (id: %d) | Уверенность: %.3f | Top-5: %s",
+                        gesture_name, class_id_to_return, confidence, TopPredictions(scaled_predictions),
+                        extra=rate_limited())
+
+    else:
+        # Низкая уверенность - жест не должен быть распознан
+        gesture_name = ""
+        confidence_to_return = 0.0  # Возвращает 0, а не фактическую низкую достоверность
+        class_id_to_return = -1
+        RESULTS.labels(outcome='low_confidence').inc()
     
-    # Если средняя разница между кадрами меньше более низкого порога
-    if avg_difference < 0.0005:  # порог для обнаружения дубликатов уменьшается
-        logger.warning("ОБНАРУЖЕНЫ ДУБЛИКАТЫ КАДРОВ! Последовательность содержит копии одного и того же кадра.")
-        # Все равно возвращается True, чтобы продолжить обработк (данные могут быть полезны для распознавания)
-        return True
-    return True
-
-def recognize_gesture(features_sequence):
-    """Распознавание жестов из последовательности."""
-    model = get_model()
-
+        top_class_low_conf = ACTION_LABELS.get(predicted_class_index, f"Unknown_ID_{predicted_class_index}")
+        logger.info("Низкая уверенность (%.3f < %s). Наиболее вероятный класс: %s (id: %d), but result not returned.",
+                    confidence, Config.CONFIDENCE_THRESHOLD, top_class_low_conf, predicted_class_index, extra=rate_limited())
+        confidence = confidence_to_return 
+
+    result = {
+        "gesture": gesture_name,
+        "confidence": confidence,  # Возвращает 0.0, если ниже порогового значения. В противном случае реальная уверенность
+        "class_id": class_id_to_return
+    }
+    if model_name is not None:
+        result["model"] = model_name  # для сравнения моделей при A/B-разделении
+    return result
+
+def _completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+def recognize_gesture_async(features_sequence, routing_key=None, presence=None):
+    """
+    Асинхронное распознавание жеста: окно отправляется в общий исполнитель инференса,
+    возвращается Future с результатом распознавания.
+    routing_key (идентификатор сессии) закрепляет сессию за моделью при A/B-разделении.
+    presence — присутствие рук [10, 2] из масок кадров буфера сессии.
+    """
     if not AUTO_RECOGNITION_ENABLED:
         logger.warning("Попытка распознавания с отключенным AUTO_RECOGNITION_ENABLED.")
-        return {"gesture": "", "confidence": 0.0, "class_id": -1}
+        return _completed({"gesture": "", "confidence": 0.0, "class_id": -1})
 
-    if model is None:
+    if not get_inference_executor().is_ready():
         logger.error("Модель не загружена, распознавание невозможно.")
-        return {"gesture": "Error: Model not loaded", "confidence": 0.0, "class_id": -1}
+        return _completed(_error_result("Error: Model not loaded"))
 
     try:
-        # Проверка формата входных данных
-        if not isinstance(features_sequence, (list, tuple)) or not all(isinstance(item, np.ndarray) for item in features_sequence):
-             logger.error(f"recognize_gesture ожидает список/кортеж массивов numpy, получено: {type(features_sequence)}")
-             return {"gesture": "Error: Invalid input data type", "confidence": 0.0, "class_id": -1}
-
-        if len(features_sequence) != 10:
-            logger.error(f"recognize_gesture ожидает список/кортеж массивов numpy, получено: {len(features_sequence)}")
-            return {"gesture": "Error: Invalid sequence length", "confidence": 0.0, "class_id": -1}
-
-        for i, frame in enumerate(features_sequence):
-            if frame.shape != (126,):
-                logger.error(f"Кадр {i} имеет форму {frame.shape}, а ожидалось (126,)")
-                return {"gesture": "Error: Invalid frame shape", "confidence": 0.0, "class_id": -1}
-
-        # Преобразовать список массивов numpy в один массив numpy с формой [10, 126]
-        input_data_np = np.array(features_sequence, dtype=np.float32) 
-
-        # Проверка качества данных
-        non_zero_count = np.count_nonzero(input_data_np)
-        total_elements = input_data_np.size  # 10 * 126 = 1260
-        non_zero_percentage = (non_zero_count / total_elements) * 100 if total_elements > 0 else 0
-
-        if non_zero_percentage < 5.0:
-            logger.warning(f"Низкое качество данных: {non_zero_percentage:.2f}% ненулевые элементы ({non_zero_count}/{total_elements}). Распознавание может быть неточным.")
-            return {"gesture": "", "confidence": 0.0, "class_id": -1}
-
-        # [10, 126] -> [1, 10, 126]
-        input_data = np.expand_dims(input_data_np, axis=0)
-
-        # Прогноз
-        start_time = time.time()
-        predictions = model.predict(input_data, verbose=0)  # verbose=0 removes predict's own logs
-        prediction_time = time.time() - start_time
-        #logger.debug(f"Время прогнозирования модели: {prediction_time:.4f} сек.")
-
-        # Поиск класса с высоким доверием
-        scaled_predictions = predictions[0]
-        predicted_class_index = np.argmax(scaled_predictions)
-        confidence = float(scaled_predictions[predicted_class_index])
-
-        # Фильтр по доверию
-        if confidence >= Config.CONFIDENCE_THRESHOLD:
-            gesture_name = ACTION_LABELS.get(predicted_class_index, f"Unknown_ID_{predicted_class_index}")
-            class_id_to_return = int(predicted_class_index)
-
-            # Топ-5 прогнозов
-            try: 
-                top_5_indices = np.argsort(predictions[0])[-5:][::-1]
-                top_5_values = predictions[0][top_5_indices]
-                top_5_labels = [ACTION_LABELS.get(idx, f"Unknown_{idx}") for idx in top_5_indices]
-                top_5_info = [f"{label}: {value:.3f}" for label, value in zip(top_5_labels, top_5_values)]
-                logger.info(f"Жест распознан: {gesture_name} (id: {class_id_to_return}) | Уверенность: {confidence:.3f} | Top-5: {', '.join(top_5_info)}")
-            except Exception as e_top5:
-                logger.error(f"Ошибка получения топ-5 прогнозов: {e_top5}")
-                logger.info(f"Gesture recognized: {gesture_name} (id: {class_id_to_return}) | Уверенность: {confidence:.3f}")
-
-        else:
-            # Низкая уверенность - жест не должен быть распознан
-            gesture_name = ""
-            confidence_to_return = 0.0  # Возвращает 0, а не фактическую низкую достоверность
-            class_id_to_return = -1
-        
-            top_class_low_conf = ACTION_LABELS.get(predicted_class_index, f"Unknown_ID_{predicted_class_index}")
-            logger.info(f"Низкая уверенность ({confidence:.3f} < {Config.CONFIDENCE_THRESHOLD}). Наиболее вероятный класс: {top_class_low_conf} (id: {predicted_class_index}), but result not returned.")
-            confidence = confidence_to_return 
-
-        return {
-            "gesture": gesture_name,
-            "confidence": confidence,  # Возвращает 0.0, если ниже порогового значения. В противном случае реальная уверенность
-            "class_id": class_id_to_return
-        }
+        window, error_result = _prepare_input(features_sequence, presence)
+        if error_result is not None:
+            return _completed(error_result)
+
+        # Окно без рук или без движения не стоит вызова модели
+        decision, _ = evaluate_window(window.data, window.stats)
+        if decision != GATE_PASSED:
+            RESULTS.labels(outcome='gated').inc()
+            return _completed({"gesture": "", "confidence": 0.0, "class_id": -1})
+
+        # Модель выбирается в момент отправки: после переключения новые окна идут на новую модель
+        entry = model_registry.select(routing_key)
+        model_name = entry.name if entry is not None else None
+
+        # Повторное окно (пользователь удерживает позу) — только поиск по хэшу
+        cache_key = None
+        if prediction_cache.enabled:
+            cache_key = prediction_cache.make_key(window.data, entry.cache_namespace if entry is not None else b'')
+            cached_predictions = prediction_cache.get(cache_key)
+            if cached_predictions is not None:
+                return _completed(interpret_predictions(cached_predictions, model_name))
+
+        result_future = Future()
+        start_time = time.monotonic()
+        prediction_future = get_inference_executor().submit(window.data, entry.model if entry is not None else None)
+
+        def _on_prediction(done):
+            try:
+                scaled_predictions = done.result()
+                if cache_key is not None:
+                    prediction_cache.put(cache_key, scaled_predictions)
+                prediction_time = time.monotonic() - start_time
+                INFERENCE_SECONDS.observe(prediction_time)
+                result_future.set_result(interpret_predictions(scaled_predictions, model_name))
+            except InferenceOverloaded as e:
+                # Перегрузка пула инференса: окно отброшено без ожидания, следующее окно сессии придет через шаг
+                logger.warning("Окно отброшено: %s", e, extra=rate_limited())
+                RESULTS.labels(outcome='dropped').inc()
+                result_future.set_result(_error_result("Recognition error"))
+            except Exception as e:
+                logger.exception(f"Ошибка распознавания жеста: {str(e)}")
+                RESULTS.labels(outcome='error').inc()
+                result_future.set_result(_error_result("Recognition error"))
+
+        prediction_future.add_done_callback(_on_prediction)
+        return result_future
 
     except Exception as e:
         logger.exception(f"Ошибка распознавания жеста: {str(e)}")
-        return {
-            "gesture": "Recognition error",
-            "confidence": 0.0,
-            "class_id": -1
-        }
\ No newline at end of file
+        return _completed(_error_result("Recognition error"))
+
+def recognize_gesture(features_sequence, routing_key=None):
+    """Распознавание жестов из последовательности."""
+    try:
+        return recognize_gesture_async(features_sequence, routing_key).result(timeout=Config.INFERENCE_TIMEOUT)
+    except FutureTimeoutError:
+        logger.error(f"Превышено время ожидания инференса ({Config.INFERENCE_TIMEOUT} сек).")
+        return _error_result("Recognition error")
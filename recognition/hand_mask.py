@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Маска присутствия рук в кадре и компактное представление кадра.
+
+Плотный кадр — 126 значений: 2 руки x 21 точка x (x, y, z), отсутствующая рука передается нулями.
+Компактный кадр — маска (бит 0 — первая рука, бит 1 — вторая) и 63 значения на каждую
+присутствующую руку в том же порядке. Кадр с одной рукой занимает вдвое меньше места.
+'''
+import numpy as np
+
+NUM_HANDS = 2
+HAND_FEATURES = 63  # 21 точка x (x, y, z)
+FRAME_FEATURES = NUM_HANDS * HAND_FEATURES
+
+MASK_NONE = 0
+MASK_ALL = (1 << NUM_HANDS) - 1
+
+# Присутствие рук [руки] для каждой маски и число значений компактного кадра
+PRESENCE_BY_MASK = np.array([[bool(mask >> hand & 1) for hand in range(NUM_HANDS)]
+                             for mask in range(MASK_ALL + 1)])
+COMPACT_SIZE_BY_MASK = tuple(int(presence.sum()) * HAND_FEATURES for presence in PRESENCE_BY_MASK)
+_MASK_WEIGHTS = np.array([1 << hand for hand in range(NUM_HANDS)], dtype=np.uint8)
+
+
+def hand_presence(frames):
+    """Присутствие рук [..., руки] для плотных кадров [..., 126]: рука присутствует, если у нее есть ненулевые значения."""
+    hands = frames.reshape(frames.shape[:-1] + (NUM_HANDS, HAND_FEATURES))
+    return hands.any(axis=-1)
+
+
+def hand_masks(frames):
+    """Маски присутствия рук (uint8) для плотных кадров [..., 126]."""
+    return hand_presence(frames) @ _MASK_WEIGHTS
+
+
+def compact_size(mask):
+    """Число значений компактного кадра для маски; ValueError для неверной маски."""
+    if not isinstance(mask, (int, np.integer)) or isinstance(mask, bool) or not MASK_NONE <= mask <= MASK_ALL:
+        raise ValueError(f"Неверная маска рук: {mask!r} (ожидалось целое от {MASK_NONE} до {MASK_ALL})")
+    return COMPACT_SIZE_BY_MASK[mask]
+
+
+def expand_frame(compact, mask, out):
+    """Запись компактного кадра в плотный кадр out (126,) без промежуточных массивов; отсутствующие руки обнуляются."""
+    offset = 0
+    for hand in range(NUM_HANDS):
+        slot = out[hand * HAND_FEATURES:(hand + 1) * HAND_FEATURES]
+        if mask >> hand & 1:
+            slot[:] = compact[offset:offset + HAND_FEATURES]
+            offset += HAND_FEATURES
+        else:
+            slot[:] = 0.0
+    return out
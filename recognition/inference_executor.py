@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+import numpy as np
+
+from config import Config
+from recognition.model_loader import get_model, get_model_state, load_model_async
+from utils.metrics import QUEUE_WAIT_SECONDS, INFERENCE_BATCH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SHAPE = (10, 126)
+
+
+class InferenceOverloaded(RuntimeError):
+    '''Окно не принято на инференс: нет свободных слотов. Окно отбрасывается, вызывающий поток не ждет.'''
+
+
+def parse_buckets(value, max_batch_size):
+    """Разбор списка размеров батчей из строки вида '1,2,4,8,16'."""
+    buckets = sorted({int(x) for x in str(value).split(',') if x.strip()})
+    buckets = [b for b in buckets if 0 < b <= max_batch_size]
+    if not buckets or buckets[-1] != max_batch_size:
+        buckets.append(max_batch_size)
+    return buckets
+
+
+class InferenceExecutor:
+    '''
+    Единственный владелец вызовов модели.
+    Окна от всех источников (поток обработки, запросы Flask) собираются в батчи
+    ограниченного размера с ограниченным временем ожидания в очереди.
+    '''
+
+    def __init__(self, max_batch_size=None, max_delay=None, buckets=None):
+        self.max_batch_size = max_batch_size or Config.INFERENCE_MAX_BATCH_SIZE
+        self.max_delay = max_delay if max_delay is not None else Config.INFERENCE_MAX_DELAY_MS / 1000.0
+        self.buckets = parse_buckets(buckets or Config.INFERENCE_BATCH_BUCKETS, self.max_batch_size)
+
+        # Предварительно выделенные входные тензоры для каждого размера батча
+        self._inputs = {b: np.zeros((b,) + WINDOW_SHAPE, dtype=np.float32) for b in self.buckets}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._warmed = weakref.WeakSet()  # модели, для которых выполнен прогрев
+        self._lock = threading.Lock()
+
+        self.batches_total = 0
+        self.windows_total = 0
+        self.padded_total = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="InferenceExecutorThread")
+                self._thread.start()
+                logger.info(f"Запущен исполнитель инференса: max_batch={self.max_batch_size}, "
+                            f"max_delay={self.max_delay * 1000:.1f} мс, бакеты={self.buckets}")
+
+    def is_ready(self):
+        return get_model() is not None
+
+    def state(self):
+        """Состояние готовности инференса (см. model_loader.get_model_state)."""
+        return get_model_state()
+
+    def submit(self, window, model=None):
+        """
+        Поставить окно [10, 126] в очередь на инференс. Возвращает Future с вектором вероятностей.
+        model — модель из реестра (по умолчанию активная на момент выполнения батча).
+        """
+        self.start()
+        future = Future()
+        # Копия: вызывающий код может переиспользовать свой буфер окна
+        self._queue.put((np.array(window, dtype=np.float32, copy=True), future, time.monotonic(), model))
+        return future
+
+    def warm_up(self, model=None):
+        """
+        Прогрев модели на всех размерах батчей, чтобы TF не перестраивал граф во время работы.
+        Может вызываться из потока загрузки модели: используются собственные входные массивы.
+        """
+        model = model or get_model()
+        if model is None:
+            return False
+        for bucket in self.buckets:
+            model.predict_on_batch(np.zeros((bucket,) + WINDOW_SHAPE, dtype=np.float32))
+        self._warmed.add(model)
+        logger.info(f"Модель прогрета для размеров батчей: {self.buckets}")
+        return True
+
+    def _bucket_for(self, size):
+        for bucket in self.buckets:
+            if bucket >= size:
+                return bucket
+        return self.buckets[-1]
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            active_model = get_model()
+
+            # При A/B-разделении в одном батче могут оказаться окна разных моделей
+            groups = {}
+            for item in batch:
+                model = item[3] or active_model
+                groups.setdefault(id(model), (model, []))[1].append(item)
+
+            for model, items in groups.values():
+                try:
+                    self._run_batch(model, items)
+                except Exception as e:
+                    logger.exception(f"Ошибка пакетного инференса ({len(items)} окон): {str(e)}")
+                    for _, future, _, _ in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _run_batch(self, model, batch):
+        if model is None:
+            raise RuntimeError("Model not loaded")
+        if model not in self._warmed:
+            # Модель загружена после запуска исполнителя
+            try:
+                self.warm_up(model)
+            except Exception as e:
+                logger.exception(f"Ошибка прогрева модели в исполнителе инференса: {str(e)}")
+                self._warmed.add(model)
+
+        size = len(batch)
+        bucket = self._bucket_for(size)
+        inputs = self._inputs[bucket]
+        started = time.monotonic()
+        queue_wait = QUEUE_WAIT_SECONDS.labels(queue='inference')
+        for i, (window, _, enqueued_at, _) in enumerate(batch):
+            inputs[i] = window
+            queue_wait.observe(started - enqueued_at)
+        inputs[size:] = 0.0  # дополнение до размера бакета
+
+        predictions = np.asarray(model.predict_on_batch(inputs))
+        INFERENCE_BATCH_SECONDS.observe(time.monotonic() - started)
+
+        self.batches_total += 1
+        self.windows_total += size
+        self.padded_total += bucket - size
+
+        for i, (_, future, _, _) in enumerate(batch):
+            future.set_result(predictions[i])
+
+    def stats(self):
+        return {
+            "mode": "thread",
+            "pending": self._queue.qsize(),
+            "batches": self.batches_total,
+            "windows": self.windows_total,
+            "padded_windows": self.padded_total,
+            "avg_batch_size": round(self.windows_total / self.batches_total, 2) if self.batches_total else 0.0,
+        }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor():
+    """
+    Получить общий исполнитель инференса (создается при первом обращении).
+    При INFERENCE_WORKERS > 0 — пул процессов с собственными копиями модели.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if Config.INFERENCE_WORKERS > 0:
+                from recognition.worker_pool import InferenceWorkerPool
+                _executor = InferenceWorkerPool()
+            else:
+                _executor = InferenceExecutor()
+        return _executor
+
+def ensure_inference_ready():
+    """
+    Проверка готовности инференса без ожидания загрузки модели:
+    если модель не загружена, загрузка запускается в фоне, а запрос получает отказ.
+    """
+    executor = get_inference_executor()
+    if Config.INFERENCE_WORKERS > 0:
+        executor.start()
+        return executor.is_ready()
+    if get_model() is not None:
+        return True
+    load_model_async()
+    return False
@@ -2,9 +2,9 @@
 # -*- coding: utf-8 -*-
 import os
 import logging
+import threading
+import time
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
 
 from config import Config
 
@@ -13,6 +13,17 @@ logger = logging.getLogger(__name__)
 # Инициализация модели
 model = None
 
+# Состояния загрузки модели
+MODEL_STATE_DISABLED = 'disabled'
+MODEL_STATE_NOT_LOADED = 'not_loaded'
+MODEL_STATE_LOADING = 'loading'
+MODEL_STATE_READY = 'ready'
+MODEL_STATE_FAILED = 'failed'
+
+_model_state = {"state": MODEL_STATE_NOT_LOADED, "error": None, "load_seconds": None}
+_load_lock = threading.Lock()
+_load_thread = None
+
 AUTO_RECOGNITION_ENABLED = Config.AUTO_RECOGNITION_ENABLED
 
 # Словарь для хранения меток действий
@@ -29,65 +40,161 @@ ACTION_LABELS = create_sorted_labels(Config.SUPPORTED_GESTURES)
 # Создание обратного отображения для поиска по слову
 ACTION_LABELS_REVERSE = {word: id for id, word in ACTION_LABELS.items()}
 
+def _load_keras_model(path):
+    """Загрузка модели через TensorFlow/Keras (TF импортируется только здесь)."""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    # Настройка логирования TensorFlow
+    tf.get_logger().setLevel('ERROR')
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 0 = all, 1 = INFO, 2 = WARNING, 3 = ERROR
+
+    return keras.models.load_model(path)
+
+def _load_numpy_model(path):
+    """Загрузка модели для инференса на NumPy без TensorFlow (через кэш .npz, если он включен)."""
+    from recognition.numpy_lstm import NumpyLSTMModel
+    if Config.MODEL_ARTIFACT_CACHE:
+        return NumpyLSTMModel.load_cached(path)
+    return NumpyLSTMModel.from_h5(path)
+
+def _load_tflite_model(path):
+    """Загрузка квантованной модели TFLite (файл .tflite рядом с .h5, см. recognition.tflite_model)."""
+    from recognition.tflite_model import load_tflite_model
+    return load_tflite_model(path, quantization=Config.TFLITE_QUANTIZATION, num_threads=Config.TFLITE_NUM_THREADS)
+
+# Доступные бэкенды инференса
+MODEL_BACKENDS = {
+    'keras': _load_keras_model,
+    'numpy': _load_numpy_model,
+    'tflite': _load_tflite_model,
+}
+
+def _set_state(state, error=None, load_seconds=None):
+    _model_state.update(state=state, error=error, load_seconds=load_seconds)
+
+def get_model_state():
+    """Состояние загрузки модели: disabled | not_loaded | loading | ready | failed."""
+    if not AUTO_RECOGNITION_ENABLED and model is None:
+        return {"state": MODEL_STATE_DISABLED, "error": None, "load_seconds": None}
+    return dict(_model_state)
+
 def load_model():
     """Загрузка модели для распознавания жестов."""
-    global model, AUTO_RECOGNITION_ENABLED
-    
-    if not AUTO_RECOGNITION_ENABLED:
-        logger.info("Автоматическое распознавание отключено. Модель не загружена.")
-        return True  # Считать успешным, так как модель не нужна
+    with _load_lock:  # одновременные вызовы ждут одну загрузку
+        started = time.monotonic()
+        if model is None and AUTO_RECOGNITION_ENABLED:
+            _set_state(MODEL_STATE_LOADING)
+        loaded = _load_model()
+        if model is not None:
+            if _model_state["state"] != MODEL_STATE_READY:
+                _set_state(MODEL_STATE_READY, load_seconds=round(time.monotonic() - started, 3))
+        elif not loaded:
+            _set_state(MODEL_STATE_FAILED, error=f"Failed to load model from {Config.MODEL_PATH}")
+        return loaded
+
+def load_model_async():
+    """Загрузка модели в фоновом потоке (сервер отвечает на запросы, пока модель загружается)."""
+    global _load_thread
+    with _load_lock:
+        if model is not None or (_load_thread is not None and _load_thread.is_alive()):
+            return _load_thread
+        _set_state(MODEL_STATE_LOADING)
+        _load_thread = threading.Thread(target=load_model, daemon=True, name="ModelLoaderThread")
+        _load_thread.start()
+    return _load_thread
+
+def load_model_file(path, backend=None):
+    """
+    Загрузка модели из файла и проверка пробным окном (1, 10, 126).
+    Возвращает модель или None (ошибка записывается в лог).
+    """
+    backend = backend or Config.INFERENCE_BACKEND
+    try:
+        logger.info(f"Загрузка модели из {path} (бэкенд: {backend})")
 
-    if model is None:  # Только один раз
-        try:
-            logger.info(f"Загрузка модели из {Config.MODEL_PATH}")
+        if backend not in MODEL_BACKENDS:
+            logger.error(f"Неизвестный бэкенд инференса: {backend}. Доступны: {', '.join(MODEL_BACKENDS)}")
+            return None
+
+        # Проверка существования файла
+        if not os.path.exists(path):
+            logger.error(f"Файл модели не найден по пути: {path}")
+            return None
+
+        # Загрузка модели
+        loaded_model = MODEL_BACKENDS[backend](path)
+        logger.info("Модель загружена")
 
-            # Настройка логирования TensorFlow
-            tf.get_logger().setLevel('ERROR')
-            os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 0 = all, 1 = INFO, 2 = WARNING, 3 = ERROR
+        # «Прогрев» модели и проверка выходной структуры
+        try:
+            # Expected input shape: (batch_size, sequence_length, num_features)
+            # In our case: (1, 10, 126)
+            test_input = np.zeros((1, 10, 126), dtype=np.float32)
+            test_output = loaded_model.predict(test_input, verbose=0)
 
-            # Проверка существования файла
-            if not os.path.exists(Config.MODEL_PATH):
-                logger.error(f"Файл модели не найден по пути: {Config.MODEL_PATH}")
-                return False
+            logger.info(f"Модель успешно загружена и проверена. Форма выходных данных: {test_output.shape}")
 
-            # Загрузка модели
-            model = keras.models.load_model(Config.MODEL_PATH)
-            logger.info("Модель загружена")
+            # Проверка количества классов
+            num_classes_model = test_output.shape[1]
+            num_classes_labels = len(ACTION_LABELS)
+            logger.info(f"Модель имеет {num_classes_model} выходных классов.")
 
-            # «Прогрев» модели и проверка выходной структуры
-            try:
-                # Expected input shape: (batch_size, sequence_length, num_features)
-                # In our case: (1, 10, 126)
-                test_input = np.zeros((1, 10, 126), dtype=np.float32)
-                test_output = model.predict(test_input, verbose=0)
+            if num_classes_labels != num_classes_model:
+                logger.warning(f"ВНИМАНИЕ: Количество меток ({num_classes_labels}) не соответствует количеству выходных классов модели ({num_classes_model})!")
+            else:
+                logger.info("Количество меток соответствует выходным данным модели.")
 
-                logger.info(f"Модель успешно загружена и проверена. Форма выходных данных: {test_output.shape}")
+            logger.info("Модель успешно загружена и проверена.")
+            return loaded_model
 
-                # Проверка количества классов
-                num_classes_model = test_output.shape[1]
-                num_classes_labels = len(ACTION_LABELS)
-                logger.info(f"Модель имеет {num_classes_model} выходных классов.")
+        except Exception as e:
+            logger.exception(f"Ошибка проверки модели: {str(e)}")
+            return None
 
-                if num_classes_labels != num_classes_model:
-                    logger.warning(f"ВНИМАНИЕ: Количество меток ({num_classes_labels}) не соответствует количеству выходных классов модели ({num_classes_model})!")
-                else:
-                    logger.info("Количество меток соответствует выходным данным модели.")
+    except Exception as e:
+        logger.exception(f"Критическая ошибка при загрузке модели: {str(e)}")
+        return None
 
-                logger.info("Модель успешно загружена и проверена.")
-                return True
+def _load_model():
+    global model, AUTO_RECOGNITION_ENABLED
+    
+    if not AUTO_RECOGNITION_ENABLED:
+        logger.info("Автоматическое распознавание отключено. Модель не загружена.")
+        return True  # Считать успешным, так как модель не нужна
 
-            except Exception as e:
-                logger.exception(f"Ошибка проверки модели: {str(e)}")
-                model = None  # Сброс модели если проверка не удалась
-                return False
+    if model is None:  # Только один раз
+        loaded_model = load_model_file(Config.MODEL_PATH)
+        if loaded_model is None:
+            return False
 
+        # Прогрев всех размеров батча до публикации модели: пока он идет, get_model() возвращает None,
+        # окна не отправляются в исполнитель и не запускают второй прогрев в потоке инференса
+        try:
+            from recognition.inference_executor import get_inference_executor
+            get_inference_executor().warm_up(loaded_model)
         except Exception as e:
-            logger.exception(f"Критическая ошибка при загрузке модели: {str(e)}")
-            model = None  # Сброс модели
-            return False
+            logger.exception(f"Ошибка прогрева модели: {str(e)}")
+
+        # Основная модель становится активной записью реестра моделей
+        from recognition.model_registry import model_registry
+        model_registry.adopt(loaded_model, Config.MODEL_PATH, Config.INFERENCE_BACKEND)
+        model = loaded_model
 
     return True  # Модель уже загружена
 
+def set_active_model(new_model):
+    """Замена активной модели (одно присваивание ссылки: окна, уже отправленные на инференс, завершаются на прежней)."""
+    global model
+    model = new_model
+
+def wait_for_model(timeout=None):
+    """Ожидание завершения фоновой загрузки основной модели. Возвращает загруженную модель или None."""
+    thread = _load_thread
+    if thread is not None:
+        thread.join(timeout)
+    return model
+
 def get_model():
     """Получить загруженный экземпляр модели."""
     global model
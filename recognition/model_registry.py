@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Реестр моделей распознавания: резервная модель загружается и прогревается в фоне,
+затем атомарно становится активной без перезапуска процесса и сброса сессий.
+
+Окно получает ссылку на модель в момент отправки на инференс, поэтому окна,
+уже стоящие в очереди, завершаются на прежней модели, а новые идут на новую.
+Между несколькими готовыми моделями можно распределить трафик (A/B):
+сессия закрепляется за моделью по хэшу своего идентификатора.
+
+Реестр существует в каждом процессе сервера отдельно: при запуске через gunicorn
+запрос управления меняет модели только того процесса, который его обработал
+(одинаковая конфигурация во всех процессах — MODEL_CANDIDATE_PATH).
+При INFERENCE_WORKERS > 0 модели загружаются процессами инференса, и реестр не используется.
+'''
+import hashlib
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+
+from config import Config
+from recognition import model_loader
+from recognition.model_loader import (MODEL_STATE_LOADING, MODEL_STATE_READY, MODEL_STATE_FAILED,
+                                      load_model_file)
+from utils.metrics import registry as metrics_registry
+
+logger = logging.getLogger(__name__)
+
+MODEL_WINDOWS = metrics_registry.counter(
+    'slr_model_windows', 'Окна, отправленные на инференс, по моделям реестра', labels=('model',))
+
+# Номер загрузки: ключи кэша прогнозов разных загрузок одного имени не пересекаются
+_generations = itertools.count(1)
+
+def model_name_from_path(path):
+    """Имя модели по умолчанию — имя файла без расширения."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+class ModelEntry:
+    '''Модель реестра и ее состояние загрузки.'''
+
+    def __init__(self, name, path, backend):
+        self.name = name
+        self.path = path
+        self.backend = backend
+        self.generation = next(_generations)
+        self.cache_namespace = f"{name}:{self.generation}".encode()
+        self.model = None
+        self.state = MODEL_STATE_LOADING
+        self.error = None
+        self.load_seconds = None
+        self.loaded_at = None
+
+    def info(self):
+        return {
+            "name": self.name,
+            "path": self.path,
+            "backend": self.backend,
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "windows": int(MODEL_WINDOWS.labels(model=self.name).value),
+        }
+
+class ModelRegistry:
+    '''Загруженные модели процесса, активная модель и распределение трафика между моделями.'''
+
+    def __init__(self):
+        self._entries = {}
+        self._active = None
+        self._split = []  # [(имя, верхняя граница доли)] — пусто: весь трафик на активную модель
+        self._lock = threading.Lock()
+        self.swaps_total = 0
+
+    def adopt(self, loaded_model, path, backend):
+        """Регистрация уже загруженной основной модели как активной."""
+        entry = ModelEntry(model_name_from_path(path), path, backend)
+        entry.model = loaded_model
+        entry.state = MODEL_STATE_READY
+        entry.loaded_at = time.time()
+        with self._lock:
+            self._entries[entry.name] = entry
+            self._active = entry.name
+        return entry
+
+    def register(self, name, path, backend=None, activate=False, traffic=None):
+        """
+        Загрузка модели в фоновом потоке. После проверки и прогрева модель либо становится
+        активной (activate=True), либо получает долю трафика traffic (0..1) в A/B-разделении
+        с активной моделью, либо остается в резерве.
+        """
+        if Config.INFERENCE_WORKERS > 0:
+            raise RuntimeError("Model registry is not available with INFERENCE_WORKERS > 0")
+        entry = ModelEntry(name, path, backend or Config.INFERENCE_BACKEND)
+        with self._lock:
+            existing = self._entries.get(name)
+            if existing is not None and existing.state != MODEL_STATE_FAILED:
+                raise ValueError(f"Model '{name}' is already registered")
+            self._entries[name] = entry
+
+        threading.Thread(target=self._load, args=(entry, activate, traffic),
+                         daemon=True, name=f"ModelLoader-{name}").start()
+        return entry
+
+    def _load(self, entry, activate, traffic):
+        started = time.monotonic()
+        loaded_model = load_model_file(entry.path, entry.backend)
+        if loaded_model is None:
+            entry.error = f"Failed to load model from {entry.path}"
+            entry.state = MODEL_STATE_FAILED
+            return
+
+        try:
+            # Прогрев всех размеров батча, чтобы первое окно после переключения не ждало
+            from recognition.inference_executor import get_inference_executor
+            get_inference_executor().warm_up(loaded_model)
+        except Exception as e:
+            logger.exception(f"Ошибка прогрева модели {entry.name}: {str(e)}")
+            entry.error = f"Warm-up failed: {str(e)}"
+            entry.state = MODEL_STATE_FAILED
+            return
+
+        entry.model = loaded_model
+        entry.load_seconds = round(time.monotonic() - started, 3)
+        entry.loaded_at = time.time()
+        entry.state = MODEL_STATE_READY
+        logger.info(f"Модель {entry.name} загружена и прогрета за {entry.load_seconds} сек.")
+
+        try:
+            if activate:
+                self.activate(entry.name)
+            elif traffic:
+                # Основная модель может еще загружаться в фоне
+                model_loader.wait_for_model()
+                with self._lock:
+                    active = self._active
+                if active is None or active == entry.name:
+                    logger.warning(f"Нет активной модели для A/B-разделения с {entry.name}.")
+                else:
+                    self.set_split({active: 1.0 - traffic, entry.name: traffic})
+        except (KeyError, ValueError) as e:
+            logger.error(f"Не удалось применить модель {entry.name}: {str(e)}")
+
+    def _ready_entry(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Model '{name}' is not registered")
+        if entry.state != MODEL_STATE_READY:
+            raise ValueError(f"Model '{name}' is not ready (state: {entry.state})")
+        return entry
+
+    def activate(self, name):
+        """Атомарное переключение новых окон на готовую модель. Разделение трафика сбрасывается."""
+        with self._lock:
+            entry = self._ready_entry(name)
+            previous = self._active
+            self._active = name
+            self._split = []
+            model_loader.set_active_model(entry.model)
+            self.swaps_total += 1
+        logger.info(f"Активная модель: {name} (прежняя: {previous}).")
+        return entry
+
+    def set_split(self, weights):
+        """A/B-разделение трафика: {имя модели: вес}. Пустой словарь — весь трафик на активную модель."""
+        with self._lock:
+            for name, weight in weights.items():
+                self._ready_entry(name)
+                if weight < 0:
+                    raise ValueError(f"Negative weight for model '{name}'")
+            total = float(sum(weights.values()))
+            if weights and total <= 0:
+                raise ValueError("Split weights must not all be zero")
+
+            split, upper = [], 0.0
+            for name, weight in sorted(weights.items()):
+                if weight > 0:
+                    upper += weight / total
+                    split.append((name, upper))
+            self._split = split
+        logger.info(f"Распределение трафика между моделями: {self.split() or 'только активная модель'}.")
+
+    def split(self):
+        with self._lock:
+            split = list(self._split)
+        lower, shares = 0.0, {}
+        for name, upper in split:
+            shares[name] = round(upper - lower, 4)
+            lower = upper
+        return shares
+
+    def unregister(self, name):
+        """Удаление модели, не участвующей в обработке трафика."""
+        with self._lock:
+            if name not in self._entries:
+                raise KeyError(f"Model '{name}' is not registered")
+            if name == self._active or any(n == name for n, _ in self._split):
+                raise ValueError(f"Model '{name}' is serving traffic")
+            del self._entries[name]
+        logger.info(f"Модель {name} удалена из реестра.")
+
+    def select(self, routing_key=None):
+        """
+        Модель для нового окна: по доле A/B-разделения (сессия закреплена за моделью
+        по хэшу routing_key) или активная. None — реестр пуст.
+        """
+        with self._lock:
+            split = self._split
+            name = self._active
+            if split:
+                if routing_key is None:
+                    point = random.random()
+                else:
+                    digest = hashlib.blake2b(str(routing_key).encode(), digest_size=8).digest()
+                    point = int.from_bytes(digest, 'big') / 2.0 ** 64
+                name = next((n for n, upper in split if point < upper), split[-1][0])
+            entry = self._entries.get(name) if name is not None else None
+        if entry is None or entry.model is None:
+            return None
+        MODEL_WINDOWS.labels(model=entry.name).inc()
+        return entry
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            active = self._active
+        return {
+            "active": active,
+            "split": self.split(),
+            "swaps": self.swaps_total,
+            "models": [entry.info() for entry in entries],
+        }
+
+# Общий реестр моделей процесса
+model_registry = ModelRegistry()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Инференс LSTM-модели жестов на NumPy без TensorFlow/Keras.
+
+Веса и конфигурация слоев читаются напрямую из .h5 файла модели
+(Sequential: LSTM, Dropout, Dense), прямой проход выполняется векторно для всего батча.
+
+Проверка совпадения с Keras:
+    python -m recognition.numpy_lstm --check [--model model_lstm_drop.h5] [--windows 256]
+'''
+import argparse
+import json
+import logging
+import os
+import sys
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)  # устойчивая форма без переполнения exp
+
+def _hard_sigmoid(x):
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)  # Keras 3: relu6(x + 3) / 6
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+def _softmax(x):
+    e = np.exp(x - np.max(x, axis=-1, keepdims=True))
+    return e / np.sum(e, axis=-1, keepdims=True)
+
+def _linear(x):
+    return x
+
+ACTIVATIONS = {
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'tanh': np.tanh,
+    'relu': _relu,
+    'softmax': _softmax,
+    'linear': _linear,
+}
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Неподдерживаемая функция активации: {name}")
+    return ACTIVATIONS[name]
+
+
+class LSTMLayer:
+    '''Слой LSTM (порядок вентилей Keras: i, f, c, o).'''
+
+    def __init__(self, kernel, recurrent_kernel, bias, activation='tanh',
+                 recurrent_activation='sigmoid', return_sequences=False):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32) if bias is not None else np.zeros(self.kernel.shape[1], np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+        self.activation = _activation(activation)
+        self.recurrent_activation = _activation(recurrent_activation)
+        self.return_sequences = return_sequences
+        self.config = {"type": "lstm", "activation": activation,
+                       "recurrent_activation": recurrent_activation, "return_sequences": return_sequences}
+
+    def weights(self):
+        return {"kernel": self.kernel, "recurrent_kernel": self.recurrent_kernel, "bias": self.bias}
+
+    def __call__(self, x):
+        batch_size, timesteps, _ = x.shape
+        units = self.units
+
+        # Входная проекция для всех шагов сразу: [B, T, 4U]
+        x_proj = x @ self.kernel + self.bias
+
+        h = np.zeros((batch_size, units), dtype=np.float32)
+        c = np.zeros((batch_size, units), dtype=np.float32)
+        outputs = np.empty((batch_size, timesteps, units), dtype=np.float32) if self.return_sequences else None
+
+        for t in range(timesteps):
+            z = x_proj[:, t] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :units])
+            f = self.recurrent_activation(z[:, units:2 * units])
+            g = self.activation(z[:, 2 * units:3 * units])
+            o = self.recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+
+        return outputs if outputs is not None else h
+
+
+class DenseLayer:
+    '''Полносвязный слой.'''
+
+    def __init__(self, kernel, bias, activation='linear'):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32) if bias is not None else None
+        self.activation = _activation(activation)
+        self.config = {"type": "dense", "activation": activation}
+
+    def weights(self):
+        return {"kernel": self.kernel} if self.bias is None else {"kernel": self.kernel, "bias": self.bias}
+
+    def __call__(self, x):
+        y = x @ self.kernel
+        if self.bias is not None:
+            y += self.bias
+        return self.activation(y)
+
+
+class NumpyLSTMModel:
+    '''Модель с интерфейсом predict/predict_on_batch, совместимым с Keras.'''
+
+    def __init__(self, layers, input_shape=None):
+        self.layers = layers
+        self.input_shape = input_shape
+
+    def predict_on_batch(self, x):
+        y = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            y = layer(y)
+        return y
+
+    def predict(self, x, verbose=0, batch_size=None):
+        return self.predict_on_batch(x)
+
+    @classmethod
+    def from_h5(cls, path):
+        """Загрузка конфигурации и весов Sequential-модели из .h5 файла Keras."""
+        import h5py
+
+        with h5py.File(path, 'r') as f:
+            model_config = f.attrs['model_config']
+            if isinstance(model_config, bytes):
+                model_config = model_config.decode('utf-8')
+            model_config = json.loads(model_config)
+
+            if model_config.get('class_name') != 'Sequential':
+                raise ValueError(f"Поддерживаются только Sequential-модели, получено: {model_config.get('class_name')}")
+
+            weights_root = f['model_weights'] if 'model_weights' in f else f
+            layers = []
+            input_shape = None
+
+            for layer_config in model_config['config']['layers']:
+                class_name = layer_config['class_name']
+                config = layer_config['config']
+
+                if class_name == 'InputLayer':
+                    input_shape = config.get('batch_shape') or config.get('batch_input_shape')
+                    continue
+                if class_name == 'Dropout':
+                    continue  # при инференсе не используется
+
+                weights = _read_layer_weights(weights_root, config['name'])
+
+                if class_name == 'LSTM':
+                    if config.get('go_backwards') or config.get('stateful'):
+                        raise ValueError(f"Слой {config['name']}: go_backwards/stateful не поддерживаются")
+                    kernel, recurrent_kernel = weights[0], weights[1]
+                    bias = weights[2] if config.get('use_bias', True) else None
+                    layers.append(LSTMLayer(
+                        kernel, recurrent_kernel, bias,
+                        activation=config.get('activation', 'tanh'),
+                        recurrent_activation=config.get('recurrent_activation', 'sigmoid'),
+                        return_sequences=config.get('return_sequences', False),
+                    ))
+                elif class_name == 'Dense':
+                    bias = weights[1] if config.get('use_bias', True) else None
+                    layers.append(DenseLayer(weights[0], bias, activation=config.get('activation', 'linear')))
+                else:
+                    raise ValueError(f"Неподдерживаемый слой: {class_name}")
+
+        logger.info(f"NumPy-модель загружена из {path}: {len(layers)} слоев")
+        return cls(layers, input_shape=input_shape)
+
+
+    def save_npz(self, path, source_path=None):
+        """
+        Сохранение модели в .npz (загружается без h5py и разбора конфигурации Keras).
+        Для source_path сохраняются размер и время изменения, чтобы обнаружить устаревший файл.
+        """
+        arrays = {}
+        for i, layer in enumerate(self.layers):
+            for name, value in layer.weights().items():
+                arrays[f"layer{i}_{name}"] = value
+        meta = {"layers": [layer.config for layer in self.layers], "input_shape": self.input_shape}
+        if source_path is not None:
+            stat = os.stat(source_path)
+            meta["source"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        # Запись во временный файл и атомарная замена: параллельные процессы не читают недописанный файл
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_npz(cls, path, source_path=None):
+        """Загрузка модели из .npz. Если файл создан из другой версии source_path — ValueError."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['__meta__']))
+            if source_path is not None:
+                stat = os.stat(source_path)
+                if meta.get("source") != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}:
+                    raise ValueError(f"{path} создан из другой версии {source_path}")
+
+            layers = []
+            for i, config in enumerate(meta["layers"]):
+                if config["type"] == "lstm":
+                    layers.append(LSTMLayer(
+                        data[f"layer{i}_kernel"], data[f"layer{i}_recurrent_kernel"], data[f"layer{i}_bias"],
+                        activation=config["activation"],
+                        recurrent_activation=config["recurrent_activation"],
+                        return_sequences=config["return_sequences"],
+                    ))
+                elif config["type"] == "dense":
+                    bias_key = f"layer{i}_bias"
+                    layers.append(DenseLayer(data[f"layer{i}_kernel"], data[bias_key] if bias_key in data else None,
+                                             activation=config["activation"]))
+                else:
+                    raise ValueError(f"Неподдерживаемый слой: {config['type']}")
+
+        return cls(layers, input_shape=meta.get("input_shape"))
+
+    @classmethod
+    def load_cached(cls, h5_path):
+        """Загрузка из кэша .npz рядом с .h5; при отсутствии или устаревании кэш создается заново."""
+        npz_path = artifact_path(h5_path)
+        if os.path.exists(npz_path):
+            try:
+                model = cls.from_npz(npz_path, source_path=h5_path)
+                logger.info(f"NumPy-модель загружена из кэша {npz_path}")
+                return model
+            except Exception as e:
+                logger.info(f"Кэш модели {npz_path} не используется: {str(e)}")
+
+        model = cls.from_h5(h5_path)
+        try:
+            model.save_npz(npz_path, source_path=h5_path)
+            logger.info(f"Кэш модели сохранен в {npz_path}")
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить кэш модели {npz_path}: {str(e)}")
+        return model
+
+
+def artifact_path(h5_path):
+    """Путь к кэшу модели в формате .npz рядом с исходным .h5."""
+    return f"{os.path.splitext(h5_path)[0]}.numpy.npz"
+
+
+def _read_layer_weights(weights_root, layer_name):
+    """Чтение весов слоя в порядке, указанном в атрибуте weight_names."""
+    group = weights_root[layer_name]
+    weight_names = [n.decode('utf-8') if isinstance(n, bytes) else n for n in group.attrs.get('weight_names', [])]
+    return [np.asarray(group[name], dtype=np.float32) for name in weight_names]
+
+
+def check_parity(model_path, num_windows=256, seed=0, atol=1e-4):
+    """Сравнение выходов NumPy-модели и Keras на случайных окнах [N, 10, 126]."""
+    from tensorflow import keras
+
+    rng = np.random.default_rng(seed)
+    windows = rng.random((num_windows, 10, 126), dtype=np.float32)
+    # Часть окон с отсутствующей второй рукой, как в реальных данных
+    windows[: num_windows // 2, :, 63:] = 0.0
+
+    keras_output = np.asarray(keras.models.load_model(model_path).predict(windows, verbose=0))
+    numpy_output = NumpyLSTMModel.from_h5(model_path).predict_on_batch(windows)
+
+    max_abs_diff = float(np.max(np.abs(keras_output - numpy_output)))
+    argmax_agreement = float(np.mean(np.argmax(keras_output, axis=1) == np.argmax(numpy_output, axis=1)))
+    return {
+        "windows": num_windows,
+        "max_abs_diff": max_abs_diff,
+        "argmax_agreement": argmax_agreement,
+        "passed": max_abs_diff <= atol and argmax_agreement == 1.0,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="NumPy-инференс LSTM-модели жестов")
+    parser.add_argument('--model', default='model_lstm_drop.h5', help="путь к .h5 модели")
+    parser.add_argument('--check', action='store_true', help="сравнить выходы с Keras")
+    parser.add_argument('--windows', type=int, default=256, help="количество случайных окон для сравнения")
+    args = parser.parse_args()
+
+    if args.check:
+        report = check_parity(args.model, num_windows=args.windows)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        sys.exit(0 if report["passed"] else 1)
+    else:
+        model = NumpyLSTMModel.from_h5(args.model)
+        print(model.predict_on_batch(np.zeros((1, 10, 126), dtype=np.float32)))
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import logging
+import queue
+import threading
+import time
+import numpy as np
+
+from config import Config
+from recognition.hand_mask import FRAME_FEATURES, NUM_HANDS, PRESENCE_BY_MASK, expand_frame, hand_presence
+from utils.logger import rate_limited
+
+logger = logging.getLogger(__name__)
+
+NUM_FEATURES = FRAME_FEATURES  # 2 руки x 21 точка x (x, y, z)
+
+# Политики перекрытия окон
+OVERLAP_SLIDING = 'sliding'  # окно сдвигается на hop кадров, кадры перекрываются
+OVERLAP_TUMBLING = 'tumbling'  # окна не перекрываются (hop = размер буфера)
+OVERLAP_RESET_ON_RESULT = 'reset_on_result'  # как sliding, но после распознанного жеста окно набирается заново
+OVERLAP_POLICIES = (OVERLAP_SLIDING, OVERLAP_TUMBLING, OVERLAP_RESET_ON_RESULT)
+
+
+class RecognitionSession:
+    '''Состояние распознавания одного клиента (камеры).'''
+
+    def __init__(self, session_id, buffer_size=None, hop_frames=None, overlap_policy=None):
+        self.session_id = session_id
+        self.buffer_size = buffer_size or Config.SEQUENCE_BUFFER_SIZE
+
+        self.overlap_policy = overlap_policy or Config.WINDOW_OVERLAP_POLICY
+        if self.overlap_policy not in OVERLAP_POLICIES:
+            logger.warning(f"Неизвестная политика перекрытия окон '{self.overlap_policy}', используется '{OVERLAP_SLIDING}'.")
+            self.overlap_policy = OVERLAP_SLIDING
+        if self.overlap_policy == OVERLAP_TUMBLING:
+            self.hop_frames = self.buffer_size
+        else:
+            self.hop_frames = max(1, hop_frames or Config.RECOGNITION_HOP_FRAMES)
+
+        # Кольцевой буфер кадров фиксированного размера (память на сессию не растет)
+        self._ring = np.zeros((self.buffer_size, NUM_FEATURES), dtype=np.float32)
+        # Буфер для упорядоченного окна (от старого кадра к новому), переиспользуется
+        self._window = np.empty_like(self._ring)
+        # Присутствие рук в кадрах буфера (из масок кадров) и упорядоченная копия для окна
+        self._presence = np.zeros((self.buffer_size, NUM_HANDS), dtype=bool)
+        self._window_presence = np.empty_like(self._presence)
+        self._next_index = 0  # позиция для записи следующего кадра
+        self.frame_count = 0  # количество кадров в буфере (не больше buffer_size)
+        self.frames_since_window = None  # кадров с момента последнего распознанного окна (None — окон еще не было)
+        self.reset_requested = False  # сброс окна после результата (reset_on_result)
+
+        self.results = queue.Queue(maxsize=Config.RESULT_QUEUE_SIZE)  # результаты распознавания сессии
+        self.last_frame_timestamp = None
+        self.last_seen = time.time()
+        self.last_recognition_time = time.time()
+
+    def push_frame(self, frame, mask=None):
+        """
+        Запись кадра в кольцевой буфер без выделения памяти.
+        frame — плотный кадр (126,) или компактный (63 значения на каждую руку из mask);
+        mask — маска присутствия рук (None — определяется по плотному кадру).
+        """
+        if self.reset_requested:
+            self.reset()
+        row = self._ring[self._next_index]
+        if frame.size == NUM_FEATURES:
+            row[:] = frame
+            self._presence[self._next_index] = hand_presence(row) if mask is None else PRESENCE_BY_MASK[mask]
+        else:
+            # Компактный кадр разворачивается сразу в строку буфера
+            expand_frame(frame, mask, row)
+            self._presence[self._next_index] = PRESENCE_BY_MASK[mask]
+        self._next_index = (self._next_index + 1) % self.buffer_size
+        if self.frame_count < self.buffer_size:
+            self.frame_count += 1
+        if self.frames_since_window is not None:
+            self.frames_since_window += 1
+        self.last_seen = time.time()
+
+    def is_full(self):
+        return self.frame_count == self.buffer_size
+
+    def window_due(self):
+        """
+        Нужно ли распознавать текущее окно: буфер заполнен и с прошлого окна прошло hop_frames кадров.
+        Первое окно после заполнения буфера распознается сразу.
+        """
+        if not self.is_full():
+            return False
+        return self.frames_since_window is None or self.frames_since_window >= self.hop_frames
+
+    def mark_window_evaluated(self):
+        self.frames_since_window = 0
+
+    def request_reset(self):
+        """Запрос на сброс окна (выполняется потоком обработки перед следующим кадром)."""
+        if self.overlap_policy == OVERLAP_RESET_ON_RESULT:
+            self.reset_requested = True
+
+    def window(self):
+        """Упорядоченное окно [buffer_size, 126]. Массив переиспользуется при следующем вызове."""
+        head = self.buffer_size - self._next_index
+        self._window[:head] = self._ring[self._next_index:]
+        self._window[head:] = self._ring[:self._next_index]
+        return self._window
+
+    def window_presence(self):
+        """Присутствие рук [buffer_size, 2] в порядке window(). Массив переиспользуется при следующем вызове."""
+        head = self.buffer_size - self._next_index
+        self._window_presence[:head] = self._presence[self._next_index:]
+        self._window_presence[head:] = self._presence[:self._next_index]
+        return self._window_presence
+
+    def reset(self):
+        """Очистка буфера кадров (результаты сохраняются)."""
+        self._next_index = 0
+        self.frame_count = 0
+        self.frames_since_window = None
+        self.reset_requested = False
+
+    def clear_results(self):
+        while True:
+            try:
+                self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.results.task_done()
+
+    def put_result(self, result):
+        try:
+            self.results.put_nowait(result)
+            return True
+        except queue.Full:
+            logger.warning("Очередь результатов сессии %s заполнена, результат пропущен!", self.session_id, extra=rate_limited())
+            return False
+
+
+class SessionRegistry:
+    '''Реестр сессий распознавания с вытеснением неактивных.'''
+
+    def __init__(self, idle_timeout=None, max_sessions=None):
+        self.idle_timeout = idle_timeout if idle_timeout is not None else Config.SESSION_IDLE_TIMEOUT
+        self.max_sessions = max_sessions if max_sessions is not None else Config.MAX_SESSIONS
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._session_created = threading.Condition(self._lock)  # ожидающие результатов еще не созданной сессии
+        self.evicted_total = 0
+
+    def get(self, session_id):
+        """Получить сессию, если она существует."""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id):
+        """Получить или создать сессию."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._evict_oldest_locked()
+                session = RecognitionSession(session_id)
+                self._sessions[session_id] = session
+                self._session_created.notify_all()
+                logger.info(f"Создана сессия распознавания {session_id}. Активных сессий: {len(self._sessions)}")
+            return session
+
+    def _evict_oldest_locked(self):
+        oldest_id = min(self._sessions, key=lambda sid: self._sessions[sid].last_seen)
+        del self._sessions[oldest_id]
+        self.evicted_total += 1
+        logger.warning(f"Достигнут лимит сессий ({self.max_sessions}). Вытеснена сессия {oldest_id}.")
+
+    def evict_idle(self, now=None):
+        """Удаление сессий, не получавших кадры дольше idle_timeout."""
+        now = now or time.time()
+        with self._lock:
+            idle_ids = [sid for sid, s in self._sessions.items() if now - s.last_seen > self.idle_timeout]
+            for sid in idle_ids:
+                del self._sessions[sid]
+            self.evicted_total += len(idle_ids)
+        if idle_ids:
+            logger.info(f"Вытеснено неактивных сессий: {len(idle_ids)}")
+        return len(idle_ids)
+
+    def wait_result(self, session_id, timeout):
+        """
+        Ожидание результата сессии не дольше timeout секунд. Возвращает результат или None.
+        Сессия запрашивается заново на каждом шаге: после вытеснения она создается новым объектом.
+        Ожидание не создает сессию: пока кадры не пришли, ждем ее создания (иначе запросы
+        с произвольными идентификаторами вытесняли бы сессии камер при MAX_SESSIONS).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    self._session_created.wait(min(remaining, 0.5))
+                    continue
+            try:
+                result = session.results.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+            session.results.task_done()
+            return result
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        sessions = self.sessions()
+        return {
+            "active_sessions": len(sessions),
+            "evicted_sessions": self.evicted_total,
+            "pending_results": sum(s.results.qsize() for s in sessions),
+        }
+
+
+# Глобальный реестр сессий сервера
+session_registry = SessionRegistry()
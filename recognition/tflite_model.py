@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Квантованная модель жестов в формате TFLite: конвертация из .h5 и инференс через интерпретатор.
+
+Конвертация (нужен TensorFlow) создает рядом с .h5 файлы:
+    <модель>.float16.tflite      — веса float16;
+    <модель>.int8.tflite         — веса и активации int8 (калибровка на окнах (10, 126)), вход и выход float32;
+    <модель>.int8_dynamic.tflite — веса int8, активации квантуются во время вызова (без калибровки).
+Состояние ячейки LSTM плохо переносит статическое квантование активаций, поэтому бэкенд tflite
+по умолчанию использует int8_dynamic; отчет показывает расхождение всех вариантов с .h5.
+    python -m recognition.tflite_model convert [--model model_lstm_drop.h5] [--calibration windows.npy]
+
+Сравнение точности и задержек с исходной .h5 моделью:
+    python -m recognition.tflite_model report [--model model_lstm_drop.h5] [--windows 512] [--output report.json]
+
+Граф строится из весов NumpyLSTMModel с развернутыми по времени LSTM-слоями: слои LSTM Keras 3
+конвертируются в цикл WHILE с переменными, который не поддерживает квантование и изменение размера батча.
+
+Во время работы (INFERENCE_BACKEND=tflite) используется ai_edge_litert или tflite_runtime,
+если пакет установлен, иначе интерпретатор из TensorFlow.
+'''
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SHAPE = (10, 126)
+QUANTIZATIONS = ('float16', 'int8', 'int8_dynamic')
+
+
+def _interpreter_class():
+    """Класс интерпретатора TFLite из самого легкого доступного пакета."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def artifact_path(h5_path, quantization):
+    """Путь к квантованной модели рядом с исходным .h5."""
+    return f"{os.path.splitext(h5_path)[0]}.{quantization}.tflite"
+
+
+class TFLiteModel:
+    '''
+    Модель TFLite с интерфейсом predict/predict_on_batch, совместимым с Keras.
+    Интерпретатор не потокобезопасен, поэтому у каждого потока свои интерпретаторы
+    (по одному на размер батча, чтобы не перераспределять тензоры при смене бакета).
+    '''
+
+    def __init__(self, path, num_threads=1):
+        self.path = path
+        self.num_threads = num_threads
+        with open(path, 'rb') as f:
+            self._content = f.read()  # общая копия модели для интерпретаторов всех потоков
+        self._interpreter_class = _interpreter_class()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.interpreters_total = 0
+
+    def _interpreter(self, batch_size):
+        interpreters = getattr(self._local, 'interpreters', None)
+        if interpreters is None:
+            interpreters = self._local.interpreters = {}
+        entry = interpreters.get(batch_size)
+        if entry is None:
+            interpreter = self._interpreter_class(model_content=self._content, num_threads=self.num_threads)
+            input_index = interpreter.get_input_details()[0]['index']
+            interpreter.resize_tensor_input(input_index, [batch_size, *WINDOW_SHAPE])
+            interpreter.allocate_tensors()
+            entry = interpreters[batch_size] = (interpreter, input_index, interpreter.get_output_details()[0]['index'])
+            with self._lock:
+                self.interpreters_total += 1
+        return entry
+
+    def predict_on_batch(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        interpreter, input_index, output_index = self._interpreter(len(x))
+        interpreter.set_tensor(input_index, x)
+        interpreter.invoke()
+        return interpreter.get_tensor(output_index).copy()
+
+    def predict(self, x, verbose=0, batch_size=None):
+        return self.predict_on_batch(x)
+
+
+def load_tflite_model(path, quantization='int8_dynamic', num_threads=1):
+    """Загрузка квантованной модели: путь к .tflite или к исходному .h5 (файл рядом с ним)."""
+    tflite_path = path if path.endswith('.tflite') else artifact_path(path, quantization)
+    if not os.path.exists(tflite_path):
+        raise FileNotFoundError(f"{tflite_path} не найден. Создайте его командой: "
+                                f"python -m recognition.tflite_model convert --model {path}")
+    logger.info(f"Загрузка модели TFLite из {tflite_path}")
+    return TFLiteModel(tflite_path, num_threads=num_threads)
+
+
+def synthetic_windows(num_windows, seed=0):
+    """
+    Окна (10, 126) для калибровки и сравнения: случайное блуждание точек рук между кадрами,
+    часть окон без второй руки (нули), как в реальных данных.
+    """
+    rng = np.random.default_rng(seed)
+    start = rng.random((num_windows, 1, WINDOW_SHAPE[1]), dtype=np.float32)
+    steps = rng.normal(0.0, 0.01, (num_windows, WINDOW_SHAPE[0], WINDOW_SHAPE[1])).astype(np.float32)
+    windows = np.clip(start + np.cumsum(steps, axis=1), 0.0, 1.0)
+    windows[: num_windows // 2, :, 63:] = 0.0
+    return windows
+
+
+def _build_tf_function(numpy_model):
+    """Граф TF с весами-константами и развернутыми LSTM-слоями (вход [None, 10, 126])."""
+    import tensorflow as tf
+
+    activations = {
+        'sigmoid': tf.sigmoid,
+        'hard_sigmoid': lambda x: tf.clip_by_value(x / 6.0 + 0.5, 0.0, 1.0),
+        'tanh': tf.tanh,
+        'relu': tf.nn.relu,
+        'softmax': tf.nn.softmax,
+        'linear': tf.identity,
+    }
+
+    def forward(x):
+        for layer in numpy_model.layers:
+            weights = layer.weights()
+            activation = activations[layer.config['activation']]
+            if layer.config['type'] == 'dense':
+                x = tf.matmul(x, tf.constant(weights['kernel']))
+                if 'bias' in weights:
+                    x = x + tf.constant(weights['bias'])
+                x = activation(x)
+                continue
+
+            recurrent_activation = activations[layer.config['recurrent_activation']]
+            timesteps, features = x.shape[1], x.shape[2]
+            # Входная проекция для всех шагов сразу, как в NumpyLSTMModel
+            x_proj = tf.reshape(tf.matmul(tf.reshape(x, [-1, features]), tf.constant(weights['kernel']))
+                                + tf.constant(weights['bias']), [-1, timesteps, 4 * layer.units])
+            recurrent_kernel = tf.constant(weights['recurrent_kernel'])
+            h = c = None
+            outputs = []
+            for t in range(timesteps):
+                z = x_proj[:, t] if h is None else x_proj[:, t] + tf.matmul(h, recurrent_kernel)
+                i, f, g, o = tf.split(z, 4, axis=1)
+                i, f, o = recurrent_activation(i), recurrent_activation(f), recurrent_activation(o)
+                c = i * activation(g) if c is None else f * c + i * activation(g)
+                h = o * activation(c)
+                outputs.append(h)
+            x = tf.stack(outputs, axis=1) if layer.return_sequences else h
+        return x
+
+    module = tf.Module()
+    module.serve = tf.function(forward, input_signature=[tf.TensorSpec([None, *WINDOW_SHAPE], tf.float32)])
+    return module
+
+
+def convert(h5_path, calibration=None, num_calibration=512, seed=0):
+    """Конвертация .h5 во все варианты QUANTIZATIONS. Возвращает {квантование: путь}."""
+    import tensorflow as tf
+    from recognition.numpy_lstm import NumpyLSTMModel
+
+    module = _build_tf_function(NumpyLSTMModel.from_h5(h5_path))
+    concrete_function = module.serve.get_concrete_function()
+
+    if calibration is None:
+        calibration = synthetic_windows(num_calibration, seed=seed)
+    calibration = np.asarray(calibration, dtype=np.float32).reshape(-1, *WINDOW_SHAPE)
+
+    def representative_dataset():
+        for window in calibration:
+            yield [window[None]]
+
+    outputs = {}
+    for quantization in QUANTIZATIONS:
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete_function], module)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization == 'int8':
+            # Квантование активаций по калибровочным окнам; вход и выход остаются float32
+            converter.representative_dataset = representative_dataset
+        path = artifact_path(h5_path, quantization)
+        with open(path, 'wb') as f:
+            f.write(converter.convert())
+        outputs[quantization] = path
+        logger.info(f"Модель {quantization} сохранена в {path} ({os.path.getsize(path)} байт)")
+    return outputs
+
+
+def _latency(model, windows, batch_size, repeats):
+    """Задержка вызова модели на батчах заданного размера (мс)."""
+    samples = []
+    for i in range(repeats):
+        start = (i * batch_size) % (len(windows) - batch_size + 1)
+        batch = windows[start:start + batch_size]
+        started = time.perf_counter()
+        model.predict_on_batch(batch)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples = np.asarray(samples[max(1, repeats // 10):])  # первые вызовы — прогрев
+    return {
+        "batch_size": batch_size,
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "per_window_ms": round(float(np.median(samples)) / batch_size, 4),
+    }
+
+
+_RSS_PROBE = '''
+import json, sys
+import numpy as np
+from recognition.model_loader import MODEL_BACKENDS
+model = MODEL_BACKENDS[sys.argv[1]](sys.argv[2])
+model.predict_on_batch(np.zeros((16, 10, 126), dtype=np.float32))
+# ru_maxrss в Linux сохраняется при exec и показал бы память родительского процесса
+with open('/proc/self/status') as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+print(json.dumps({"peak_rss_mb": round(peak_kb / 1024.0, 1), "tensorflow_imported": "tensorflow" in sys.modules}))
+'''
+
+
+def _process_footprint(backend, path):
+    """Пиковая память отдельного процесса, загрузившего модель бэкендом backend (как рабочий процесс)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3', PYTHONPATH=root)
+    try:
+        result = subprocess.run([sys.executable, '-c', _RSS_PROBE, backend, path], cwd=root, env=env,
+                                capture_output=True, text=True, timeout=300)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    except (subprocess.SubprocessError, OSError, ValueError, IndexError) as e:
+        return {"error": str(e)}
+
+
+def report(h5_path, num_windows=512, repeats=300, seed=1, footprint=True):
+    """Сравнение numpy/float16/int8 с исходной .h5 моделью (Keras): точность, задержка, размер, память."""
+    from tensorflow import keras
+    from recognition.numpy_lstm import NumpyLSTMModel
+
+    windows = synthetic_windows(num_windows, seed=seed)  # не пересекаются с калибровочными (seed=0)
+    reference_model = keras.models.load_model(h5_path)
+    reference = np.asarray(reference_model.predict(windows, verbose=0))
+
+    candidates = {"keras": reference_model, "numpy": NumpyLSTMModel.from_h5(h5_path)}
+    sizes = {"keras": os.path.getsize(h5_path), "numpy": os.path.getsize(h5_path)}
+    for quantization in QUANTIZATIONS:
+        path = artifact_path(h5_path, quantization)
+        candidates[f"tflite_{quantization}"] = TFLiteModel(path)
+        sizes[f"tflite_{quantization}"] = os.path.getsize(path)
+
+    results = {}
+    for name, model in candidates.items():
+        outputs = np.asarray(model.predict_on_batch(windows))
+        results[name] = {
+            "file_size_bytes": sizes[name],
+            "max_abs_diff": round(float(np.max(np.abs(outputs - reference))), 6),
+            "argmax_agreement": round(float(np.mean(np.argmax(outputs, axis=1) == np.argmax(reference, axis=1))), 4),
+            "latency": [_latency(model, windows, batch_size, repeats) for batch_size in (1, 16)],
+        }
+        if footprint:
+            backend = 'tflite' if name.startswith('tflite_') else name
+            path = artifact_path(h5_path, name.split('_', 1)[1]) if backend == 'tflite' else h5_path
+            results[name]["process"] = _process_footprint(backend, path)
+
+    return {"model": h5_path, "windows": num_windows, "backends": results}
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Квантованная TFLite-модель жестов")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help="создать квантованные модели из .h5")
+    convert_parser.add_argument('--model', default='model_lstm_drop.h5', help="путь к .h5 модели")
+    convert_parser.add_argument('--calibration', default=None,
+                                help="записанные окна для калибровки int8 (.npy, форма [N, 10, 126] или [N, 1260])")
+    convert_parser.add_argument('--samples', type=int, default=512, help="синтетических окон для калибровки без --calibration")
+
+    report_parser = subparsers.add_parser('report', help="сравнить квантованные модели с .h5")
+    report_parser.add_argument('--model', default='model_lstm_drop.h5', help="путь к .h5 модели")
+    report_parser.add_argument('--windows', type=int, default=512, help="окон для сравнения точности")
+    report_parser.add_argument('--repeats', type=int, default=300, help="вызовов модели для измерения задержки")
+    report_parser.add_argument('--no-footprint', action='store_true', help="не измерять память отдельных процессов")
+    report_parser.add_argument('--output', default=None, help="файл для JSON-отчета (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        calibration = np.load(args.calibration) if args.calibration else None
+        print(json.dumps(convert(args.model, calibration=calibration, num_calibration=args.samples),
+                         ensure_ascii=False, indent=2))
+    else:
+        output = json.dumps(report(args.model, num_windows=args.windows, repeats=args.repeats,
+                                   footprint=not args.no_footprint), ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        print(output)
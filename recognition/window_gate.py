@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Фильтр окон перед инференсом: окно без рук в кадре или без движения не отправляется в модель.
+
+Признаки кадра — 2 руки x 21 точка x (x, y, z); отсутствующая рука передается нулями.
+Для каждой руки вычисляются доля кадров, в которых она присутствует, и энергия движения —
+среднее абсолютное изменение координат между соседними кадрами, где рука есть в обоих.
+
+Фильтр выключен по умолчанию (WINDOW_GATE_ENABLED): удерживаемый статичный жест не дает движения
+и отсекался бы порогом WINDOW_GATE_MIN_MOTION_ENERGY, а повторные окна не доходили бы до кэша предсказаний.
+'''
+import logging
+
+import numpy as np
+
+from config import Config
+from recognition.hand_mask import NUM_HANDS, HAND_FEATURES, hand_presence
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Решения фильтра
+GATE_PASSED = 'passed'
+GATE_NO_HANDS = 'no_hands'
+GATE_STATIC = 'static'
+
+GATE_WINDOWS = registry.counter(
+    'slr_gate_windows', 'Окна по решению фильтра перед инференсом', labels=('decision',))
+MOTION_ENERGY = registry.histogram(
+    'slr_window_motion_energy', 'Энергия движения самой подвижной руки в окне (для подбора порога)',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05))
+
+class WindowStats:
+    '''
+    Статистика окна [кадры, 126] по рукам.
+    presence — присутствие рук [кадры, руки], если уже известно (маски кадров в буфере сессии).
+    '''
+
+    __slots__ = ('hand_presence', 'motion_energy', 'mean_delta', 'max_delta', 'hand_frames', 'hand_frame_ratio')
+
+    def __init__(self, window, presence=None):
+        hands = window.reshape(len(window), NUM_HANDS, HAND_FEATURES)
+        present = hand_presence(window) if presence is None else presence  # [кадры, руки]
+        self.hand_presence = present.mean(axis=0)
+
+        frame_deltas = np.abs(np.diff(hands, axis=0)).mean(axis=2)  # [кадры - 1, руки]
+        both_present = present[1:] & present[:-1]
+        pairs = both_present.sum(axis=0)
+        energy = np.where(both_present, frame_deltas, 0.0).sum(axis=0)
+        self.motion_energy = np.divide(energy, pairs, out=np.zeros(NUM_HANDS), where=pairs > 0)
+
+        # Изменение кадра целиком (как в прежней проверке дубликатов)
+        whole_deltas = frame_deltas.mean(axis=1)
+        self.mean_delta = float(whole_deltas.mean()) if whole_deltas.size else 0.0
+        self.max_delta = float(whole_deltas.max()) if whole_deltas.size else 0.0
+        # Качество окна: сколько рук присутствует во всех кадрах (вместо подсчета ненулевых значений)
+        self.hand_frames = int(present.sum())
+        self.hand_frame_ratio = self.hand_frames / present.size if present.size else 0.0
+
+    def as_dict(self):
+        return {
+            "hand_presence": [round(float(x), 3) for x in self.hand_presence],
+            "motion_energy": [round(float(x), 6) for x in self.motion_energy],
+            "mean_delta": round(self.mean_delta, 6),
+            "max_delta": round(self.max_delta, 6),
+            "hand_frame_ratio": round(self.hand_frame_ratio, 4),
+        }
+
+def evaluate_window(window, stats=None):
+    """Решение фильтра для окна: (passed | no_hands | static, статистика окна)."""
+    stats = stats or WindowStats(window)
+    if not Config.WINDOW_GATE_ENABLED:
+        return GATE_PASSED, stats
+
+    if stats.hand_presence.max() < Config.WINDOW_GATE_MIN_HAND_PRESENCE:
+        decision = GATE_NO_HANDS
+    else:
+        # Энергия учитывается только для рук, присутствующих в достаточной доле кадров
+        visible = stats.hand_presence >= Config.WINDOW_GATE_MIN_HAND_PRESENCE
+        energy = float(stats.motion_energy[visible].max())
+        MOTION_ENERGY.observe(energy)
+        decision = GATE_PASSED if energy >= Config.WINDOW_GATE_MIN_MOTION_ENERGY else GATE_STATIC
+
+    GATE_WINDOWS.labels(decision=decision).inc()
+    return decision, stats
+
+def get_gate_stats():
+    """Пороги и счетчики решений фильтра."""
+    counts = {decision: int(GATE_WINDOWS.labels(decision=decision).value)
+              for decision in (GATE_PASSED, GATE_NO_HANDS, GATE_STATIC)}
+    total = sum(counts.values())
+    return {
+        "enabled": Config.WINDOW_GATE_ENABLED,
+        "min_hand_presence": Config.WINDOW_GATE_MIN_HAND_PRESENCE,
+        "min_motion_energy": Config.WINDOW_GATE_MIN_MOTION_ENERGY,
+        "windows": counts,
+        "skip_rate": round((total - counts[GATE_PASSED]) / total, 3) if total else 0.0,
+    }
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import atexit
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+import numpy as np
+
+from config import Config
+from recognition.inference_executor import InferenceOverloaded
+from recognition.model_loader import (ACTION_LABELS, MODEL_STATE_NOT_LOADED, MODEL_STATE_LOADING,
+                                      MODEL_STATE_READY, MODEL_STATE_FAILED)
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SHAPE = (10, 126)
+
+# Сообщения от процессов-обработчиков
+MSG_READY = 'ready'
+MSG_DONE = 'done'
+MSG_ERROR = 'error'
+
+
+def _worker_main(worker_index, generation, input_name, output_name, slots, num_classes,
+                 task_queue, result_queue, max_batch_size, buckets, model_path, backend):
+    """
+    Процесс-обработчик инференса: собственная копия модели, окна читаются из разделяемой памяти
+    по номерам слотов, вероятности записываются обратно в разделяемую память.
+    generation — номер запуска процесса; сообщения предыдущих запусков пул отбрасывает.
+    """
+    from recognition.model_loader import MODEL_BACKENDS
+
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    windows = np.ndarray((slots,) + WINDOW_SHAPE, dtype=np.float32, buffer=input_shm.buf)
+    outputs = np.ndarray((slots, num_classes), dtype=np.float32, buffer=output_shm.buf)
+    inputs = {b: np.zeros((b,) + WINDOW_SHAPE, dtype=np.float32) for b in buckets}
+
+    try:
+        model = MODEL_BACKENDS[backend](model_path)
+        for bucket_inputs in inputs.values():  # прогрев всех размеров батчей
+            model.predict_on_batch(bucket_inputs)
+    except Exception as e:
+        result_queue.put((MSG_ERROR, worker_index, generation, [], f"Model load failed: {str(e)}"))
+        return
+    result_queue.put((MSG_READY, worker_index, generation, [], None))
+
+    try:
+        while True:
+            slot = task_queue.get()
+            if slot is None:
+                break
+
+            batch = [slot]
+            while len(batch) < max_batch_size:
+                try:
+                    slot = task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if slot is None:
+                    task_queue.put(None)  # завершение после обработки текущего батча
+                    break
+                batch.append(slot)
+
+            try:
+                size = len(batch)
+                bucket = next((b for b in buckets if b >= size), buckets[-1])
+                batch_inputs = inputs[bucket]
+                batch_inputs[:size] = windows[batch]
+                batch_inputs[size:] = 0.0
+                outputs[batch] = np.asarray(model.predict_on_batch(batch_inputs))[:size]
+                result_queue.put((MSG_DONE, worker_index, generation, batch, None))
+            except Exception as e:
+                result_queue.put((MSG_ERROR, worker_index, generation, batch, str(e)))
+    finally:
+        del windows, outputs
+        input_shm.close()
+        output_shm.close()
+
+
+class _Worker:
+    '''Процесс-обработчик и его кольцо слотов в разделяемой памяти.'''
+
+    def __init__(self, ctx, index, slots, num_classes):
+        self.index = index
+        self.slots = slots
+        self.input_shm = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(WINDOW_SHAPE)) * 4)
+        self.output_shm = shared_memory.SharedMemory(create=True, size=slots * num_classes * 4)
+        self.windows = np.ndarray((slots,) + WINDOW_SHAPE, dtype=np.float32, buffer=self.input_shm.buf)
+        self.outputs = np.ndarray((slots, num_classes), dtype=np.float32, buffer=self.output_shm.buf)
+        self.task_queue = ctx.Queue()
+        self.process = None
+        self.generation = 0  # номер запуска процесса (растет при перезапуске)
+        self.ready = False
+        self.failed = False  # модель не загрузилась, процесс не перезапускается
+
+    def close(self):
+        del self.windows, self.outputs
+        for shm in (self.input_shm, self.output_shm):
+            shm.close()
+            shm.unlink()
+
+
+class InferenceWorkerPool:
+    '''
+    Пул процессов инференса с тем же интерфейсом, что и InferenceExecutor (submit -> Future).
+    Окна передаются через кольца слотов в multiprocessing.shared_memory, по очередям
+    передаются только номера слотов. Результат возвращается в Future, поэтому он
+    попадает в очередь нужной сессии через тот же обработчик, что и в однопроцессном режиме.
+    '''
+
+    def __init__(self, num_workers=None, slots_per_worker=None, max_batch_size=None, buckets=None):
+        from recognition.inference_executor import parse_buckets
+
+        self.num_workers = num_workers or Config.INFERENCE_WORKERS
+        self.slots_per_worker = slots_per_worker or Config.INFERENCE_WORKER_SLOTS
+        self.max_batch_size = max_batch_size or Config.INFERENCE_MAX_BATCH_SIZE
+        self.buckets = parse_buckets(buckets or Config.INFERENCE_BATCH_BUCKETS, self.max_batch_size)
+        self.num_classes = len(ACTION_LABELS)
+
+        self._ctx = mp.get_context('spawn')  # TF не поддерживает fork после инициализации
+        self._result_queue = self._ctx.Queue()
+        self._workers = []
+        self._free_slots = queue.Queue()  # (номер обработчика, слот)
+        self._pending = {}  # (номер обработчика, слот) -> Future
+        self._pending_lock = threading.Lock()
+        # Регистрация окна и запись в очередь задач обработчика выполняются под одной блокировкой
+        # с заменой очереди при перезапуске: окно не попадает в старую очередь после замены
+        self._submit_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._result_thread = None
+        self._stopped = False
+
+        self.batches_total = 0
+        self.windows_total = 0
+        self.errors_total = 0
+        self.restarts_total = 0
+        self.dropped_total = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._workers:
+                return
+            for index in range(self.num_workers):
+                self._workers.append(_Worker(self._ctx, index, self.slots_per_worker, self.num_classes))
+            # Слоты чередуются по обработчикам, чтобы нагрузка распределялась равномерно
+            for slot in range(self.slots_per_worker):
+                for worker in self._workers:
+                    self._free_slots.put((worker.index, slot))
+            for worker in self._workers:
+                self._spawn(worker)
+
+            self._result_thread = threading.Thread(target=self._collect_results, daemon=True, name="InferencePoolResultThread")
+            self._result_thread.start()
+            atexit.register(self.shutdown)
+            logger.info(f"Запущен пул инференса: {self.num_workers} процессов x {self.slots_per_worker} слотов")
+
+    def _spawn(self, worker):
+        worker.ready = False
+        worker.generation += 1
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.generation, worker.input_shm.name, worker.output_shm.name, worker.slots, self.num_classes,
+                  worker.task_queue, self._result_queue, self.max_batch_size, self.buckets,
+                  Config.MODEL_PATH, Config.INFERENCE_BACKEND),
+            daemon=True,
+            name=f"InferenceWorker-{worker.index}"
+        )
+        worker.process.start()
+
+    def is_ready(self):
+        return any(worker.ready for worker in self._workers)
+
+    def state(self):
+        """Состояние готовности пула в том же формате, что и model_loader.get_model_state."""
+        if self.is_ready():
+            state = MODEL_STATE_READY
+        elif self._workers and all(worker.failed for worker in self._workers):
+            state = MODEL_STATE_FAILED
+        else:
+            state = MODEL_STATE_LOADING if self._workers else MODEL_STATE_NOT_LOADED
+        return {"state": state, "error": None, "load_seconds": None,
+                "workers_ready": sum(1 for w in self._workers if w.ready)}
+
+    def warm_up(self, model=None):
+        # Каждый процесс прогревает свою модель сам при запуске
+        return self.is_ready()
+
+    def submit(self, window, model=None):
+        """
+        Поставить окно [10, 126] в очередь на инференс. Возвращает Future с вектором вероятностей.
+        model не используется: каждый процесс инференса загружает модель из MODEL_PATH.
+        Не блокируется: без свободного слота окно отбрасывается (Future с InferenceOverloaded).
+        """
+        self.start()
+        future = Future()
+        if all(worker.failed for worker in self._workers):
+            future.set_exception(RuntimeError("All inference workers failed to load the model"))
+            return future
+        while True:
+            try:
+                worker_index, slot = self._free_slots.get_nowait()
+            except queue.Empty:
+                self.dropped_total += 1
+                future.set_exception(InferenceOverloaded("No free inference slots (worker pool overloaded)"))
+                return future
+            worker = self._workers[worker_index]
+            if not worker.failed:
+                break
+            # Слоты процесса, не загрузившего модель, выводятся из оборота
+
+        worker.windows[slot] = window  # копирование в разделяемую память
+        with self._submit_lock:
+            with self._pending_lock:
+                self._pending[(worker_index, slot)] = future
+            worker.task_queue.put(slot)  # multiprocessing.Queue.put не ждет процесс-обработчик
+        return future
+
+    def _release(self, worker, slots, error=None, retire=False):
+        """
+        Завершение окон в слотах и возврат слотов в оборот.
+        Возвращается только слот с ожидающим окном, поэтому слот не попадает в список свободных дважды.
+        retire=True — слоты процесса, не загрузившего модель, выводятся из оборота.
+        """
+        for slot in slots:
+            with self._pending_lock:
+                future = self._pending.pop((worker.index, slot), None)
+            if future is None:
+                continue
+            if error is None:
+                future.set_result(worker.outputs[slot].copy())
+            else:
+                future.set_exception(RuntimeError(error))
+            if not retire:
+                self._free_slots.put((worker.index, slot))
+
+    def _pending_slots(self, worker):
+        with self._pending_lock:
+            return [slot for (index, slot) in self._pending if index == worker.index]
+
+    def _mark_failed(self, worker, error):
+        """Процесс не загрузил модель: все его ожидающие окна получают ошибку, слоты выводятся из оборота."""
+        worker.failed = True
+        self._release(worker, self._pending_slots(worker), error=error, retire=True)
+
+    def _collect_results(self):
+        last_check = time.monotonic()
+        while not self._stopped:
+            if time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, worker_index, generation, slots, error = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            worker = self._workers[worker_index]
+            if generation != worker.generation:
+                # Сообщение завершившегося процесса: его окна уже получили ошибку, слоты могли быть выданы заново
+                logger.warning(f"Пропущено сообщение '{kind}' предыдущего запуска обработчика {worker_index}")
+                continue
+            if kind == MSG_READY:
+                worker.ready = True
+                logger.info(f"Обработчик инференса {worker_index} готов (pid {worker.process.pid})")
+            elif kind == MSG_DONE:
+                self.batches_total += 1
+                self.windows_total += len(slots)
+                self._release(worker, slots)
+            else:
+                self.errors_total += 1
+                logger.error(f"Ошибка в обработчике инференса {worker_index}: {error}")
+                if worker.ready:
+                    self._release(worker, slots, error=error)
+                else:
+                    self._mark_failed(worker, error)
+
+    def _check_workers(self):
+        """Перезапуск завершившихся процессов; их незавершенные окна получают ошибку."""
+        for worker in self._workers:
+            if self._stopped or worker.failed or worker.process is None or worker.process.is_alive():
+                continue
+            if not worker.ready:
+                # Процесс не дошел до загрузки модели — перезапуск приведет к тому же результату
+                logger.error(f"Обработчик инференса {worker.index} завершился при запуске (код {worker.process.exitcode})")
+                self._mark_failed(worker, "Inference worker died")
+                continue
+            logger.error(f"Обработчик инференса {worker.index} завершился (код {worker.process.exitcode}). Перезапуск...")
+            # Очередь задач пересоздается до возврата слотов: в старой могли остаться номера этих слотов.
+            # Под блокировкой отправки: окно, зарегистрированное до замены, попадает в lost_slots,
+            # а после замены — только в новую очередь
+            with self._submit_lock:
+                lost_slots = self._pending_slots(worker)
+                worker.task_queue = self._ctx.Queue()
+            self.restarts_total += 1
+            self._spawn(worker)
+            self._release(worker, lost_slots, error="Inference worker died")
+
+    def shutdown(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        for worker in self._workers:
+            worker.task_queue.put(None)
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(timeout=5.0)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            worker.close()
+        logger.info("Пул инференса остановлен.")
+
+    def stats(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "mode": "processes",
+            "workers": self.num_workers,
+            "workers_ready": sum(1 for w in self._workers if w.ready),
+            "workers_failed": sum(1 for w in self._workers if w.failed),
+            "pending": pending,
+            "free_slots": self._free_slots.qsize(),
+            "batches": self.batches_total,
+            "windows": self.windows_total,
+            "avg_batch_size": round(self.windows_total / self.batches_total, 2) if self.batches_total else 0.0,
+            "errors": self.errors_total,
+            "restarts": self.restarts_total,
+            "dropped": self.dropped_total,
+        }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Жизненный цикл серверного процесса.
+
+init_server() выполняется один раз в главном процессе до fork (база данных, загрузка модели),
+start_worker() — в каждом рабочем процессе после fork (фоновые потоки не переживают fork).
+'''
+import gc
+import logging
+import os
+import threading
+import time
+
+from config import Config
+from database.db_manager import init_db
+from models.auth_token import run_token_sweeper
+from recognition.model_loader import AUTO_RECOGNITION_ENABLED, MODEL_STATE_READY, load_model, load_model_async
+from recognition.feature_collector import process_feature_sequences
+from recognition.inference_executor import get_inference_executor, ensure_inference_ready
+from recognition.model_registry import model_registry, model_name_from_path
+from utils.logger import ensure_log_listener
+
+logger = logging.getLogger(__name__)
+
+# Бэкенды, модель которых можно загрузить до fork и разделять между процессами (copy-on-write).
+# TensorFlow создает пулы потоков при загрузке модели и после fork может зависнуть.
+PREFORK_SAFE_BACKENDS = ('numpy',)
+
+_worker_lock = threading.Lock()
+_worker_pid = None
+_processing_thread = None
+_started_at = None
+
+
+def init_server(app, prefork=False):
+    """
+    Однократная инициализация в главном процессе: база данных и модель.
+    При prefork=True модель загружается синхронно и только для бэкендов, безопасных для fork;
+    иначе (MODEL_BACKGROUND_LOAD) — в фоне, и сервер начинает отвечать сразу.
+    """
+    with app.app_context():
+        init_db()
+
+    if prefork and Config.SERVER_WORKERS > 1:
+        logger.warning(f"SERVER_WORKERS={Config.SERVER_WORKERS}: сессии распознавания хранятся в памяти процесса, "
+                       f"кадры и опрос результатов одного клиента могут попасть в разные процессы.")
+
+    if AUTO_RECOGNITION_ENABLED and Config.INFERENCE_WORKERS == 0:
+        if prefork and Config.INFERENCE_BACKEND not in PREFORK_SAFE_BACKENDS:
+            logger.info(f"Бэкенд {Config.INFERENCE_BACKEND} не поддерживает загрузку до fork: "
+                        f"модель будет загружена в каждом рабочем процессе.")
+        elif prefork or not Config.MODEL_BACKGROUND_LOAD:
+            logger.info("Загрузка модели распознавания жестов...")
+            if not load_model():
+                logger.error("Не удалось загрузить модель при запуске.")
+                return False
+            logger.info("Модель успешно загружена.")
+        else:
+            logger.info("Загрузка модели распознавания жестов в фоне...")
+            load_model_async()
+
+    if prefork:
+        # Объекты, созданные при загрузке, больше не просматриваются сборщиком мусора,
+        # поэтому страницы памяти с моделью остаются общими для рабочих процессов
+        gc.freeze()
+    return True
+
+
+def start_worker():
+    """Запуск фоновых потоков в текущем процессе. Повторный вызов в том же процессе ничего не делает."""
+    global _worker_pid, _processing_thread, _started_at
+
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        _worker_pid = os.getpid()
+        _started_at = time.time()
+        ensure_log_listener()
+
+        if AUTO_RECOGNITION_ENABLED:
+            if Config.INFERENCE_WORKERS > 0:
+                # Модель загружается в каждом процессе инференса, а не в процессе сервера
+                logger.info(f"Запуск {Config.INFERENCE_WORKERS} процессов инференса...")
+            elif not ensure_inference_ready():
+                logger.info("Модель загружается в фоне, запросы распознавания отклоняются до готовности.")
+            get_inference_executor().start()
+
+            if Config.MODEL_CANDIDATE_PATH and Config.INFERENCE_WORKERS == 0:
+                # Вторая модель загружается и прогревается в фоне, затем получает свою долю сессий
+                try:
+                    model_registry.register(model_name_from_path(Config.MODEL_CANDIDATE_PATH), Config.MODEL_CANDIDATE_PATH,
+                                            traffic=Config.MODEL_CANDIDATE_TRAFFIC)
+                except ValueError as e:
+                    logger.error(f"Не удалось загрузить модель-кандидат: {str(e)}")
+
+        # При daemon=True поток будет завершен при завершении основного потока
+        _processing_thread = threading.Thread(
+            target=process_feature_sequences,
+            daemon=True,
+            name="FeatureProcessorThread"
+        )
+        _processing_thread.start()
+
+        if Config.TOKEN_SWEEP_INTERVAL > 0:
+            threading.Thread(target=run_token_sweeper, daemon=True, name="TokenSweeperThread").start()
+        logger.info(f"Рабочий процесс {_worker_pid} запущен.")
+
+
+def readiness():
+    """Состояние готовности текущего процесса: (готов ли, подробности проверок, состояние модели)."""
+    model_state = get_inference_executor().state()
+    checks = {
+        "worker_started": _worker_pid == os.getpid(),
+        "processing_thread": _processing_thread is not None and _processing_thread.is_alive(),
+        "model": model_state["state"] == MODEL_STATE_READY if AUTO_RECOGNITION_ENABLED else True,
+    }
+    return all(checks.values()), checks, model_state
+
+
+def uptime():
+    return round(time.time() - _started_at, 1) if _started_at else 0.0
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Модули проекта импортируются от корня репозитория; база данных — временный файл, а не users.db
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_PATH', os.path.join(tempfile.mkdtemp(), 'test.db'))
+os.environ.setdefault('INFERENCE_BACKEND', 'numpy')
+
+
+@pytest.fixture
+def fresh_loader(monkeypatch):
+    """Модель не загружена, реестр моделей пуст; глобальное состояние восстанавливается после теста."""
+    from recognition import gesture_processor, model_loader
+    from recognition.model_registry import model_registry
+    monkeypatch.setattr(model_loader, 'AUTO_RECOGNITION_ENABLED', True)
+    monkeypatch.setattr(gesture_processor, 'AUTO_RECOGNITION_ENABLED', True)
+    monkeypatch.setattr(model_loader, 'model', None)
+    monkeypatch.setattr(model_loader, '_load_thread', None)
+    monkeypatch.setattr(model_loader, '_model_state', dict(model_loader._model_state))
+    monkeypatch.setattr(model_registry, '_entries', {})
+    monkeypatch.setattr(model_registry, '_active', None)
+    gesture_processor.prediction_cache.clear()
+    yield
+    gesture_processor.prediction_cache.clear()
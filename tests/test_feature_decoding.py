@@ -0,0 +1,45 @@
+import json
+import tracemalloc
+
+import pytest
+from flask import Flask, request
+
+from api.feature_decoding import FeatureDecodeError, decode_batch_request
+from config import Config
+
+app = Flask(__name__)
+
+
+def _decode(body, content_type='application/json'):
+    with app.test_request_context('/features/batch', method='POST', data=body, content_type=content_type):
+        return decode_batch_request(request)
+
+
+def test_oversized_frame_count_rejected_before_decoding():
+    # Небольшое тело (~360 КБ) со 120000 скалярных «кадров»
+    frames = [0] * 120000
+    body = json.dumps({"frames": frames})
+    tracemalloc.start()
+    try:
+        with pytest.raises(FeatureDecodeError) as error:
+            _decode(body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert error.value.status == 413
+    # Массив [N, 126] (60 МБ) не выделяется: пик определяется только разбором JSON
+    assert peak < 10 * 1024 * 1024
+
+
+def test_frame_count_just_over_limit_rejected():
+    frames = [{"features": [0.5] * 126}] * (Config.MAX_BATCH_FRAMES + 1)
+    with pytest.raises(FeatureDecodeError) as error:
+        _decode(json.dumps({"frames": frames}))
+    assert error.value.status == 413
+
+
+def test_batch_at_limit_is_decoded():
+    frames = [{"features": [0.5] * 126}] * Config.MAX_BATCH_FRAMES
+    frames_np, masks, timestamps, statuses, _ = _decode(json.dumps({"frames": frames}))
+    assert frames_np.shape == (Config.MAX_BATCH_FRAMES, 126)
+    assert statuses == ['accepted'] * Config.MAX_BATCH_FRAMES
@@ -0,0 +1,52 @@
+import threading
+
+import numpy as np
+
+from recognition import gesture_processor, model_loader
+from recognition.inference_executor import get_inference_executor
+from recognition.model_registry import model_registry
+
+
+class BlockingModel:
+    """Модель-заглушка: первый вызов (прогрев) ждет release, все вызовы записываются."""
+
+    def __init__(self):
+        self.calls = []
+        self.warm_up_started = threading.Event()
+        self.release = threading.Event()
+
+    def predict_on_batch(self, batch):
+        self.calls.append(batch.shape[0])
+        if not self.warm_up_started.is_set():
+            self.warm_up_started.set()
+            assert self.release.wait(10)
+        return np.zeros((batch.shape[0], len(model_loader.ACTION_LABELS)), dtype=np.float32)
+
+
+def test_no_inference_while_model_warms_up(fresh_loader, monkeypatch):
+    fake_model = BlockingModel()
+    monkeypatch.setattr(model_loader, 'load_model_file', lambda path, backend=None: fake_model)
+    executor = get_inference_executor()
+
+    thread = model_loader.load_model_async()
+    try:
+        assert fake_model.warm_up_started.wait(10)
+
+        # Во время прогрева модель не опубликована: окна не доходят до исполнителя
+        assert model_loader.get_model() is None
+        assert model_loader.get_model_state()["state"] == model_loader.MODEL_STATE_LOADING
+        assert not executor.is_ready()
+        assert model_registry.select(None) is None
+
+        window = np.random.rand(10, 126).astype(np.float32)
+        result = gesture_processor.recognize_gesture_async(window).result(timeout=5)
+        assert result["gesture"] == "Error: Model not loaded"
+        assert fake_model.calls == [executor.buckets[0]]
+    finally:
+        fake_model.release.set()
+        thread.join(10)
+
+    assert model_loader.get_model() is fake_model
+    assert model_loader.get_model_state()["state"] == model_loader.MODEL_STATE_READY
+    # Только прогрев: по одному вызову на каждый размер батча
+    assert fake_model.calls == list(executor.buckets)
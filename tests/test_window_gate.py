@@ -0,0 +1,45 @@
+import numpy as np
+
+from recognition import gesture_processor, model_loader
+from recognition.window_gate import GATE_PASSED, evaluate_window
+
+HELD_CLASS = 2
+
+
+class ConfidentModel:
+    """Модель-заглушка: уверенно предсказывает HELD_CLASS и считает окна."""
+
+    def __init__(self):
+        self.windows = 0
+
+    def predict_on_batch(self, batch):
+        self.windows += batch.shape[0]
+        predictions = np.zeros((batch.shape[0], len(model_loader.ACTION_LABELS)), dtype=np.float32)
+        predictions[:, HELD_CLASS] = 0.99
+        return predictions
+
+
+def _held_sign_window():
+    # Обе руки в кадре, координаты не меняются между кадрами
+    frame = np.random.default_rng(0).uniform(0.2, 0.8, 126).astype(np.float32)
+    return np.tile(frame, (10, 1))
+
+
+def test_held_static_sign_is_recognized(fresh_loader):
+    window = _held_sign_window()
+    assert evaluate_window(window)[0] == GATE_PASSED
+
+    fake_model = ConfidentModel()
+    model_loader.set_active_model(fake_model)
+
+    expected = model_loader.ACTION_LABELS[HELD_CLASS]
+    first = gesture_processor.recognize_gesture_async(window).result(timeout=5)
+    assert first["gesture"] == expected
+    assert fake_model.windows > 0
+
+    # Повторное окно той же позы отвечается из кэша предсказаний
+    seen = fake_model.windows
+    repeat = gesture_processor.recognize_gesture_async(window.copy()).result(timeout=5)
+    assert repeat["gesture"] == expected
+    if gesture_processor.prediction_cache.enabled:
+        assert fake_model.windows == seen
@@ -0,0 +1,36 @@
+import queue
+import time
+import types
+
+import numpy as np
+import pytest
+
+from recognition.inference_executor import InferenceOverloaded, WINDOW_SHAPE
+from recognition.worker_pool import InferenceWorkerPool
+
+
+def _pool_with_one_slot(monkeypatch):
+    # Процессы не запускаются: один обработчик с одним слотом и обычной очередью задач
+    pool = InferenceWorkerPool(num_workers=1, slots_per_worker=1)
+    monkeypatch.setattr(pool, 'start', lambda: None)
+    worker = types.SimpleNamespace(index=0, ready=True, failed=False, task_queue=queue.Queue(),
+                                   windows=np.zeros((1,) + WINDOW_SHAPE, dtype=np.float32))
+    pool._workers = [worker]
+    pool._free_slots.put((0, 0))
+    return pool, worker
+
+
+def test_submit_drops_window_without_waiting_when_pool_is_full(monkeypatch):
+    pool, worker = _pool_with_one_slot(monkeypatch)
+    window = np.ones(WINDOW_SHAPE, dtype=np.float32)
+
+    first = pool.submit(window)
+    assert not first.done()
+    assert worker.task_queue.get_nowait() == 0
+
+    started = time.monotonic()
+    second = pool.submit(window)
+    assert time.monotonic() - started < 0.5
+    with pytest.raises(InferenceOverloaded):
+        second.result(timeout=0)
+    assert pool.stats()["dropped"] == 1
@@ -1,15 +1,114 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import logging
+import logging.handlers
+import atexit
 import os
+import queue
 import sys
 import codecs
 import io
+import threading
+import time
+
+from config import Config
+
+# Ключ extra для ограничения частоты сообщений горячих участков:
+# logger.info("...", extra=rate_limited()) — не чаще одного сообщения в интервал с одного места вызова
+RATE_LIMIT_KEY = 'rate_limit'
+
+def rate_limited(interval=None):
+    """Параметр extra для сообщения с ограничением частоты (по умолчанию LOG_HOT_PATH_INTERVAL)."""
+    return {RATE_LIMIT_KEY: Config.LOG_HOT_PATH_INTERVAL if interval is None else interval}
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Ограничение частоты сообщений с extra=rate_limited(): не больше одного сообщения
+    в интервал с каждого места вызова (файл, строка). К следующему пропущенному
+    сообщению добавляется количество пропущенных.
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self._last_emit = {}  # (файл, строка) -> (время последнего сообщения, пропущено)
+        self._lock = threading.Lock()
+        self.suppressed_total = 0
+
+    def filter(self, record):
+        interval = getattr(record, RATE_LIMIT_KEY, None)
+        if not interval:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            last_emit, suppressed = self._last_emit.get(key, (0.0, 0))
+            if now - last_emit < interval:
+                self._last_emit[key] = (last_emit, suppressed + 1)
+                self.suppressed_total += 1
+                return False
+            self._last_emit[key] = (now, 0)
+        if suppressed:
+            record.msg = f"{record.msg} [пропущено похожих сообщений: {suppressed}]"
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    '''
+    Передача записей в ограниченную очередь без ожидания: форматирование и запись
+    в файл/консоль выполняются потоком QueueListener. При переполнении запись отбрасывается.
+    '''
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped_total = 0
+
+    def prepare(self, record):
+        # Очередь внутри процесса: запись передается как есть, сообщение форматируется
+        # в потоке QueueListener (аргументы горячих участков — числа, строки и неизменяемые массивы)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_total += 1
+
+_queue_handler = None
+_listener = None
+_listener_pid = None
+_output_handlers = []
+
+def _start_listener():
+    global _listener, _listener_pid
+    log_queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_output_handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+def ensure_log_listener():
+    """Перезапуск потока записи логов в рабочем процессе после fork (потоки не наследуются)."""
+    if _queue_handler is not None and _listener_pid != os.getpid():
+        _start_listener()
+
+def _stop_listener():
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()  # дописывает оставшиеся в очереди записи
+
+def get_logging_stats():
+    """Счетчики конвейера логирования."""
+    rate_filter = next((f for f in _queue_handler.filters if isinstance(f, RateLimitFilter)), None) if _queue_handler else None
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped_total if _queue_handler else 0,
+        "rate_limited": rate_filter.suppressed_total if rate_filter else 0,
+    }
 
 def setup_logger():
     """
     Настройка логирования для приложения.
     """
+    global _queue_handler
+
     # Исправление кодировки для вывода в консоль (безопасная проверка)
     if sys.platform == 'win32':
         # Проверяем, что stdout еще не обернут
@@ -35,11 +134,13 @@ def setup_logger():
     if logger.handlers:
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
+    _stop_listener()
+    _output_handlers.clear()
     
     # Создание консольного обработчика
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    _output_handlers.append(console_handler)
     
     # Создание обработчика для записи в файл
     # Проверка наличия переменной окружения LOG_DIR
@@ -49,12 +150,25 @@ def setup_logger():
     
     log_file = os.path.join(log_dir, 'sign_language_server.log')
     
+    file_error = None
     try:
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        logger.info(f"Log-file создан в {log_file}")
+        _output_handlers.append(file_handler)
     except (PermissionError, IOError) as e:
-        logger.warning(f"Не удалось создать Log-file: {str(e)}. Работа с консолью продолжается.")
+        file_error = e
+
+    # Запись в файл и консоль выполняется отдельным потоком: вызывающий поток только ставит запись в очередь
+    _queue_handler = NonBlockingQueueHandler(None)
+    _queue_handler.addFilter(RateLimitFilter())
+    _start_listener()
+    logger.addHandler(_queue_handler)
+
+    if file_error is None:
+        logger.info(f"Log-file создан в {log_file}")
+    else:
+        logger.warning(f"Не удалось создать Log-file: {str(file_error)}. Работа с консолью продолжается.")
     
-    return logger
\ No newline at end of file
+    return logger
+
+atexit.register(_stop_listener)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Метрики сервера в текстовом формате Prometheus (без внешних зависимостей).
+
+Значения хранятся в памяти процесса: при запуске через gunicorn каждый рабочий
+процесс отдает на /metrics свои собственные счетчики.
+'''
+import math
+import threading
+from abc import ABC, abstractmethod
+
+# Границы корзин гистограмм задержек (сек)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+class _Metric(ABC):
+    metric_type = None
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.label_names:
+            self._children[()] = self._new_child()
+
+    @abstractmethod
+    def _new_child(self):
+        """Новое значение метрики для набора меток."""
+
+    def labels(self, *values, **kwargs):
+        """Метрика с конкретными значениями меток."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.label_names)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _samples(self):
+        """Строки значений метрики в текстовом формате Prometheus."""
+
+    def _family_name(self):
+        return self.name
+
+    def render(self):
+        family = self._family_name()
+        lines = [f"# HELP {family} {self.description}", f"# TYPE {family} {self.metric_type}"]
+        lines.extend(self._samples())
+        return lines
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Counter(_Metric):
+    '''Монотонно растущий счетчик.'''
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def _family_name(self):
+        # В формате 0.0.4 имя в HELP/TYPE должно совпадать с именем значения
+        return f"{self.name}_total"
+
+    def _samples(self):
+        return [f"{self.name}_total{_format_labels(self.label_names, key)} {_format_value(child.value)}"
+                for key, child in sorted(self._children.items())]
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+class Histogram(_Metric):
+    '''Гистограмма с фиксированными корзинами (последняя корзина — +Inf).'''
+    metric_type = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, description, labels)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def _samples(self):
+        lines = []
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total_sum, total_count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {total_count}")
+        return lines
+
+class Gauge(_Metric):
+    '''Текущее значение, вычисляемое при каждом запросе метрик.'''
+    metric_type = 'gauge'
+
+    def __init__(self, name, description, callback):
+        self.callback = callback
+        super().__init__(name, description)
+
+    def _new_child(self):
+        return None
+
+    def _samples(self):
+        try:
+            value = self.callback()
+        except Exception:
+            value = math.nan
+        return [f"{self.name} {_format_value(float(value))}"]
+
+class MetricsRegistry:
+    '''Набор метрик процесса.'''
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, description, labels=()):
+        return self.register(Counter(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def gauge(self, name, description, callback):
+        return self.register(Gauge(name, description, callback))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Общий реестр метрик процесса
+registry = MetricsRegistry()
+
+# Метрики конвейера распознавания
+INGEST_PARSE_SECONDS = registry.histogram(
+    'slr_ingest_parse_seconds', 'Время разбора и проверки признаков из запроса', labels=('endpoint',))
+QUEUE_WAIT_SECONDS = registry.histogram(
+    'slr_queue_wait_seconds', 'Время ожидания в очереди до обработки', labels=('queue',))
+INFERENCE_SECONDS = registry.histogram(
+    'slr_inference_seconds', 'Время от отправки окна на инференс до получения вероятностей (с ожиданием батча)')
+INFERENCE_BATCH_SECONDS = registry.histogram(
+    'slr_inference_batch_seconds', 'Время одного вызова модели для батча')
+FRAME_TO_RESULT_SECONDS = registry.histogram(
+    'slr_frame_to_result_seconds', 'Задержка от получения кадра, завершившего окно, до результата распознавания')
+
+FRAMES = registry.counter(
+    'slr_frames', 'Кадры признаков по итогу приема', labels=('status',))
+WINDOWS = registry.counter(
+    'slr_windows', 'Окна в буферах сессий: отправленные на распознавание и пропущенные планировщиком', labels=('outcome',))
+RESULTS = registry.counter(
+    'slr_results', 'Результаты распознавания окон', labels=('outcome',))
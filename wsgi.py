@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Точка входа для production-сервера:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+При preload_app модуль импортируется в главном процессе gunicorn один раз: база данных
+инициализируется, модель загружается до fork и разделяется рабочими процессами (copy-on-write).
+Фоновые потоки запускаются в каждом рабочем процессе хуком post_worker_init.
+'''
+from app import create_app, logger
+from serving import init_server
+
+app = create_app()
+
+if not init_server(app, prefork=True):
+    logger.error("Не удалось загрузить модель при запуске. Сервер НЕ будет запущен.")
+    raise SystemExit(1)